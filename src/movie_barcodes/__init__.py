@@ -1,18 +1,53 @@
 """Public API for movie_barcodes.
 
 This package provides CLI and library functions to generate movie color barcodes.
+
+Submodules are imported on first access, so that importing the package, e.g. to run a single command or in a worker
+process, only loads what is actually used.
 """
 
-from . import barcode_generation as barcode_generation
-from . import color_extraction
-from . import video_processing
-from .cli import main as main
-from . import utility
+import importlib
+from typing import Any, List
+
+# Public name -> (submodule, attribute of the submodule or None for the submodule itself)
+_LAZY_ATTRIBUTES = {
+    "barcode_generation": ("barcode_generation", None),
+    "color_extraction": ("color_extraction", None),
+    "color_sequence": ("color_sequence", None),
+    "ColorSequence": ("color_sequence", "ColorSequence"),
+    "video_processing": ("video_processing", None),
+    "utility": ("utility", None),
+    "main": ("cli", "main"),
+}
 
 __all__ = [
     "barcode_generation",
     "color_extraction",
+    "color_sequence",
+    "ColorSequence",
     "video_processing",
     "utility",
     "main",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Import the submodule providing a public name on first access.
+
+    :param str name: The attribute name.
+    :return: Any: The submodule or the attribute.
+    :raises AttributeError: If the name is not part of the public API.
+    """
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attribute = _LAZY_ATTRIBUTES[name]
+    module = importlib.import_module(f".{module_name}", __name__)
+    value = module if attribute is None else getattr(module, attribute)
+    # Cache it, so that later accesses do not go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
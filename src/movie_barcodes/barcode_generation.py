@@ -1,84 +1,221 @@
-from typing import Optional
+import logging
+from typing import Iterator, Optional, Sequence, Union
 
 import numpy as np
 import cv2
 
-from tqdm import tqdm
+from .color_sequence import ColorSequence, area_resample
 
+# Radial samples per pixel of the circular barcode profile, used to antialias the ring edges
+CIRCULAR_PROFILE_SAMPLES = 16
+# Half the width of a ring of the circular barcode, in pixels: rings are one pixel wide, with a slight overlap
+CIRCULAR_RING_HALF_WIDTH = 0.55
+# Memory budget of one strip of rows, for barcodes rendered strip by strip
+STRIP_BYTES = 16 * 1024 * 1024
 
-def generate_circular_barcode(colors: list, img_size: int, scale_factor: int = 10) -> np.ndarray:
+
+def _strip_rows(width: int, bytes_per_pixel: int) -> int:
+    """
+    Returns the number of rows of a strip that fits in STRIP_BYTES.
+
+    :param int width: The width of the image.
+    :param int bytes_per_pixel: Memory used per pixel while computing a strip.
+    :return: int: Number of rows, at least 1.
+    """
+    return max(1, STRIP_BYTES // max(1, width * bytes_per_pixel))
+
+
+def generate_circular_barcode(
+    colors: Union[ColorSequence, list], img_size: int, scale_factor: Optional[int] = None
+) -> np.ndarray:
     """
     Generate a circular barcode from the list of colors or smoothed frames.
 
-    :param list colors: List of BGR colors or smoothed frames.
+    Each color is a one pixel wide ring, the first color at the center and the last one at the edge. The image is
+    computed directly at its final size: every pixel is colored from a radial profile of the rings, averaged over the
+    pixel's radial extent for antialiased edges. Memory is proportional to the image size, and time does not depend
+    on the number of colors.
+
+    :param Union[ColorSequence, list] colors: BGR colors or smoothed frames.
     :param int img_size: The size of the square image (both width and height).
-    :param int scale_factor: The scale factor to use when generating the barcode. Default is 10.
+    :param Optional[int] scale_factor: Deprecated and ignored. Barcodes used to be drawn this many times larger and
+        downsampled, and are now computed at their final size.
     :return: np.ndarray: Circular barcode image (BGRA; converted to RGBA when saving).
     """
-    high_res_img_size = img_size * scale_factor
-
-    # Create an image with an alpha channel (4th channel)
-    barcode_high_res = np.zeros((high_res_img_size, high_res_img_size, 4), dtype=np.uint8)
-    center = high_res_img_size // 2
-
-    # Compute the radius increment
-    total_circles = len(colors)
-    max_radius = center  # The largest circle's radius will be half of the image size
-    radius_increment = max_radius / total_circles
-
-    for idx, color in tqdm(enumerate(colors), desc="Generating Barcode", total=len(colors), unit="it"):
-        radius = (idx + 1) * radius_increment
-
-        # Handle both simple BGR tuples and smoothed frames
-        if isinstance(color, np.ndarray) and color.ndim > 1:
-            # For smoothed frames, take the average BGR color
-            color = np.mean(color, axis=(0, 1)).astype(int)
-
-        # Colors are BGR throughout the pipeline; draw directly in BGR
-        bgr_color = color
-
-        cv2.circle(
-            barcode_high_res,
-            (center, center),
-            int(radius),
-            tuple(map(int, bgr_color)) + (255,),
-            thickness=scale_factor,
-        )
-
-    # Down-sample to the desired resolution with antialiasing
-    barcode = cv2.resize(barcode_high_res, (img_size, img_size), interpolation=cv2.INTER_AREA)
+    if scale_factor is not None:
+        logging.warning("The scale_factor argument of generate_circular_barcode is deprecated and has no effect.")
+
+    barcode = np.zeros((img_size, img_size, 4), dtype=np.uint8)
+    top = 0
+    for strip in iter_circular_barcode_strips(colors, img_size):
+        barcode[top : top + len(strip)] = strip
+        top += len(strip)
     return barcode
 
 
+def iter_circular_barcode_strips(colors: Union[ColorSequence, list], img_size: int) -> Iterator[np.ndarray]:
+    """
+    Generate a circular barcode strip by strip, from top to bottom, holding about STRIP_BYTES at a time.
+
+    See generate_circular_barcode, which assembles these strips.
+
+    :param Union[ColorSequence, list] colors: BGR colors or smoothed frames.
+    :param int img_size: The size of the square image (both width and height).
+    :return: Iterator over BGRA strips of shape (rows, img_size, 4).
+    """
+    # Radius, profile indices and averaged BGRA of every pixel of a strip
+    strip_rows = _strip_rows(img_size, 160)
+
+    # For smoothed frames, each ring takes the average BGR color of the frame
+    ring_colors = ColorSequence.from_colors(colors).mean_colors().astype(int)
+    total_circles = len(ring_colors)
+    if total_circles == 0:
+        for top in range(0, img_size, strip_rows):
+            yield np.zeros((min(strip_rows, img_size - top), img_size, 4), dtype=np.uint8)
+        return
+
+    center = img_size / 2
+    radius_increment = center / total_circles  # The largest circle's radius will be half of the image size
+
+    # Radial BGRA profile, sampled CIRCULAR_PROFILE_SAMPLES times per pixel: ring i spans CIRCULAR_RING_HALF_WIDTH
+    # on both sides of its radius (i + 1) * radius_increment, and outer rings are drawn over inner ones
+    samples = CIRCULAR_PROFILE_SAMPLES
+    radii = (np.arange(int(np.ceil((center + 1) * samples))) + 0.5) / samples
+    ring = np.floor((radii + CIRCULAR_RING_HALF_WIDTH) / radius_increment).astype(np.int64) - 1
+    ring = np.minimum(ring, total_circles - 1)
+    covered = (ring >= 0) & ((ring + 1) * radius_increment + CIRCULAR_RING_HALF_WIDTH >= radii)
+    profile = np.zeros((len(radii), 4))
+    profile[covered, :3] = ring_colors[ring[covered]]
+    profile[covered, 3] = 255
+
+    # Prefix sums give the average of the profile over any radial interval in constant time
+    cumulative = np.concatenate([np.zeros((1, 4)), np.cumsum(profile, axis=0)])
+
+    # Colors are BGR throughout the pipeline; draw directly in BGR
+    x = np.arange(img_size) + 0.5 - center
+    for top in range(0, img_size, strip_rows):
+        y = np.arange(top, min(top + strip_rows, img_size)) + 0.5 - center
+        radius = np.hypot(y[:, np.newaxis], x[np.newaxis, :])
+        low = np.clip(np.rint((radius - 0.5) * samples), 0, len(radii)).astype(np.intp)
+        high = np.clip(np.rint((radius + 0.5) * samples), 0, len(radii)).astype(np.intp)
+        average = (cumulative[high] - cumulative[low]) / np.maximum(high - low, 1)[..., np.newaxis]
+        yield np.rint(average).astype(np.uint8)
+
+
 def generate_barcode(
-    colors: list, frame_height: int, frame_count: int, frame_width: Optional[int] = None
+    colors: Union[ColorSequence, list],
+    frame_height: int,
+    frame_count: int,
+    frame_width: Optional[int] = None,
+    frame_indices: Optional[Sequence[int]] = None,
 ) -> np.ndarray:
     """
     Generate a barcode image based on dominant colors or smoothed frames of video frames.
     Colors are treated as BGR internally and converted to RGB once at save-time.
-    :param list colors: List of dominant BGR colors or smoothed frames from video frames.
+    :param Union[ColorSequence, list] colors: Dominant BGR colors or smoothed frames from video frames.
     :param int frame_height: The height of the barcode image.
     :param int frame_count: The total number of frames in the video.
     :param Optional[int] frame_width: The width of the barcode image. If not specified, defaults to frame_count.
+    :param Optional[Sequence[int]] frame_indices: Index of the frame each color comes from. When given, each color is
+        placed at its position in the video and spans the columns up to the next color, which keeps unevenly spaced
+        samples (e.g. keyframes) in place.
     :return: np.ndarray: A barcode image (BGR).
     """
     if frame_width is None:
         frame_width = frame_count
 
+    colors = ColorSequence.from_colors(colors)
+    sampled_colors = _sample_columns(colors, frame_count, frame_width, frame_indices)
+    columns = len(sampled_colors)
+
+    # Keep BGR internally; perform RGB conversion once at save-time
+    if colors.is_columns and columns > 0:
+        # For smoothed frames: stack the columns side by side and stretch them to the barcode height in one resize
+        stack = np.ascontiguousarray(sampled_colors[:, :, 0, :].transpose(1, 0, 2))
+        if columns == frame_width:
+            return cv2.resize(stack, (columns, frame_height))
+        barcode = np.zeros((frame_height, frame_width, 3), dtype=np.uint8)
+        barcode[:, :columns] = cv2.resize(stack, (columns, frame_height))
+        return barcode
+
+    # For single color values: broadcast the row of colors down the barcode height
     barcode = np.zeros((frame_height, frame_width, 3), dtype=np.uint8)
+    barcode[:, :columns] = sampled_colors[np.newaxis]
+    return barcode
 
-    step = max(1, len(colors) // frame_width)
-    sampled_colors = [colors[i] for i in range(0, len(colors), step)]
-    for i, color in tqdm(enumerate(sampled_colors), desc="Generating Barcode", total=len(sampled_colors), unit="it"):
-        if i < frame_width:
-            if isinstance(color, np.ndarray) and color.ndim == 3 and color.shape[1] == 1:
-                # For smoothed frames
-                color_column = cv2.resize(color, (1, frame_height))
-            else:
-                # For single color values
-                color_column = np.full((frame_height, 1, 3), color, dtype=np.uint8)
 
-            # Keep BGR internally; perform RGB conversion once at save-time
-            barcode[:, i] = color_column.reshape(frame_height, 3)
+def iter_barcode_strips(
+    colors: Union[ColorSequence, list],
+    frame_height: int,
+    frame_count: int,
+    frame_width: Optional[int] = None,
+    frame_indices: Optional[Sequence[int]] = None,
+) -> Iterator[np.ndarray]:
+    """
+    Generate a horizontal barcode strip by strip, from top to bottom, holding about STRIP_BYTES at a time.
 
-    return barcode
+    This renders the same image as generate_barcode, without ever allocating it whole. Smoothed frame columns are
+    stretched to the barcode height with linear interpolation computed per strip, which may differ by one level from
+    the cv2.resize used by generate_barcode.
+
+    :param Union[ColorSequence, list] colors: Dominant BGR colors or smoothed frames from video frames.
+    :param int frame_height: The height of the barcode image.
+    :param int frame_count: The total number of frames in the video.
+    :param Optional[int] frame_width: The width of the barcode image. If not specified, defaults to frame_count.
+    :param Optional[Sequence[int]] frame_indices: Index of the frame each color comes from (see generate_barcode).
+    :return: Iterator over BGR strips of shape (rows, frame_width, 3).
+    """
+    if frame_width is None:
+        frame_width = frame_count
+
+    colors = ColorSequence.from_colors(colors)
+    sampled_colors = _sample_columns(colors, frame_count, frame_width, frame_indices)
+    columns = len(sampled_colors)
+    # Interpolated float32 columns, then the uint8 strip
+    strip_rows = _strip_rows(frame_width, 48)
+
+    if colors.is_columns and columns > 0:
+        # Source row of each barcode row, with the pixel center convention of cv2.resize
+        stack = sampled_colors[:, :, 0, :].transpose(1, 0, 2)
+        source_height = stack.shape[0]
+        scale = source_height / frame_height
+    else:
+        row = np.zeros((frame_width, 3), dtype=np.uint8)
+        row[:columns] = sampled_colors
+
+    for top in range(0, frame_height, strip_rows):
+        rows = min(strip_rows, frame_height - top)
+        if not colors.is_columns or columns == 0:
+            yield np.broadcast_to(row, (rows, frame_width, 3))
+            continue
+
+        source_rows = np.clip((np.arange(top, top + rows) + 0.5) * scale - 0.5, 0, source_height - 1)
+        upper = np.floor(source_rows).astype(np.intp)
+        lower = np.minimum(upper + 1, source_height - 1)
+        weights = (source_rows - upper).astype(np.float32)[:, np.newaxis, np.newaxis]
+        stretched = stack[upper] * (1 - weights) + stack[lower] * weights
+
+        strip = np.zeros((rows, frame_width, 3), dtype=np.uint8)
+        strip[:, :columns] = np.rint(stretched)
+        yield strip
+
+
+def _sample_columns(
+    colors: ColorSequence, frame_count: int, frame_width: int, frame_indices: Optional[Sequence[int]]
+) -> np.ndarray:
+    """
+    Select the color of each column of a horizontal barcode.
+
+    :param ColorSequence colors: Dominant BGR colors or smoothed frames from video frames.
+    :param int frame_count: The total number of frames in the video.
+    :param int frame_width: The width of the barcode image.
+    :param Optional[Sequence[int]] frame_indices: Index of the frame each color comes from (see generate_barcode).
+    :return: np.ndarray: The colors of the columns, at most frame_width of them.
+    """
+    if frame_indices is not None and len(colors) > 0:
+        # Column of each sample, then for every column the last sample starting at or before it
+        sample_columns = np.asarray(frame_indices, dtype=np.int64) * frame_width // max(1, frame_count)
+        column_samples = np.searchsorted(sample_columns, np.arange(frame_width), side="right") - 1
+        return colors.colors[np.clip(column_samples, 0, len(colors) - 1)]
+    # More colors than columns are averaged down to one per column, rather than keeping every n-th color
+    return area_resample(colors, frame_width).colors
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import logging
+import os
+import zipfile
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .color_sequence import (
+    ColorSequence,
+    area_resample,
+    build_color_pyramid,
+    save_npz_atomically,
+    select_pyramid_level,
+)
+from .video_processing import sample_frame_indices
+
+# Default maximum total size of a cache directory, in bytes
+DEFAULT_CACHE_SIZE = 2 * 1024 * 1024 * 1024
+CACHE_VERSION = 4
+
+
+class ColorCache:
+    """
+    On-disk cache of extracted colors, so that a video is decoded once and can then be rendered any number of times.
+
+    Each entry is the ColorSequence extracted from a video with one method, with its pyramid of averaged colors (see
+    build_color_pyramid), stored as an uncompressed .npz file next to a .json file describing it.
+
+    Entries are keyed by the video (absolute path, size and modification time, so a replaced file is not matched), the
+    method, whether samples were snapped to keyframes, the analysis resolution and the decoder, as ffmpeg and OpenCV
+    downscale frames to slightly different colors. The number of samples is not part of the key: an entry serves any
+    request for at most as many samples as its extraction was asked for, reading only the smallest pyramid level with
+    enough colors and averaging it down to the number of samples.
+
+    When the cache grows over its maximum size, the least recently used entries are deleted.
+    """
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_CACHE_SIZE) -> None:
+        """
+        :param str directory: The cache directory, created if needed.
+        :param int max_size: Maximum total size of the cache entries, in bytes.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def key(
+        self,
+        video_path: str,
+        method: str,
+        sampling: str,
+        analysis_resolution: Optional[Tuple[int, int]],
+        decoder: str = "opencv",
+    ) -> str:
+        """
+        Returns the key of the entry for a video and extraction parameters.
+
+        :param str video_path: The path to the video file.
+        :param str method: The color extraction method.
+        :param str sampling: The sampling strategy. Only 'keyframes' gives different colors from the others.
+        :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames were downscaled to, if any.
+        :param str decoder: The video decoder, 'opencv' or 'ffmpeg'. Defaults to 'opencv'.
+        :return: str: Hexadecimal key.
+        """
+        stat = os.stat(video_path)
+        description = {
+            "version": CACHE_VERSION,
+            "path": os.path.abspath(video_path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "method": method,
+            "keyframes": sampling == "keyframes",
+            "analysis_resolution": list(analysis_resolution) if analysis_resolution else None,
+            "decoder": decoder,
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def load(
+        self,
+        video_path: str,
+        method: str,
+        sampling: str,
+        analysis_resolution: Optional[Tuple[int, int]],
+        frame_count: int,
+        samples: int,
+        decoder: str = "opencv",
+    ) -> Optional[ColorSequence]:
+        """
+        Load the colors of a video from the cache, resampled to the requested number of samples.
+
+        Evenly sampled colors are averaged down from the nearest pyramid level. Keyframe colors are unevenly spaced,
+        so the keyframe nearest to each requested frame is kept instead.
+
+        :param str video_path: The path to the video file.
+        :param str method: The color extraction method.
+        :param str sampling: The sampling strategy.
+        :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames are downscaled to, if any.
+        :param int frame_count: The total number of frames in the video.
+        :param int samples: The number of samples requested.
+        :param str decoder: The video decoder, 'opencv' or 'ffmpeg'. Defaults to 'opencv'.
+        :return: Optional[ColorSequence]: The cached colors, or None if there is no entry extracted for at least as
+            many samples.
+        """
+        data_path = self._data_path(self.key(video_path, method, sampling, analysis_resolution, decoder))
+        try:
+            # Members of an .npz file are read on access, so only the selected level is loaded
+            with np.load(data_path) as data:
+                lengths = data["level_lengths"]
+                # Keyframe snapping and short decodes give fewer colors than requested, so entries are matched on the
+                # number of samples their extraction was asked for
+                if int(data["requested_samples"]) < samples:
+                    return None
+                level = 0 if sampling == "keyframes" else select_pyramid_level(lengths, samples)
+                prefix = f"level_{level}/" if level else ""
+                colors = ColorSequence(
+                    data[prefix + "colors"],
+                    data[prefix + "frame_indices"],
+                    data[prefix + "timestamps"] if prefix + "timestamps" in data else None,
+                )
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+
+        # Mark the entry as recently used
+        os.utime(data_path)
+        if sampling == "keyframes":
+            return resample_colors(colors, frame_count, samples)
+        return area_resample(colors, samples, 2**level, int(lengths[0]))
+
+    def store(
+        self,
+        video_path: str,
+        method: str,
+        sampling: str,
+        analysis_resolution: Optional[Tuple[int, int]],
+        colors: ColorSequence,
+        samples: Optional[int] = None,
+        decoder: str = "opencv",
+    ) -> None:
+        """
+        Store the colors of a video in the cache, replacing any previous entry, then evict old entries.
+
+        :param str video_path: The path to the video file.
+        :param str method: The color extraction method.
+        :param str sampling: The sampling strategy.
+        :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames were downscaled to, if any.
+        :param ColorSequence colors: The extracted colors, with their frame indices.
+        :param Optional[int] samples: The number of samples the extraction was asked for, which may be more than the
+            number of colors. Defaults to the number of colors.
+        :param str decoder: The video decoder, 'opencv' or 'ffmpeg'. Defaults to 'opencv'.
+        :return: None
+        :raises ValueError: If the colors have no frame indices.
+        """
+        if colors.frame_indices is None:
+            raise ValueError("Only colors with frame indices can be cached.")
+
+        key = self.key(video_path, method, sampling, analysis_resolution, decoder)
+        if samples is None:
+            samples = len(colors)
+        levels = build_color_pyramid(colors)
+        arrays = {
+            "level_lengths": np.array([len(level_colors) for level_colors in levels]),
+            "requested_samples": np.array(samples),
+        }
+        for level, level_colors in enumerate(levels):
+            prefix = f"level_{level}/" if level else ""
+            arrays[prefix + "colors"] = level_colors.colors
+            arrays[prefix + "frame_indices"] = level_colors.frame_indices
+            if level_colors.timestamps is not None:
+                arrays[prefix + "timestamps"] = level_colors.timestamps
+
+        save_npz_atomically(self._data_path(key), arrays)
+
+        metadata = {
+            "video_path": os.path.abspath(video_path),
+            "method": method,
+            "sampling": sampling,
+            "analysis_resolution": list(analysis_resolution) if analysis_resolution else None,
+            "decoder": decoder,
+            "samples": len(colors),
+            "requested_samples": samples,
+            "shape": list(colors.colors.shape[1:]),
+        }
+        with open(os.path.join(self.directory, key + ".json"), "w", encoding="utf-8") as file:
+            json.dump(metadata, file)
+
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Delete the least recently used entries until the cache fits in its maximum size.
+
+        :return: None
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name[: -len(".npz")]))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            logging.debug("Evicting color cache entry %s", key)
+            for extension in (".npz", ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, key + extension))
+                except FileNotFoundError:
+                    pass
+            total_size -= size
+
+    def _data_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".npz")
+
+
+def resample_colors(colors: ColorSequence, frame_count: int, samples: int) -> ColorSequence:
+    """
+    Select the cached colors closest to the frames a new extraction of that many samples would use.
+
+    :param ColorSequence colors: Cached colors, with their frame indices in increasing order.
+    :param int frame_count: The total number of frames in the video.
+    :param int samples: The number of samples requested, at most len(colors).
+    :return: ColorSequence: The selected colors, with their frame indices and timestamps.
+    """
+    if samples >= len(colors):
+        return colors
+
+    targets = np.asarray(sample_frame_indices(0, frame_count - 1, samples))
+    # For each target frame, the cached frame nearest to it
+    positions = np.clip(np.searchsorted(colors.frame_indices, targets), 1, len(colors) - 1)
+    previous_closer = targets - colors.frame_indices[positions - 1] <= colors.frame_indices[positions] - targets
+    positions = positions - previous_closer
+    return ColorSequence(
+        colors.colors[positions],
+        colors.frame_indices[positions],
+        None if colors.timestamps is None else colors.timestamps[positions],
+    )
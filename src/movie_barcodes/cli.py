@@ -1,24 +1,51 @@
 import argparse
+import json
 import logging
 import sys
 import time
 
-from typing import Callable
+from typing import Any, Callable, Dict, List, Optional
 from os import cpu_count, path
 
-from .barcode_generation import generate_circular_barcode, generate_barcode
+from .barcode_generation import (
+    generate_circular_barcode,
+    generate_barcode,
+    iter_barcode_strips,
+    iter_circular_barcode_strips,
+)
+from .cache import DEFAULT_CACHE_SIZE, ColorCache, resample_colors
+from .color_sequence import ColorSequence, area_resample, load_color_file, save_color_file
+from .cpu_budget import available_cpus, limit_threads
+from .frame_index import FrameIndex, load_frame_index
 
 from .utility import (
+    DEFAULT_PNG_COMPRESSION,
+    chunk_size_in_frames,
     save_barcode_image,
+    save_barcode_strips,
+    use_streaming,
     get_dominant_color_function,
     format_time,
     get_video_properties,
+    list_batch_videos,
+    parse_chunk_size,
+    resolve_output_path,
+    parse_resolution,
     validate_args,
 )
-from .video_processing import load_video, extract_colors, parallel_extract_colors
+from .video_processing import (
+    ExtractionPool,
+    batch_extract_colors_multi,
+    frame_timestamps,
+    load_video,
+    extract_colors_multi,
+    parallel_extract_colors_multi,
+)
 
-MAX_PROCESSES = cpu_count() or 1
+# CPUs granted to this process by its affinity mask and cgroup CPU quota, rather than those of the machine
+MAX_PROCESSES = available_cpus()
 MIN_FRAME_COUNT = 2
+METHODS = ["avg", "hsv", "bgr", "kmeans", "smoothed"]
 
 
 def generate_and_save_barcode(args: argparse.Namespace, dominant_color_function: Callable, method: str) -> None:
@@ -30,53 +57,89 @@ def generate_and_save_barcode(args: argparse.Namespace, dominant_color_function:
     :param method: The method used to extract the dominant color
     :return: None
     """
+    generate_and_save_barcodes(args, {method: dominant_color_function})
+
+
+def generate_and_save_barcodes(
+    args: argparse.Namespace,
+    dominant_color_functions: Dict[str, Callable],
+    pool: Optional[ExtractionPool] = None,
+    frame_index: Optional[FrameIndex] = None,
+) -> None:
+    """
+    Generate and save one barcode image per method, decoding the video at most once.
+
+    :param args: argparse.Namespace object containing the command-line arguments
+    :param dominant_color_functions: Mapping of method name to the function extracting the dominant color from a frame
+    :param pool: Optional open worker pool, reused across videos instead of starting one per video
+    :param frame_index: Optional index of the video, loaded from --index_dir if not provided
+    :return: None
+    """
     start_time = time.time()
 
     # Get Video Properties
-    video, frame_count, frame_width, frame_height = load_video(args.input_video_path)
-    _, _, video_duration, video_size = get_video_properties(video, args)
-
-    # If the user specifies the 'workers' argument
-    if args.workers is not None:
-        if args.workers == 1:
-            # If the user explicitly sets 'workers' to 1, use sequential processing
-            colors = extract_colors(
-                args.input_video_path,
-                0,
-                frame_count - 1,
-                dominant_color_function,
-                args.width,
-            )
-        else:
-            # Perform parallel processing with the user-specified number of workers
-            colors = parallel_extract_colors(
+    if frame_index is None:
+        frame_index = load_index(args, args.input_video_path)
+    video, frame_count, frame_width, frame_height = load_video(args.input_video_path, frame_index)
+    _, fps, video_duration, video_size = get_video_properties(video, args)
+
+    sampling = "keyframes" if args.fast else args.sampling
+    # One column per sampled frame
+    barcode_width = args.width if args.width is not None else frame_count
+
+    # Colors already extracted with the same parameters are loaded from the cache, if enabled
+    cache = ColorCache(args.cache_dir, args.cache_size * 1024 * 1024) if args.cache_dir else None
+    colors_by_method: Dict[str, ColorSequence] = {}
+    if cache is not None:
+        for method in dominant_color_functions:
+            cached_colors = cache.load(
                 args.input_video_path,
+                method,
+                sampling,
+                args.analysis_resolution,
                 frame_count,
-                dominant_color_function,
-                args.workers,
-                args.width,
+                barcode_width,
+                args.decoder,
             )
-    else:
-        # If 'workers' is not specified, use the maximum number of available CPU cores
-        colors = parallel_extract_colors(
-            args.input_video_path,
-            frame_count,
-            dominant_color_function,
-            MAX_PROCESSES,
-            args.width,
+            if cached_colors is not None:
+                colors_by_method[method] = cached_colors
+    cached_methods = list(colors_by_method)
+    missing_functions = {
+        method: function for method, function in dominant_color_functions.items() if method not in colors_by_method
+    }
+
+    frames_decoded = 0
+    if missing_functions:
+        extracted_colors, frame_indices = extract_colors_by_method(
+            args, missing_functions, frame_count, fps, pool, frame_index
         )
+        frames_decoded = len(frame_indices)
 
-    # Generate the appropriate type of barcode
-    if args.barcode_type == "circular":
-        barcode = generate_circular_barcode(colors, frame_width)
-    else:
-        # Use the specified height if provided, otherwise use the video frame height
-        barcode_height = args.height if args.height is not None else frame_height
-        barcode = generate_barcode(colors, barcode_height, frame_count, args.width)
+        # Store each method's colors compactly, with the frame and time they come from
+        timestamps = frame_timestamps(frame_indices, fps, frame_index)
+        for method, colors in extracted_colors.items():
+            colors_by_method[method] = ColorSequence.from_colors(colors, frame_indices, timestamps)
+            if cache is not None:
+                cache.store(
+                    args.input_video_path,
+                    method,
+                    sampling,
+                    args.analysis_resolution,
+                    colors_by_method[method],
+                    barcode_width,
+                    args.decoder,
+                )
 
     base_name = path.basename(args.input_video_path)
     file_name_without_extension = path.splitext(base_name)[0]
-    save_barcode_image(barcode, file_name_without_extension, args, method)
+    save_barcodes(
+        args,
+        {method: colors_by_method[method] for method in dominant_color_functions},
+        frame_count,
+        frame_width,
+        frame_height,
+        file_name_without_extension,
+    )
 
     # Calculate processing time
     end_time = time.time()
@@ -84,7 +147,15 @@ def generate_and_save_barcode(args: argparse.Namespace, dominant_color_function:
 
     # Log the information
     logging.info("Processed File: %s", file_name_without_extension)
+    logging.info("Methods: %s", ", ".join(colors_by_method))
     logging.info("Number of Frames: %d", frame_count)
+    logging.info("Sampling: %s (%d frames decoded)", sampling, frames_decoded)
+    if cache is not None:
+        logging.info("Cached Methods: %s", ", ".join(cached_methods) or "none")
+    if args.analysis_resolution is not None:
+        logging.info("Analysis Resolution: %dx%d", *args.analysis_resolution)
+    else:
+        logging.info("Analysis Resolution: full frame")
     logging.info("Video Duration: %s", format_time(video_duration))
     logging.info("Video Size: %.2f MB", video_size / (1024 * 1024))
     logging.info("Processing Time: %s", format_time(processing_time))
@@ -92,22 +163,210 @@ def generate_and_save_barcode(args: argparse.Namespace, dominant_color_function:
     video.release()
 
 
-def main() -> None:
+def save_barcodes(
+    args: argparse.Namespace,
+    colors_by_method: Dict[str, ColorSequence],
+    frame_count: int,
+    frame_width: int,
+    frame_height: int,
+    base_name: str,
+) -> None:
     """
-    Main function to generate a barcode from a video file.
+    Render and save the barcode of each method from the colors extracted from a video.
+
+    :param args: argparse.Namespace object containing the command-line arguments
+    :param colors_by_method: Mapping of method name to the colors extracted with it
+    :param frame_count: The total number of frames in the video
+    :param frame_width: The width of the video frames, used as the size of circular barcodes
+    :param frame_height: The height of the video frames, used as the default height of horizontal barcodes
+    :param base_name: The base name of the files to save
+    :return: None
     """
-    # Logging configuration
-    logging.basicConfig(
-        stream=sys.stdout,
-        level=logging.INFO,
-        format="%(asctime)s - %(message)s",
+    sampling = "keyframes" if args.fast else args.sampling
+    # Use the specified size if provided, otherwise the video frame height and one column per frame
+    barcode_width = args.width if args.width is not None else frame_count
+    barcode_height = args.height if args.height is not None else frame_height
+
+    for method, colors in colors_by_method.items():
+        # Keyframes are unevenly spaced, so place each color at the position of the frame it comes from
+        column_indices = colors.frame_indices if sampling == "keyframes" else None
+        # Generate the appropriate type of barcode
+        if args.barcode_type == "circular":
+            if use_streaming(args, frame_width, frame_width):
+                strips = iter_circular_barcode_strips(colors, frame_width)
+                save_barcode_strips(strips, frame_width, frame_width, 4, base_name, args, method)
+                continue
+            barcode = generate_circular_barcode(colors, frame_width)
+        else:
+            if use_streaming(args, barcode_width, barcode_height):
+                # Very large barcodes are written strip by strip instead of being rendered whole
+                strips = iter_barcode_strips(colors, barcode_height, frame_count, barcode_width, column_indices)
+                save_barcode_strips(strips, barcode_width, barcode_height, 3, base_name, args, method)
+                continue
+            barcode = generate_barcode(colors, barcode_height, frame_count, barcode_width, column_indices)
+
+        save_barcode_image(barcode, base_name, args, method)
+
+
+def extract_colors_by_method(
+    args: argparse.Namespace,
+    dominant_color_functions: Dict[str, Callable],
+    frame_count: int,
+    fps: float,
+    pool: Optional[ExtractionPool] = None,
+    frame_index: Optional[FrameIndex] = None,
+) -> tuple:
+    """
+    Extract the colors of the input video with every method, decoding the video only once.
+
+    :param args: argparse.Namespace object containing the command-line arguments
+    :param dominant_color_functions: Mapping of method name to the function extracting the dominant color from a frame
+    :param frame_count: The total number of frames in the video
+    :param fps: The frame rate of the video
+    :param pool: Optional open worker pool, reused across videos instead of starting one per video
+    :param frame_index: Optional index of the video, whose keyframes are used to reach sampled frames
+    :return: Tuple containing the colors by method and the indices of the frames they come from
+    """
+    sampling = "keyframes" if args.fast else args.sampling
+
+    # If the user explicitly sets 'workers' to 1, use sequential processing
+    if args.workers == 1:
+        return extract_colors_multi(
+            args.input_video_path,
+            0,
+            frame_count - 1,
+            dominant_color_functions,
+            args.width,
+            sampling,
+            return_indices=True,
+            analysis_resolution=args.analysis_resolution,
+            frame_index=frame_index,
+            decoder=args.decoder,
+        )
+
+    # Otherwise use the user-specified number of workers or all available CPU cores
+    return parallel_extract_colors_multi(
+        args.input_video_path,
+        frame_count,
+        dominant_color_functions,
+        args.workers if args.workers is not None else MAX_PROCESSES,
+        args.width,
+        sampling,
+        return_indices=True,
+        analysis_resolution=args.analysis_resolution,
+        executor=args.executor,
+        chunk_size=chunk_size_in_frames(args.chunk_size, fps),
+        pool=pool,
+        frame_index=frame_index,
+        decoder=args.decoder,
     )
-    header_msg = "=" * 40 + " NEW RUN " + "=" * 40
-    logging.info("%s", header_msg)
 
-    # Argument parser setup
-    parser = argparse.ArgumentParser(description="Generate a color barcode from a video file.")
-    parser.add_argument("-i", "--input_video_path", type=str, required=True, help="Path to the video file.")
+
+def load_index(args: argparse.Namespace, video_path: str) -> Optional[FrameIndex]:
+    """
+    Load the frame index of a video from the index directory, indexing the video the first time.
+
+    :param args: argparse.Namespace object containing the command-line arguments
+    :param video_path: The path to the video file
+    :return: The index of the video, or None if no index directory is set
+    """
+    return load_frame_index(video_path, args.index_dir) if args.index_dir else None
+
+
+def add_extraction_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the arguments controlling how colors are extracted from a video.
+
+    :param parser: The parser to add the arguments to
+    :return: None
+    """
+    parser.add_argument(
+        "-m",
+        "--method",
+        choices=METHODS,
+        default="avg",
+        help="Method to extract dominant color: avg (average), kmeans (K-Means clustering), hsv (HSV histogram), "
+        ",bgr (BGR histogram) or smoothed version (averaging the colors with two-step resize). Default is avg.",
+    )
+    parser.add_argument(
+        "-a",
+        "--all_methods",
+        action="store_true",
+        help="If provided, all methods to extract dominant color will be used. Overrides --method argument.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of workers for parallel processing. Default behavior uses all available CPU cores. Setting this "
+        "to 1 will use sequential processing.",
+    )
+    parser.add_argument(
+        "-e",
+        "--executor",
+        choices=["process", "thread"],
+        default="process",
+        help="How parallel workers run: process (one process per worker) or thread (a decoder and an extractor thread "
+        "per worker, sharing memory). Default is process.",
+    )
+    parser.add_argument(
+        "-c",
+        "--chunk_size",
+        type=parse_chunk_size,
+        default=None,
+        help="Size of the chunks of video handed to parallel workers, in frames (e.g. 500) or seconds (e.g. 30s). "
+        "Idle workers pick the next pending chunk. Default is 4 chunks per worker.",
+    )
+    parser.add_argument(
+        "-s",
+        "--sampling",
+        choices=["auto", "grab", "seek", "keyframes"],
+        default="auto",
+        help="How to reach sampled frames: grab (decode every frame in between), seek (jump to each sampled frame), "
+        "auto (seek only over large gaps) or keyframes (only decode the keyframe nearest to each sample). Default is "
+        "auto.",
+    )
+    parser.add_argument(
+        "-f",
+        "--fast",
+        action="store_true",
+        help="Fast preview mode: only decode keyframes. Same as --sampling keyframes.",
+    )
+    parser.add_argument(
+        "-r",
+        "--analysis_resolution",
+        type=parse_resolution,
+        default=None,
+        help="Resolution (WIDTHxHEIGHT, e.g. 160x90) frames are downscaled to before extracting colors. Much faster "
+        "on high resolution videos. Default is the full frame.",
+    )
+    parser.add_argument(
+        "--index_dir",
+        type=str,
+        default=None,
+        help="Directory to store frame indexes in. The first run on a video scans all its frames once to record their "
+        "exact count, timestamps and keyframes; later runs use the stored index to sample the real frames and seek "
+        "only when it saves decoding. Disabled by default.",
+    )
+    parser.add_argument(
+        "--decoder",
+        type=str,
+        choices=["opencv", "ffmpeg"],
+        default="opencv",
+        help="Video decoder. 'ffmpeg' pipes frames from an ffmpeg process that seeks, drops unsampled frames and "
+        "downscales to the analysis resolution before they reach Python (requires the ffmpeg executable). "
+        "Default is opencv.",
+    )
+
+
+def add_output_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the arguments controlling the type, name and encoding of the barcode images.
+
+    :param parser: The parser to add the arguments to
+    :return: None
+    """
     parser.add_argument(
         "-d",
         "--destination_path",
@@ -116,6 +375,14 @@ def main() -> None:
         help="Path to save the output image. If not provided, the image will be saved in a default location.",
         default=None,
     )
+    parser.add_argument(
+        "-n",
+        "--output_name",
+        type=str,
+        nargs="?",
+        help="Custom name for the output barcode image. If not provided, a name will be automatically generated.",
+        default=None,
+    )
     parser.add_argument(
         "-t",
         "--barcode_type",
@@ -123,22 +390,410 @@ def main() -> None:
         default="horizontal",
         help="Type of barcode to generate: horizontal or circular. Default is horizontal.",
     )
+    add_encoding_arguments(parser)
+
+
+def add_encoding_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the arguments controlling how the barcode images are encoded.
+
+    :param parser: The parser to add the arguments to
+    :return: None
+    """
+    parser.add_argument(
+        "--png_compression",
+        type=int,
+        choices=range(10),
+        metavar="{0-9}",
+        default=DEFAULT_PNG_COMPRESSION,
+        help="zlib compression level of PNG outputs, from 0 (fastest, largest) to 9 (slowest, smallest). Defaults to "
+        f"{DEFAULT_PNG_COMPRESSION}.",
+    )
+    parser.add_argument(
+        "--quality",
+        type=int,
+        choices=range(1, 101),
+        metavar="{1-100}",
+        default=None,
+        help="Quality of JPEG and WebP outputs. Defaults to 95 for JPEG. WebP outputs are lossless unless a quality is "
+        "provided.",
+    )
+    parser.add_argument(
+        "--lossless",
+        action="store_true",
+        help="If provided, WebP outputs are compressed losslessly, even if --quality is provided.",
+    )
+
+
+def extract_main(argv: List[str]) -> None:
+    """
+    Extract the colors of a video once and save them to a color file, to be rendered later with the render command.
+
+    :param argv: The command-line arguments following 'extract'
+    :return: None
+    """
+    parser = argparse.ArgumentParser(
+        prog="movie-barcodes extract", description="Extract the colors of a video file to a color file."
+    )
+    parser.add_argument("-i", "--input_video_path", type=str, required=True, help="Path to the video file.")
+    parser.add_argument(
+        "-d",
+        "--destination_path",
+        type=str,
+        default=None,
+        help="Path to save the color file. If not provided, it is saved next to the video as <video name>.colors.npz.",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=None,
+        help="Sample one frame every INTERVAL milliseconds. If not provided, every frame is sampled.",
+    )
+    add_extraction_arguments(parser)
+    # Checked by validate_args, but chosen at render time
+    parser.set_defaults(width=None, height=None)
+    args = parser.parse_args(argv)
+
+    start_time = time.time()
+    frame_index = load_index(args, args.input_video_path)
+    video, frame_count, frame_width, frame_height = load_video(args.input_video_path, frame_index)
+    _, fps, video_duration, _ = get_video_properties(video, args)
+    video.release()
+    validate_args(args, frame_count, MAX_PROCESSES, MIN_FRAME_COUNT)
+    if args.interval is not None:
+        if args.interval <= 0:
+            raise ValueError("Interval must be greater than 0.")
+        # One sample per interval, and at least two so that the first and last frames are covered
+        args.width = min(frame_count, max(MIN_FRAME_COUNT, int(video_duration * 1000 / args.interval) + 1))
+
+    methods = METHODS if args.all_methods else [args.method]
+    dominant_color_functions = {method: get_dominant_color_function(method) for method in methods}
+    extracted_colors, frame_indices = extract_colors_by_method(
+        args, dominant_color_functions, frame_count, fps, frame_index=frame_index
+    )
+    timestamps = frame_timestamps(frame_indices, fps, frame_index)
+    colors_by_method = {
+        method: ColorSequence.from_colors(colors, frame_indices, timestamps)
+        for method, colors in extracted_colors.items()
+    }
+
+    destination_path = args.destination_path or path.splitext(args.input_video_path)[0] + ".colors.npz"
+    metadata = {
+        "video_name": path.splitext(path.basename(args.input_video_path))[0],
+        "frame_count": frame_count,
+        "frame_width": frame_width,
+        "frame_height": frame_height,
+        "fps": fps,
+        "sampling": "keyframes" if args.fast else args.sampling,
+        "analysis_resolution": list(args.analysis_resolution) if args.analysis_resolution else None,
+    }
+    save_color_file(destination_path, colors_by_method, metadata)
+
+    logging.info("Processed File: %s", metadata["video_name"])
+    logging.info("Methods: %s", ", ".join(colors_by_method))
+    logging.info("Number of Frames: %d (%d sampled)", frame_count, len(frame_indices))
+    logging.info("Processing Time: %s", format_time(time.time() - start_time))
+    logging.info("Colors saved at '%s'", destination_path)
+
+
+def render_main(argv: List[str]) -> None:
+    """
+    Render barcodes of any type and size from a color file written by the extract command, without decoding the
+    video again.
+
+    :param argv: The command-line arguments following 'render'
+    :return: None
+    """
+    parser = argparse.ArgumentParser(
+        prog="movie-barcodes render", description="Generate color barcodes from a color file."
+    )
+    parser.add_argument("-i", "--input_path", type=str, required=True, help="Path to the color file.")
     parser.add_argument(
         "-m",
         "--method",
-        choices=["avg", "kmeans", "hsv", "bgr", "smoothed"],
-        default="avg",
-        help="Method to extract dominant color: avg (average), kmeans (K-Means clustering), hsv (HSV histogram), "
-        ",bgr (BGR histogram) or smoothed version (averaging the colors with two-step resize). Default is avg.",
+        choices=METHODS,
+        default=None,
+        help="Method whose colors are rendered. If not provided, a barcode is generated for every method in the file.",
     )
     parser.add_argument(
-        "-w",
-        "--workers",
+        "--width",
         type=int,
         default=None,
-        help="Number of workers for parallel processing. Default behavior uses all available CPU cores. Setting this "
-        "to 1 will use sequential processing.",
+        help="Width of the output image. Colors are resampled to it. If not provided, the width is the number of "
+        "sampled frames for horizontal barcodes and the video width for circular barcodes.",
+    )
+    parser.add_argument(
+        "--height",
+        type=int,
+        default=None,
+        help="Height of the output image. If not provided, the height will be the same as the video. Circular "
+        "barcodes are squares of the given width, or of this height if no width is given.",
+    )
+    add_output_arguments(parser)
+    # Only used to name output files after extraction runs
+    parser.set_defaults(workers=None)
+    args = parser.parse_args(argv)
+
+    for name in ("width", "height"):
+        value = getattr(args, name)
+        if value is not None and value <= 0:
+            raise ValueError(f"{name.capitalize()} must be greater than 0.")
+
+    colors_by_method, metadata = load_color_file(args.input_path)
+    if args.method is not None:
+        if args.method not in colors_by_method:
+            raise ValueError(f"The color file has no colors for method '{args.method}'.")
+        colors_by_method = {args.method: colors_by_method[args.method]}
+
+    frame_count = metadata["frame_count"]
+    # Keyframes are unevenly spaced: keep the keyframe nearest to each sample, placed at its position in the video
+    keyframes = metadata.get("sampling") == "keyframes"
+    for method, colors in colors_by_method.items():
+        if args.barcode_type == "circular":
+            size = args.width or args.height or metadata["frame_width"]
+            # Rings narrower than half a pixel would not be visible, so at most one color per pixel of the diameter
+            colors = resample_colors(colors, frame_count, size) if keyframes else area_resample(colors, size)
+            if use_streaming(args, size, size):
+                strips = iter_circular_barcode_strips(colors, size)
+                save_barcode_strips(strips, size, size, 4, metadata["video_name"], args, method)
+                continue
+            barcode = generate_circular_barcode(colors, size)
+        else:
+            width = args.width or len(colors)
+            height = args.height or metadata["frame_height"]
+            column_indices = colors.frame_indices
+            if keyframes:
+                colors = resample_colors(colors, frame_count, width)
+                column_indices = colors.frame_indices
+            elif width < len(colors):
+                # One averaged color per column
+                colors = area_resample(colors, width)
+                column_indices = None
+            # Otherwise each color spans the columns up to the next one, which stretches the colors to any width
+            if use_streaming(args, width, height):
+                strips = iter_barcode_strips(colors, height, frame_count, width, column_indices)
+                save_barcode_strips(strips, width, height, 3, metadata["video_name"], args, method)
+                continue
+            barcode = generate_barcode(colors, height, frame_count, width, column_indices)
+
+        save_barcode_image(barcode, metadata["video_name"], args, method)
+
+    logging.info("Rendered File: %s", metadata["video_name"])
+    logging.info("Methods: %s", ", ".join(colors_by_method))
+
+
+def batch_main(argv: List[str]) -> None:
+    """
+    Generate barcodes for a batch of videos, scheduling the chunks of all videos on a shared worker pool, and write a
+    summary report.
+
+    :param argv: The command-line arguments following 'batch'
+    :return: None
+    """
+    parser = argparse.ArgumentParser(
+        prog="movie-barcodes batch", description="Generate color barcodes for a batch of video files."
+    )
+    parser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        required=True,
+        help="Directory of video files, glob pattern (e.g. 'movies/*.mkv') or CSV/JSON manifest of the videos.",
+    )
+    parser.add_argument(
+        "-d",
+        "--destination_path",
+        type=str,
+        default="barcodes",
+        help="Directory to save the barcodes and the report in. Relative paths are relative to the project root. "
+        "Default is barcodes.",
+    )
+    parser.add_argument(
+        "-t",
+        "--barcode_type",
+        choices=["horizontal", "circular"],
+        default="horizontal",
+        help="Type of barcode to generate: horizontal or circular. Default is horizontal.",
     )
+    parser.add_argument(
+        "--format",
+        choices=["png", "jpg", "webp"],
+        default="png",
+        help="Image format of the barcodes. Default is png.",
+    )
+    add_encoding_arguments(parser)
+    add_extraction_arguments(parser)
+    parser.add_argument(
+        "--width",
+        type=int,
+        default=None,
+        help="Width of the output images, capped to the number of frames of each video. If not provided, the width "
+        "is the number of frames of each video.",
+    )
+    parser.add_argument(
+        "--height",
+        type=int,
+        default=None,
+        help="Height of the output images. If not provided, the height of each video.",
+    )
+    parser.add_argument(
+        "--report",
+        type=str,
+        default=None,
+        help="Path of the JSON summary report. Default is batch_report.json in the destination directory.",
+    )
+    args = parser.parse_args(argv)
+
+    start_time = time.time()
+    sampling = "keyframes" if args.fast else args.sampling
+    methods = METHODS if args.all_methods else [args.method]
+    dominant_color_functions = {method: get_dominant_color_function(method) for method in methods}
+    workers = args.workers if args.workers is not None else MAX_PROCESSES
+    if not 1 <= workers <= MAX_PROCESSES:
+        raise ValueError(f"The number of workers must be between 1 and the number of CPU cores ({MAX_PROCESSES}).")
+
+    # Open every video first: invalid ones are reported without stopping the batch
+    entries: List[dict] = []
+    videos: List[dict] = []
+    for video_path, output_name in list_batch_videos(args.input):
+        entry: dict = {"path": video_path, "status": "error", "error": None, "outputs": []}
+        entries.append(entry)
+        try:
+            video_args = argparse.Namespace(**vars(args), input_video_path=video_path)
+            video_args.destination_path = None
+            frame_index = load_index(args, video_path)
+            video, frame_count, frame_width, frame_height = load_video(video_path, frame_index)
+            _, fps, _, _ = get_video_properties(video, video_args)
+            video.release()
+            video_args.width = None if args.width is None else min(args.width, frame_count)
+            validate_args(video_args, frame_count, MAX_PROCESSES, MIN_FRAME_COUNT)
+        except (OSError, ValueError) as e:
+            entry["error"] = str(e)
+            continue
+        entry["frame_count"] = frame_count
+        videos.append(
+            {
+                "entry": entry,
+                "args": video_args,
+                "base_name": output_name or path.splitext(path.basename(video_path))[0],
+                "frame_count": frame_count,
+                "frame_width": frame_width,
+                "frame_height": frame_height,
+                "fps": fps,
+                "frame_index": frame_index,
+            }
+        )
+
+    def save_video_barcodes(video: dict, extracted_colors: Dict[str, Any], frame_indices: List[int]) -> None:
+        timestamps = frame_timestamps(frame_indices, video["fps"], video["frame_index"])
+        video["entry"]["frames_decoded"] = len(frame_indices)
+        try:
+            for method, colors in extracted_colors.items():
+                method_args = argparse.Namespace(**vars(video["args"]))
+                method_args.destination_path = path.join(
+                    args.destination_path, f"{video['base_name']}_{method}_{args.barcode_type}.{args.format}"
+                )
+                save_barcodes(
+                    method_args,
+                    {method: ColorSequence.from_colors(colors, frame_indices, timestamps)},
+                    video["frame_count"],
+                    video["frame_width"],
+                    video["frame_height"],
+                    video["base_name"],
+                )
+                video["entry"]["outputs"].append(resolve_output_path(method_args.destination_path))
+        except Exception as exc:
+            # A barcode that cannot be written fails its video only
+            video["entry"]["error"] = str(exc)
+            return
+        video["entry"]["status"] = "ok"
+
+    if workers > 1 and args.executor == "process":
+        # All videos share one pool and one chunk scheduler, so that workers never wait for a single video. Chunk
+        # sizes in seconds are converted with the frame rate of each video.
+        chunk_sizes = [chunk_size_in_frames(args.chunk_size, video["fps"]) for video in videos]
+        with ExtractionPool(workers) as pool:
+            for position, extracted_colors, frame_indices, error in batch_extract_colors_multi(
+                [(video["args"].input_video_path, video["frame_count"], video["args"].width) for video in videos],
+                dominant_color_functions,
+                pool,
+                sampling,
+                args.analysis_resolution,
+                chunk_sizes,
+                [video["frame_index"] for video in videos],
+                args.decoder,
+            ):
+                if error is not None:
+                    videos[position]["entry"]["error"] = str(error)
+                    continue
+                save_video_barcodes(videos[position], extracted_colors, frame_indices)
+    else:
+        for video in videos:
+            try:
+                extracted_colors, frame_indices = extract_colors_by_method(
+                    video["args"],
+                    dominant_color_functions,
+                    video["frame_count"],
+                    video["fps"],
+                    frame_index=video["frame_index"],
+                )
+            except Exception as exc:
+                video["entry"]["error"] = str(exc)
+                continue
+            save_video_barcodes(video, extracted_colors, frame_indices)
+
+    succeeded = sum(entry["status"] == "ok" for entry in entries)
+    report = {
+        "videos": entries,
+        "succeeded": succeeded,
+        "failed": len(entries) - succeeded,
+        "processing_time": time.time() - start_time,
+    }
+    report_path = resolve_output_path(args.report or path.join(args.destination_path, "batch_report.json"))
+    with open(report_path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+    logging.info("Processed Files: %d (%d failed)", len(entries), len(entries) - succeeded)
+    for entry in entries:
+        if entry["status"] != "ok":
+            logging.info("Failed: %s (%s)", entry["path"], entry["error"])
+    logging.info("Processing Time: %s", format_time(report["processing_time"]))
+    logging.info("Report saved at '%s'", report_path)
+
+
+def main() -> None:
+    """
+    Main function to generate a barcode from a video file.
+
+    'movie-barcodes extract' and 'movie-barcodes render' split this in two steps: extracting the colors of the video
+    to a file, then rendering barcodes from it any number of times.
+    """
+    # Logging configuration
+    logging.basicConfig(
+        stream=sys.stdout,
+        level=logging.INFO,
+        format="%(asctime)s - %(message)s",
+    )
+    header_msg = "=" * 40 + " NEW RUN " + "=" * 40
+    logging.info("%s", header_msg)
+
+    # Native thread pools start one thread per CPU of the machine, more than a container or an affinity mask grants
+    if MAX_PROCESSES < (cpu_count() or 1):
+        limit_threads(MAX_PROCESSES)
+
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        SUBCOMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
+    # Argument parser setup
+    parser = argparse.ArgumentParser(
+        description="Generate a color barcode from a video file.",
+        epilog="Use 'movie-barcodes extract' and 'movie-barcodes render' to extract the colors of a video once and "
+        "render them many times.",
+    )
+    parser.add_argument("-i", "--input_video_path", type=str, required=True, help="Path to the video file.")
+    add_output_arguments(parser)
+    add_extraction_arguments(parser)
     parser.add_argument(
         "--width",
         type=int,
@@ -152,38 +807,37 @@ def main() -> None:
         help="Height of the output image. If not provided, the height will be the same as the video",
     )
     parser.add_argument(
-        "-n",
-        "--output_name",
+        "--cache_dir",
         type=str,
-        nargs="?",
-        help="Custom name for the output barcode image. If not provided, a name will be automatically generated.",
         default=None,
+        help="Directory to cache extracted colors in. A video is then decoded once per method, sampling and analysis "
+        "resolution, and rendered again with any barcode type, height or smaller width from the cache. Disabled by "
+        "default.",
     )
     parser.add_argument(
-        "-a",
-        "--all_methods",
-        action="store_true",
-        help="If provided, all methods to extract dominant color will be used to create barcodes. Overrides --method "
-        "argument.",
+        "--cache_size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        help="Maximum size of the cache directory in megabytes. The least recently used entries are deleted beyond "
+        "it. Defaults to 2048.",
     )
 
     # Parse arguments
     args = parser.parse_args()
 
     # Validate and process video file
-    _, frame_count, _, _ = load_video(args.input_video_path)
+    frame_index = load_index(args, args.input_video_path)
+    _, frame_count, _, _ = load_video(args.input_video_path, frame_index)
     validate_args(args, frame_count, MAX_PROCESSES, MIN_FRAME_COUNT)
 
     # Choose the method to generate barcode
-    methods = ["avg", "hsv", "bgr", "kmeans", "smoothed"]
-    if args.all_methods:
-        for method in methods:
-            dominant_color_function = get_dominant_color_function(method)
-            generate_and_save_barcode(args, dominant_color_function, method)
-    else:
-        dominant_color_function = get_dominant_color_function(args.method)
-        generate_and_save_barcode(args, dominant_color_function, args.method)
+    methods = METHODS if args.all_methods else [args.method]
+    # Every frame is decoded once and fanned out to all requested extractors
+    dominant_color_functions = {method: get_dominant_color_function(method) for method in methods}
+    generate_and_save_barcodes(args, dominant_color_functions, frame_index=frame_index)
+
 
+SUBCOMMANDS = {"extract": extract_main, "render": render_main, "batch": batch_main}
 
 if __name__ == "__main__":
     main()
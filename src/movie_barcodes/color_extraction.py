@@ -1,7 +1,17 @@
+from typing import Callable, Optional, Tuple
+
 import numpy as np
-from sklearn.cluster import KMeans
 import cv2
 
+# Pixels sampled per frame for KMeans: the dominant color of a frame is stable well below its full pixel count
+KMEANS_SAMPLE_SIZE = 4096
+KMEANS_MAX_ITER = 10
+# Largest centroid move (in 0-255 color units) under which KMeans is considered converged
+KMEANS_TOLERANCE = 0.5
+# Thumbnail size and mean absolute difference (0-255) used to detect scene cuts between consecutive frames
+SCENE_THUMBNAIL_SIZE = (16, 9)
+SCENE_CUT_THRESHOLD = 20.0
+
 
 def get_smoothed_frame(frame: np.ndarray) -> np.ndarray:
     """
@@ -25,33 +35,163 @@ def get_dominant_color_mean(frame: np.ndarray) -> np.ndarray:
     return np.array(cv2.mean(frame)[:3])
 
 
-def get_dominant_color_kmeans(frame: np.ndarray, k: int = 3) -> np.ndarray:
+def _init_centroids(pixels: np.ndarray, k: int) -> np.ndarray:
+    """
+    Picks deterministic initial centroids, spread evenly along the brightness order of the pixels.
+
+    :param np.ndarray pixels: Pixels as a (N, 3) float array.
+    :param int k: Number of clusters.
+    :return: Initial centroids as a (k, 3) float array.
+    """
+    order = np.argsort(pixels.sum(axis=1), kind="stable")
+    picks = order[((np.arange(k) + 0.5) * len(pixels) / k).astype(int)]
+    return pixels[picks].copy()
+
+
+def fit_kmeans(
+    frame: np.ndarray,
+    k: int = 3,
+    sample_size: int = KMEANS_SAMPLE_SIZE,
+    max_iter: int = KMEANS_MAX_ITER,
+    init: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Clusters the pixels of a frame with a vectorized Lloyd's algorithm on a random subsample of its pixels.
+
+    :param np.ndarray frame: The frame as a NumPy array.
+    :param int k: Number of clusters. Defaults to 3.
+    :param int sample_size: Maximum number of pixels used for clustering. Defaults to KMEANS_SAMPLE_SIZE.
+    :param int max_iter: Maximum number of Lloyd iterations. Defaults to KMEANS_MAX_ITER.
+    :param Optional[np.ndarray] init: Initial (k, 3) centroids, e.g. those of the previous frame. Defaults to a
+        deterministic initialization from the frame itself.
+    :return: Tuple containing the (k, 3) centroids, the number of sampled pixels in each cluster, and the number of
+        iterations run.
+    """
+    pixels = frame.reshape(-1, 3)
+    if len(pixels) > sample_size:
+        # Fixed seed keeps the result reproducible from one run to the next
+        rng = np.random.default_rng(0)
+        pixels = pixels[rng.integers(0, len(pixels), sample_size)]
+    pixels = pixels.astype(np.float32)
+
+    centroids = _init_centroids(pixels, k) if init is None else np.asarray(init, dtype=np.float32).copy()
+
+    iterations = 0
+    while True:
+        # Squared distances up to the per-pixel constant |p|^2, which does not change the closest centroid
+        distances = (centroids**2).sum(axis=1) - 2.0 * pixels @ centroids.T
+        labels = distances.argmin(axis=1)
+        counts = np.bincount(labels, minlength=k)
+        if iterations == max_iter:
+            break
+
+        sums = np.stack([np.bincount(labels, weights=pixels[:, c], minlength=k) for c in range(3)], axis=1)
+        # Empty clusters keep their previous centroid
+        new_centroids = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centroids)
+        new_centroids = new_centroids.astype(np.float32)
+        iterations += 1
+
+        converged = np.abs(new_centroids - centroids).max() <= KMEANS_TOLERANCE
+        centroids = new_centroids
+        if converged:
+            distances = (centroids**2).sum(axis=1) - 2.0 * pixels @ centroids.T
+            counts = np.bincount(distances.argmin(axis=1), minlength=k)
+            break
+
+    return centroids, counts, iterations
+
+
+def get_dominant_color_kmeans(
+    frame: np.ndarray,
+    k: int = 3,
+    sample_size: int = KMEANS_SAMPLE_SIZE,
+    max_iter: int = KMEANS_MAX_ITER,
+    init: Optional[np.ndarray] = None,
+) -> np.ndarray:
     """
     Gets the dominant color of a frame using KMeans clustering.
 
     :param np.ndarray frame: The frame as a NumPy array.
     :param int k: Number of clusters for KMeans algorithm. Defaults to 3.
+    :param int sample_size: Maximum number of pixels used for clustering. Defaults to KMEANS_SAMPLE_SIZE.
+    :param int max_iter: Maximum number of Lloyd iterations. Defaults to KMEANS_MAX_ITER.
+    :param Optional[np.ndarray] init: Initial (k, 3) centroids, e.g. those of the previous frame.
     :return: Dominant color as a NumPy array.
     """
-    # Reshape the frame to be a list of pixels
-    pixels = frame.reshape(-1, 3)
+    centroids, counts, _ = fit_kmeans(frame, k, sample_size, max_iter, init)
+
+    # The center of the largest cluster is the dominant color
+    return centroids[np.argmax(counts)].astype(np.float64)
+
+
+class KMeansColorExtractor:
+    """
+    Stateful KMeans color extractor that warm-starts each frame from the centroids of the previous one.
+
+    Consecutive frames of a shot share the same palette, so starting from the last solution usually converges in one
+    or two iterations. The centroids are dropped on scene cuts, detected by comparing small thumbnails of
+    consecutive frames. Instances are called like the other extractor functions; parallel workers each receive
+    their own copy, so the state is kept per worker.
+    """
+
+    def __init__(
+        self,
+        k: int = 3,
+        sample_size: int = KMEANS_SAMPLE_SIZE,
+        max_iter: int = KMEANS_MAX_ITER,
+        scene_cut_threshold: float = SCENE_CUT_THRESHOLD,
+    ) -> None:
+        """
+        :param int k: Number of clusters. Defaults to 3.
+        :param int sample_size: Maximum number of pixels used for clustering. Defaults to KMEANS_SAMPLE_SIZE.
+        :param int max_iter: Maximum number of Lloyd iterations. Defaults to KMEANS_MAX_ITER.
+        :param float scene_cut_threshold: Mean absolute thumbnail difference (0-255) above which two frames are
+            considered to belong to different scenes. Defaults to SCENE_CUT_THRESHOLD.
+        """
+        self.k = k
+        self.sample_size = sample_size
+        self.max_iter = max_iter
+        self.scene_cut_threshold = scene_cut_threshold
+        self.centroids: Optional[np.ndarray] = None
+        self.thumbnail: Optional[np.ndarray] = None
+        self.last_iterations = 0
+
+    def reset(self) -> None:
+        """
+        Forgets the previous frame, e.g. before processing a non-contiguous part of the video.
+        """
+        self.centroids = None
+        self.thumbnail = None
+
+    def is_scene_cut(self, thumbnail: np.ndarray) -> bool:
+        """
+        Tells whether a frame starts a new scene compared to the previous frame.
 
-    # Apply KMeans clustering
-    kmeans = KMeans(n_clusters=k, n_init=10, random_state=0)
-    kmeans.fit(pixels)
+        :param np.ndarray thumbnail: Thumbnail of the frame, as an int16 array.
+        :return: True if there is no previous frame or if the frames differ more than the threshold.
+        """
+        if self.thumbnail is None:
+            return True
+        return float(np.abs(thumbnail - self.thumbnail).mean()) > self.scene_cut_threshold
 
-    # Get the RGB values of the cluster centers
-    cluster_centers = kmeans.cluster_centers_
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Gets the dominant color of a frame using KMeans clustering warm-started from the previous frame.
 
-    # If we are looking only for the most dominant color
-    if k == 1:
-        return cluster_centers[0]
+        :param np.ndarray frame: The frame as a NumPy array.
+        :return: Dominant color as a NumPy array.
+        """
+        thumbnail = cv2.resize(frame, SCENE_THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA).astype(np.int16)
+        if self.is_scene_cut(thumbnail):
+            self.centroids = None
 
-    # If we wanted to retrieve more than one color
-    # We'd take the center of the largest cluster, assuming it's the dominant color
-    labels, counts = np.unique(kmeans.labels_, return_counts=True)
-    dominant_index = labels[np.argmax(counts)]
-    return cluster_centers[dominant_index]
+        centroids, counts, self.last_iterations = fit_kmeans(
+            frame, self.k, self.sample_size, self.max_iter, self.centroids
+        )
+        self.centroids = centroids
+        self.thumbnail = thumbnail
+
+        return centroids[np.argmax(counts)].astype(np.float64)
 
 
 def get_dominant_color_hsv(frame: np.ndarray) -> np.ndarray:
@@ -97,3 +237,74 @@ def get_dominant_color_bgr(frame: np.ndarray) -> np.ndarray:
     dominant_r = np.argmax(hist_r)
 
     return np.array([dominant_b, dominant_g, dominant_r], dtype=np.uint8)
+
+
+def _histogram_modes(values: np.ndarray, bins: int = 256) -> np.ndarray:
+    """
+    Finds the most frequent value of each row with a single bincount over row-offset values.
+
+    :param np.ndarray values: Integer values in [0, bins) as a (N, P) array.
+    :param int bins: Number of histogram bins. Defaults to 256.
+    :return: np.ndarray: The most frequent value of each row, as a (N,) array.
+    """
+    rows = len(values)
+    offsets = (np.arange(rows, dtype=np.int64) * bins)[:, None]
+    histograms = np.bincount((values + offsets).ravel(), minlength=rows * bins).reshape(rows, bins)
+    return histograms.argmax(axis=1)
+
+
+def get_dominant_color_mean_batch(frames: np.ndarray) -> np.ndarray:
+    """
+    Gets the mean color of each frame of a stack, like get_dominant_color_mean.
+
+    :param np.ndarray frames: Frames as a (N, H, W, 3) array.
+    :return: Mean colors as a (N, 3) float64 array.
+    """
+    count = len(frames)
+    return cv2.reduce(frames.reshape(count, -1, 3), 1, cv2.REDUCE_AVG, dtype=cv2.CV_64F).reshape(count, 3)
+
+
+def get_dominant_color_hsv_batch(frames: np.ndarray) -> np.ndarray:
+    """
+    Gets the dominant hue color of each frame of a stack, like get_dominant_color_hsv.
+
+    :param np.ndarray frames: Frames as a (N, H, W, 3) array.
+    :return: Dominant colors as a (N, 3) uint8 array.
+    """
+    count, _, width, _ = frames.shape
+    # The stack converts as one tall image, in a single OpenCV call
+    hsv = cv2.cvtColor(frames.reshape(-1, width, 3), cv2.COLOR_BGR2HSV).reshape(count, -1, 3)
+    dominant_colors_hsv = np.full((count, 1, 3), 255, dtype=np.uint8)
+    dominant_colors_hsv[:, 0, 0] = _histogram_modes(hsv[:, :, 0])
+    return cv2.cvtColor(dominant_colors_hsv, cv2.COLOR_HSV2BGR).reshape(count, 3)
+
+
+def get_dominant_color_bgr_batch(frames: np.ndarray) -> np.ndarray:
+    """
+    Gets the dominant color of each frame of a stack from per-channel histograms, like get_dominant_color_bgr.
+
+    :param np.ndarray frames: Frames as a (N, H, W, 3) array.
+    :return: Dominant colors as a (N, 3) uint8 array.
+    """
+    pixels = frames.reshape(len(frames), -1, 3)
+    return np.stack([_histogram_modes(pixels[:, :, channel]) for channel in range(3)], axis=1).astype(np.uint8)
+
+
+BATCH_EXTRACTORS = {
+    get_dominant_color_mean: get_dominant_color_mean_batch,
+    get_dominant_color_hsv: get_dominant_color_hsv_batch,
+    get_dominant_color_bgr: get_dominant_color_bgr_batch,
+}
+
+
+def get_batch_extractor(color_extractor: Callable) -> Optional[Callable]:
+    """
+    Returns the vectorized version of a color extractor, working on (N, H, W, 3) frame stacks.
+
+    :param Callable color_extractor: A function extracting the dominant color from a single frame.
+    :return: The batch function returning a (N, 3) array, or None if the extractor has no batch version.
+    """
+    try:
+        return BATCH_EXTRACTORS.get(color_extractor)
+    except TypeError:  # Unhashable callables have no batch version
+        return None
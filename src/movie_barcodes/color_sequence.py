@@ -0,0 +1,383 @@
+import json
+import os
+import tempfile
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+COLOR_FILE_VERSION = 1
+
+
+def color_dtype(dtype: np.dtype) -> np.dtype:
+    """
+    Returns the dtype colors of the given dtype are stored as: float32 for floating point colors, uint8 otherwise.
+
+    :param np.dtype dtype: The dtype of the extracted colors.
+    :return: np.dtype: float32 or uint8.
+    """
+    return np.dtype(np.float32) if np.dtype(dtype).kind == "f" else np.dtype(np.uint8)
+
+
+class ColorSequence:
+    """
+    Colors extracted from the sampled frames of a video, stored in a single contiguous array.
+
+    Colors are BGR. The array has one row per sampled frame: a (N, 3) array for dominant colors, or a (N, H, 1, 3)
+    array of columns for smoothed frames. Floating point colors (e.g. from cv2.mean) are stored as float32 and
+    histogram or column colors as uint8. The index of the frame each color comes from, and its timestamp in seconds,
+    are kept alongside when known.
+    """
+
+    __slots__ = ("colors", "frame_indices", "timestamps")
+
+    def __init__(
+        self,
+        colors: np.ndarray,
+        frame_indices: Optional[Sequence[int]] = None,
+        timestamps: Optional[Sequence[float]] = None,
+    ) -> None:
+        """
+        :param np.ndarray colors: Colors as a (N, 3) or (N, H, 1, 3) array. Not copied if already uint8 or float32.
+        :param Optional[Sequence[int]] frame_indices: Index of the frame each color comes from.
+        :param Optional[Sequence[float]] timestamps: Timestamp of the frame each color comes from, in seconds.
+        :raises ValueError: If the colors do not have 3 channels, or the indices or timestamps are not one per color.
+        """
+        colors = np.asarray(colors)
+        if colors.ndim not in (2, 4) or colors.shape[-1] != 3:
+            raise ValueError(f"Invalid colors shape: {colors.shape}")
+        self.colors = np.ascontiguousarray(colors, dtype=color_dtype(colors.dtype))
+        self.frame_indices = None if frame_indices is None else np.asarray(frame_indices, dtype=np.int64)
+        self.timestamps = None if timestamps is None else np.asarray(timestamps, dtype=np.float64)
+        for name, values in (("frame indices", self.frame_indices), ("timestamps", self.timestamps)):
+            if values is not None and len(values) != len(self.colors):
+                raise ValueError(f"Expected {len(self.colors)} {name}, got {len(values)}")
+
+    @classmethod
+    def from_colors(
+        cls,
+        colors: Union["ColorSequence", Sequence[np.ndarray], np.ndarray],
+        frame_indices: Optional[Sequence[int]] = None,
+        timestamps: Optional[Sequence[float]] = None,
+    ) -> "ColorSequence":
+        """
+        Build a ColorSequence from the colors returned by the extraction functions.
+
+        :param colors: A ColorSequence, a list of colors or smoothed frames, or an array of them.
+        :param Optional[Sequence[int]] frame_indices: Index of the frame each color comes from.
+        :param Optional[Sequence[float]] timestamps: Timestamp of the frame each color comes from, in seconds.
+        :return: ColorSequence: The colors as a ColorSequence. A ColorSequence without new indices or timestamps is
+            returned as is.
+        """
+        if isinstance(colors, ColorSequence):
+            if frame_indices is None and timestamps is None:
+                return colors
+            return cls(
+                colors.colors,
+                colors.frame_indices if frame_indices is None else frame_indices,
+                colors.timestamps if timestamps is None else timestamps,
+            )
+        if len(colors) == 0:
+            return cls(np.empty((0, 3), dtype=np.uint8), frame_indices, timestamps)
+        return cls(np.asarray(colors), frame_indices, timestamps)
+
+    @property
+    def is_columns(self) -> bool:
+        """
+        Whether each color is a column of a smoothed frame rather than a single color.
+
+        :return: bool: True for (N, H, 1, 3) colors.
+        """
+        return self.colors.ndim == 4
+
+    def mean_colors(self) -> np.ndarray:
+        """
+        Returns a single color per frame, averaging the columns of smoothed frames.
+
+        :return: np.ndarray: (N, 3) array of colors.
+        """
+        if self.is_columns:
+            return self.colors.mean(axis=(1, 2))
+        return self.colors
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the colors, frame indices and timestamps.
+
+        :return: int: Size in bytes.
+        """
+        return sum(values.nbytes for values in (self.colors, self.frame_indices, self.timestamps) if values is not None)
+
+    def __len__(self) -> int:
+        return len(self.colors)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        return iter(self.colors)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return ColorSequence(
+                self.colors[item],
+                None if self.frame_indices is None else self.frame_indices[item],
+                None if self.timestamps is None else self.timestamps[item],
+            )
+        return self.colors[item]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        if dtype is None:
+            return self.colors
+        return self.colors.astype(dtype)
+
+    def __repr__(self) -> str:
+        return f"ColorSequence(len={len(self)}, shape={self.colors.shape[1:]}, dtype={self.colors.dtype})"
+
+
+class ColorBuffer:
+    """
+    Array colors are appended to as they are extracted, stored as a ColorSequence stores them.
+
+    Extractions know how many frames they decode at most, so the array is allocated once, with the shape and dtype
+    of the first colors, instead of keeping a list of per-frame arrays.
+    """
+
+    __slots__ = ("capacity", "_array", "_length")
+
+    def __init__(self, capacity: int) -> None:
+        """
+        :param int capacity: The maximum number of colors.
+        """
+        self.capacity = capacity
+        self._array: Optional[np.ndarray] = None
+        self._length = 0
+
+    def append(self, color: np.ndarray) -> None:
+        """
+        Append the color of one frame.
+
+        :param np.ndarray color: The color, or column of a smoothed frame.
+        :return: None
+        """
+        self.extend(np.asarray(color)[None])
+
+    def extend(self, colors: np.ndarray) -> None:
+        """
+        Append the colors of several frames.
+
+        :param np.ndarray colors: The colors, one row per frame.
+        :return: None
+        :raises ValueError: If the buffer has no room left for the colors.
+        """
+        colors = np.asarray(colors)
+        if self._length + len(colors) > self.capacity:
+            raise ValueError(f"A color buffer of {self.capacity} colors cannot hold {self._length + len(colors)}.")
+        if self._array is None:
+            self._array = np.empty((self.capacity,) + colors.shape[1:], dtype=color_dtype(colors.dtype))
+        self._array[self._length : self._length + len(colors)] = colors
+        self._length += len(colors)
+
+    @property
+    def colors(self) -> np.ndarray:
+        """
+        :return: np.ndarray: The colors appended so far, without a copy. Empty (0, 3) colors if none were appended.
+        """
+        if self._array is None:
+            return np.empty((0, 3), dtype=np.uint8)
+        return self._array[: self._length]
+
+    def __len__(self) -> int:
+        return self._length
+
+
+def _halve(colors: ColorSequence, last_weight: float) -> ColorSequence:
+    """
+    Averages each pair of consecutive colors. An odd last color is kept as is.
+
+    :param ColorSequence colors: The colors to reduce.
+    :param float last_weight: The part of a full span the last color covers, in (0, 1]. A partial last color weighs
+        less in the mean of its pair.
+    :return: ColorSequence: Half as many colors (rounded up), with the frame index and timestamp of the first color of
+        each pair.
+    """
+    values = colors.colors
+    pairs = len(values) // 2
+    reduced = np.empty((pairs + len(values) % 2,) + values.shape[1:], dtype=np.float32)
+    np.add(values[0 : 2 * pairs : 2], values[1 : 2 * pairs : 2], out=reduced[:pairs], dtype=np.float32)
+    reduced[:pairs] *= 0.5
+    reduced[pairs:] = values[2 * pairs :]
+    if len(values) % 2 == 0 and last_weight < 1:
+        reduced[-1] = (values[-2] + last_weight * values[-1].astype(np.float32)) / (1 + last_weight)
+    if values.dtype == np.uint8:
+        # Keep histogram and column colors compact, as in the full resolution level
+        reduced = np.rint(reduced).astype(np.uint8)
+    return ColorSequence(
+        reduced,
+        None if colors.frame_indices is None else colors.frame_indices[::2],
+        None if colors.timestamps is None else colors.timestamps[::2],
+    )
+
+
+def build_color_pyramid(colors: ColorSequence) -> List[ColorSequence]:
+    """
+    Builds a mip-map style pyramid of colors: the colors themselves, then repeatedly the mean of each pair of colors,
+    down to a single color.
+
+    Any number of samples can then be produced from the smallest level that has at least as many colors, in time
+    proportional to the number of samples rather than to the number of colors (see resample_from_pyramid).
+
+    :param ColorSequence colors: The full resolution colors.
+    :return: List[ColorSequence]: The levels, from the full resolution colors to a single color.
+    """
+    levels = [colors]
+    span = 1
+    while len(levels[-1]) > 1:
+        last_covered = len(colors) - (len(levels[-1]) - 1) * span
+        levels.append(_halve(levels[-1], last_covered / span))
+        span *= 2
+    return levels
+
+
+def select_pyramid_level(lengths: Sequence[int], samples: int) -> int:
+    """
+    Returns the smallest pyramid level with at least the requested number of colors.
+
+    :param Sequence[int] lengths: The number of colors of each level, in decreasing order.
+    :param int samples: The number of samples requested.
+    :return: int: The index of the level, 0 if no level has enough colors.
+    """
+    level = 0
+    while level + 1 < len(lengths) and lengths[level + 1] >= samples:
+        level += 1
+    return level
+
+
+def area_resample(colors: ColorSequence, samples: int, span: int = 1, total: Optional[int] = None) -> ColorSequence:
+    """
+    Resamples colors to fewer samples by averaging, each sample being the mean of the colors it covers, weighted by
+    how much of each color it covers.
+
+    Unlike keeping every n-th color, this accounts for every color and works for any number of samples. The colors
+    are assumed to be evenly spaced. They may be a pyramid level (see build_color_pyramid), each color then averaging
+    span full resolution colors.
+
+    :param ColorSequence colors: The colors to resample.
+    :param int samples: The number of samples, at most the number of full resolution colors.
+    :param int span: The number of full resolution colors each color averages. Default is 1.
+    :param Optional[int] total: The number of full resolution colors, which the last color may cover only part of.
+        Defaults to len(colors) * span.
+    :return: ColorSequence: The resampled colors, with the frame index and timestamp of the first color each sample
+        covers.
+    """
+    length = len(colors)
+    if total is None:
+        total = length * span
+    # Colors of a coarser level may cover unequal spans, so they are resampled even to as many samples
+    if length == 0 or (samples >= length and span == 1):
+        return colors
+
+    values = colors.colors.reshape(length, -1).astype(np.float64)
+    covered = np.full(length, float(span))
+    covered[-1] = total - (length - 1) * span
+    # Integral of the colors, as a piecewise constant function of the position, at each sample boundary
+    prefix = np.zeros((length + 1, values.shape[1]))
+    np.cumsum(values * covered[:, None], axis=0, out=prefix[1:])
+    bounds = np.arange(samples + 1) * (total / samples)
+    starts = np.minimum((bounds // span).astype(np.int64), length - 1)
+    integral = prefix[starts] + (bounds - starts * span)[:, None] * values[starts]
+    resampled = np.diff(integral, axis=0) * (samples / total)
+
+    if colors.colors.dtype == np.uint8:
+        resampled = np.rint(resampled)
+    # Frame index and timestamp of the first full resolution color of each sample, interpolated within a level color
+    first_positions = np.floor(bounds[:-1])
+    level_positions = np.arange(length) * span
+    frame_indices = timestamps = None
+    if colors.frame_indices is not None:
+        frame_indices = np.floor(np.interp(first_positions, level_positions, colors.frame_indices)).astype(np.int64)
+    if colors.timestamps is not None:
+        timestamps = np.interp(first_positions, level_positions, colors.timestamps)
+    return ColorSequence(
+        resampled.reshape((samples,) + colors.colors.shape[1:]).astype(colors.colors.dtype), frame_indices, timestamps
+    )
+
+
+def resample_from_pyramid(levels: Sequence[ColorSequence], samples: int) -> ColorSequence:
+    """
+    Resamples colors to fewer samples by averaging (see area_resample), from the smallest pyramid level with enough
+    colors, so that the cost depends on the number of samples rather than on the number of full resolution colors.
+
+    :param Sequence[ColorSequence] levels: The pyramid levels, as returned by build_color_pyramid.
+    :param int samples: The number of samples.
+    :return: ColorSequence: The resampled colors.
+    """
+    level = select_pyramid_level([len(colors) for colors in levels], samples)
+    return area_resample(levels[level], samples, 2**level, len(levels[0]))
+
+
+def save_npz_atomically(destination_path: str, arrays: Dict[str, np.ndarray]) -> None:
+    """
+    Saves arrays to an uncompressed .npz file through a temporary file in the same directory, so that readers never
+    see a partial file.
+
+    :param str destination_path: The path of the file to write, replaced if it exists.
+    :param Dict[str, np.ndarray] arrays: Mapping of array name to array.
+    :return: None
+    """
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(destination_path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            np.savez(file, **arrays)
+        os.replace(temporary_path, destination_path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def save_color_file(destination_path: str, colors_by_method: Dict[str, ColorSequence], metadata: dict) -> None:
+    """
+    Saves the colors extracted from a video with one or more methods to a single uncompressed .npz file.
+
+    Each method is stored as '<method>/colors', '<method>/frame_indices' and '<method>/timestamps' arrays, and the
+    metadata (e.g. frame count and size of the video) as a JSON string, so the file loads without pickle.
+
+    :param str destination_path: The path of the file to write, used as is even without a .npz extension.
+    :param Dict[str, ColorSequence] colors_by_method: Mapping of method name to its colors.
+    :param dict metadata: JSON serializable description of the video and of the extraction.
+    :return: None
+    """
+    arrays = {"metadata": np.array(json.dumps({**metadata, "version": COLOR_FILE_VERSION}))}
+    for method, colors in colors_by_method.items():
+        arrays[f"{method}/colors"] = colors.colors
+        for name in ("frame_indices", "timestamps"):
+            values = getattr(colors, name)
+            if values is not None:
+                arrays[f"{method}/{name}"] = values
+
+    with open(destination_path, "wb") as file:
+        np.savez(file, **arrays)
+
+
+def load_color_file(file_path: str) -> Tuple[Dict[str, ColorSequence], dict]:
+    """
+    Loads a color file written by save_color_file.
+
+    :param str file_path: The path of the color file.
+    :return: Tuple[Dict[str, ColorSequence], dict]: The colors by method and the metadata.
+    :raises ValueError: If the file is not a color file or was written by a newer version.
+    """
+    with np.load(file_path, allow_pickle=False) as data:
+        if "metadata" not in data:
+            raise ValueError(f"'{file_path}' is not a color file.")
+        metadata = json.loads(str(data["metadata"]))
+        if metadata.get("version", 0) > COLOR_FILE_VERSION:
+            raise ValueError(f"'{file_path}' was written by a newer version of movie-barcodes.")
+
+        colors_by_method = {}
+        for key in data.files:
+            if key.endswith("/colors"):
+                method = key[: -len("/colors")]
+                colors_by_method[method] = ColorSequence(
+                    data[key],
+                    data[f"{method}/frame_indices"] if f"{method}/frame_indices" in data else None,
+                    data[f"{method}/timestamps"] if f"{method}/timestamps" in data else None,
+                )
+    return colors_by_method, metadata
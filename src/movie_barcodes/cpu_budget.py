@@ -0,0 +1,97 @@
+import math
+import os
+from typing import Optional
+
+import cv2
+
+# cgroup v2 CPU limit ("<quota> <period>" or "max <period>") and its cgroup v1 equivalents, in microseconds
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def _read_first_line(file_path: str) -> Optional[str]:
+    """
+    Returns the first line of a file, or None if it cannot be read.
+
+    :param str file_path: The path to the file.
+    :return: Optional[str]: The stripped first line.
+    """
+    try:
+        with open(file_path, encoding="ascii") as file:
+            return file.readline().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """
+    Returns the number of CPUs the cgroup of this process may use, as set by container CPU limits.
+
+    :return: Optional[float]: The CPU quota divided by its period, or None if there is no quota.
+    """
+    cpu_max = _read_first_line(CGROUP_V2_CPU_MAX)
+    if cpu_max is not None:
+        fields = cpu_max.split()
+        quota, period = (fields + ["100000"])[:2]
+    else:
+        quota, period = _read_first_line(CGROUP_V1_CPU_QUOTA), _read_first_line(CGROUP_V1_CPU_PERIOD)
+
+    try:
+        quota_us, period_us = int(quota), int(period)
+    except (TypeError, ValueError):
+        # "max", -1 or unreadable: no quota
+        return None
+    if quota_us <= 0 or period_us <= 0:
+        return None
+    return quota_us / period_us
+
+
+def available_cpus() -> int:
+    """
+    Returns the number of CPUs this process can actually run on.
+
+    os.cpu_count() reports the CPUs of the machine, while a container or a job scheduler usually grants far fewer,
+    through the CPU affinity of the process or a cgroup CPU quota. Running one worker per reported CPU then makes the
+    workers time-slice the granted ones, or get throttled by the quota. A fractional quota is rounded down, so that
+    workers are never throttled.
+
+    :return: int: The CPU budget, at least 1.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count() or 1
+
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.floor(limit))
+    return max(1, cpus)
+
+
+def threads_per_worker(workers: int, cpus: Optional[int] = None) -> int:
+    """
+    Returns the number of threads each of several workers may use, so that all their threads fit the CPU budget.
+
+    :param int workers: The number of workers running at once.
+    :param Optional[int] cpus: The CPU budget. Defaults to available_cpus().
+    :return: int: The number of threads per worker, at least 1.
+    """
+    if cpus is None:
+        cpus = available_cpus()
+    return max(1, cpus // max(1, workers))
+
+
+def limit_threads(threads: int) -> None:
+    """
+    Limit the threads this process' native libraries start: OpenCV's parallel loops and the BLAS and OpenMP pools
+    used by NumPy, so that they do not oversubscribe the CPUs shared with other workers.
+
+    :param int threads: The maximum number of threads of each pool.
+    :return: None
+    """
+    # threadpoolctl inspects the loaded libraries, so it is only imported when limits are applied
+    from threadpoolctl import threadpool_limits
+
+    cv2.setNumThreads(threads)
+    threadpool_limits(limits=threads)
@@ -0,0 +1,186 @@
+import shutil
+import subprocess
+import tempfile
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Name of the ffmpeg executable, looked up on the PATH
+FFMPEG_EXECUTABLE = "ffmpeg"
+
+
+def find_ffmpeg() -> str:
+    """
+    Returns the path of the ffmpeg executable.
+
+    :return: str: The path of the executable.
+    :raises ValueError: If ffmpeg is not installed.
+    """
+    executable = shutil.which(FFMPEG_EXECUTABLE)
+    if executable is None:
+        raise ValueError(f"The ffmpeg decoder needs the '{FFMPEG_EXECUTABLE}' executable, which is not on the PATH.")
+    return executable
+
+
+def output_size(
+    frame_width: int, frame_height: int, analysis_resolution: Optional[Tuple[int, int]] = None
+) -> Tuple[int, int]:
+    """
+    Returns the size frames are delivered at: the analysis resolution if the frames are larger, as downscale_frame
+    does, else their own size.
+
+    :param int frame_width: The width of the video frames.
+    :param int frame_height: The height of the video frames.
+    :param Optional[Tuple[int, int]] analysis_resolution: Target (width, height). None keeps the full frame.
+    :return: Tuple[int, int]: The (width, height) of the delivered frames.
+    """
+    if analysis_resolution is None:
+        return frame_width, frame_height
+    width, height = analysis_resolution
+    if frame_width <= width and frame_height <= height:
+        return frame_width, frame_height
+    return width, height
+
+
+def build_ffmpeg_command(
+    executable: str,
+    video_path: str,
+    start_time: float,
+    size: Tuple[int, int],
+    step: Optional[int],
+    frames: int,
+    keyframes_only: bool,
+    decode_threads: int,
+) -> List[str]:
+    """
+    Build the command decoding frames of a video to raw BGR frames on the standard output.
+
+    :param str executable: The path of the ffmpeg executable.
+    :param str video_path: The path to the video file.
+    :param float start_time: The time to start decoding at, in seconds. 0 decodes from the start.
+    :param Tuple[int, int] size: The (width, height) frames are scaled to.
+    :param Optional[int] step: Keep one decoded frame every step frames, or None to output every decoded frame.
+    :param int frames: The number of frames to output.
+    :param bool keyframes_only: Whether to skip every frame but keyframes in the decoder.
+    :param int decode_threads: The number of decoder threads, 0 for the ffmpeg default.
+    :return: List[str]: The command.
+    """
+    command = [executable, "-nostdin", "-hide_banner", "-loglevel", "error"]
+    if decode_threads > 0:
+        command += ["-threads", str(decode_threads)]
+    if keyframes_only:
+        command += ["-skip_frame", "nokey"]
+    if start_time > 0:
+        command += ["-ss", f"{start_time:.6f}"]
+
+    filters = [] if step is None or step == 1 else [f"select=not(mod(n\\,{step}))"]
+    filters.append(f"scale={size[0]}:{size[1]}:flags=area")
+    command += ["-i", video_path, "-map", "0:v:0", "-an", "-sn", "-dn", "-vf", ",".join(filters)]
+    # Pass frames through as decoded: a constant frame rate output would duplicate frames in place of those dropped
+    # by select or -skip_frame, and the output frames would no longer be the requested ones. -vsync is spelled
+    # -fps_mode since ffmpeg 5.1, but only -vsync is understood by ffmpeg 4.x too
+    command += ["-vsync", "passthrough", "-frames:v", str(frames), "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"]
+    return command
+
+
+def _read_frame(stream: BinaryIO, buffer: memoryview) -> bool:
+    """
+    Fill a buffer with the next frame of a stream.
+
+    :param BinaryIO stream: The stream to read from.
+    :param memoryview buffer: The byte buffer of the frame.
+    :return: bool: Whether a whole frame was read, False at the end of the stream.
+    """
+    filled = 0
+    while filled < len(buffer):
+        read = stream.readinto(buffer[filled:])
+        if not read:
+            return False
+        filled += read
+    return True
+
+
+def iter_ffmpeg_frames(
+    video_path: str,
+    frame_indices: List[int],
+    analysis_resolution: Optional[Tuple[int, int]] = None,
+    keyframes: Optional[List[int]] = None,
+    decode_threads: int = 0,
+) -> Iterator[tuple]:
+    """
+    Decode the requested frames of a video with an ffmpeg subprocess, streaming raw BGR frames over a pipe.
+
+    ffmpeg seeks to the first requested frame, and scales frames to the analysis resolution and drops evenly spaced
+    frames that are not requested inside its filter graph, so that only small, requested frames cross the pipe. When
+    every requested frame is a keyframe, the decoder skips all other frames. Each frame is read into the same
+    preallocated array: a yielded frame is only valid until the next one is requested.
+
+    The start time is computed from the frame rate, so frame positions are exact for constant frame rate videos.
+
+    :param str video_path: The path to the video file.
+    :param List[int] frame_indices: Increasing indices of the frames to decode.
+    :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames are downscaled to. Defaults to the
+        full frame.
+    :param Optional[List[int]] keyframes: Increasing keyframe indices of the video, if known.
+    :param int decode_threads: The number of decoder threads, 0 for the ffmpeg default.
+    :return: Iterator of (frame index, frame) tuples. Stops early if the video ends.
+    :raises ValueError: If ffmpeg is not installed, the video cannot be opened or ffmpeg fails to decode it.
+    """
+    if not frame_indices:
+        return
+    executable = find_ffmpeg()
+
+    video = cv2.VideoCapture(video_path)
+    if not video.isOpened():
+        raise ValueError(f"Could not open the video file: {video_path}")
+    fps = video.get(cv2.CAP_PROP_FPS)
+    width, height = output_size(
+        int(video.get(cv2.CAP_PROP_FRAME_WIDTH)), int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)), analysis_resolution
+    )
+    video.release()
+
+    first_frame = frame_indices[0]
+    # Frames the decoder outputs from the first requested one, and where each requested frame is among them
+    if keyframes and set(frame_indices).issubset(keyframes):
+        keyframes_only = True
+        decoded = [keyframe for keyframe in keyframes if first_frame <= keyframe <= frame_indices[-1]]
+        positions = {keyframe: position for position, keyframe in enumerate(decoded)}
+        offsets = [positions[index] for index in frame_indices]
+    else:
+        keyframes_only = False
+        offsets = [index - first_frame for index in frame_indices]
+
+    # Evenly spaced frames are selected by ffmpeg, others are read and dropped here
+    steps = {offset - previous for previous, offset in zip(offsets, offsets[1:])}
+    step = steps.pop() if len(steps) == 1 else (1 if not steps else None)
+    frames = len(offsets) if step is not None else offsets[-1] + 1
+    # Half a frame early, so that rounding never skips the first requested frame
+    start_time = (first_frame - 0.5) / fps if first_frame > 0 and fps > 0 else 0.0
+    command = build_ffmpeg_command(
+        executable, video_path, start_time, (width, height), step, frames, keyframes_only, decode_threads
+    )
+
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    buffer = memoryview(frame).cast("B")
+    requested = dict(zip(offsets, frame_indices))
+    # Errors go to a file rather than a pipe, which would block ffmpeg once full since it is only read at the end
+    with (
+        tempfile.TemporaryFile() as errors,
+        subprocess.Popen(command, stdout=subprocess.PIPE, stderr=errors) as process,
+    ):
+        try:
+            for output in range(frames):
+                if not _read_frame(process.stdout, buffer):
+                    break
+                if step is not None:
+                    yield frame_indices[output], frame
+                elif output in requested:
+                    yield requested[output], frame
+            if process.wait() != 0:
+                errors.seek(0)
+                message = errors.read().decode(errors="replace").strip()
+                raise ValueError(f"ffmpeg could not decode {video_path}: {message}")
+        finally:
+            if process.poll() is None:
+                process.kill()
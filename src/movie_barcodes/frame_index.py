@@ -0,0 +1,113 @@
+import hashlib
+import json
+import logging
+import os
+import zipfile
+from typing import List, Sequence
+
+import cv2
+import numpy as np
+
+from .color_sequence import save_npz_atomically
+
+FRAME_INDEX_VERSION = 1
+# Value of CAP_PROP_FRAME_TYPE for intra-coded frames (the ASCII code of 'I')
+INTRA_FRAME_TYPE = ord("I")
+
+
+class FrameIndex:
+    """
+    Exact frame count, timestamps and keyframe positions of a video, recorded by one pass over all its frames.
+
+    CAP_PROP_FRAME_COUNT is an estimate from the container, which can be a few frames off (or far off for some
+    formats), and timestamps computed from the frame rate drift on variable frame rate videos. An index records what
+    the decoder actually returns, so that samples are spread over the frames that exist, each color is timed with
+    the timestamp of its frame, and frames are reached by seeking only when a keyframe makes it cheaper than grabbing.
+    """
+
+    __slots__ = ("timestamps", "keyframes")
+
+    def __init__(self, timestamps: Sequence[float], keyframes: Sequence[int]) -> None:
+        """
+        :param Sequence[float] timestamps: Presentation timestamp of each frame, in seconds.
+        :param Sequence[int] keyframes: Increasing indices of the keyframes.
+        """
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.keyframes: List[int] = [int(keyframe) for keyframe in keyframes]
+
+    @property
+    def frame_count(self) -> int:
+        """
+        :return: int: The exact number of frames of the video.
+        """
+        return len(self.timestamps)
+
+
+def scan_frame_index(video_path: str) -> FrameIndex:
+    """
+    Index the frames of a video by grabbing through all of them once.
+
+    Grabbing decodes frames without converting them to BGR, and keyframes are the frames the decoder reports as
+    intra-coded. Backends other than FFmpeg do not report frame types, so their index has no keyframes.
+
+    :param str video_path: The path to the video file.
+    :return: FrameIndex: The index of the video.
+    :raises ValueError: If the video cannot be opened.
+    """
+    video = cv2.VideoCapture(video_path)
+    if not video.isOpened():
+        raise ValueError(f"Could not open the video file: {video_path}")
+
+    timestamps: List[float] = []
+    keyframes: List[int] = []
+    try:
+        while video.grab():
+            if int(video.get(cv2.CAP_PROP_FRAME_TYPE)) == INTRA_FRAME_TYPE:
+                keyframes.append(len(timestamps))
+            timestamps.append(video.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+    finally:
+        video.release()
+    return FrameIndex(timestamps, keyframes)
+
+
+def frame_index_key(video_path: str) -> str:
+    """
+    Returns the key of the index of a video: its absolute path, size and modification time, so that a replaced file
+    is indexed again.
+
+    :param str video_path: The path to the video file.
+    :return: str: Hexadecimal key.
+    """
+    stat = os.stat(video_path)
+    description = {
+        "version": FRAME_INDEX_VERSION,
+        "path": os.path.abspath(video_path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+
+def load_frame_index(video_path: str, directory: str) -> FrameIndex:
+    """
+    Load the index of a video from a directory, scanning the video and storing its index there the first time.
+
+    :param str video_path: The path to the video file.
+    :param str directory: The directory indexes are stored in, created if needed.
+    :return: FrameIndex: The index of the video.
+    """
+    index_path = os.path.join(directory, frame_index_key(video_path) + ".npz")
+    try:
+        with np.load(index_path) as data:
+            return FrameIndex(data["timestamps"], data["keyframes"])
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        pass
+
+    logging.info("Indexing the frames of %s", video_path)
+    frame_index = scan_frame_index(video_path)
+    os.makedirs(directory, exist_ok=True)
+    # Concurrent runs never read a partial index
+    save_npz_atomically(
+        index_path, {"timestamps": frame_index.timestamps, "keyframes": np.array(frame_index.keyframes, np.int64)}
+    )
+    return frame_index
@@ -0,0 +1,112 @@
+import struct
+import zlib
+from typing import BinaryIO, Iterable
+
+import cv2
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# PNG color types for 8-bit RGB and RGBA images, by number of channels
+PNG_COLOR_TYPES = {3: 2, 4: 6}
+# PNG row filter types: rows are stored as is, or as their difference with the row above
+PNG_FILTER_NONE = 0
+PNG_FILTER_UP = 2
+# Size of the strips of rows an image is converted and filtered by
+STRIP_BYTES = 4 * 1024 * 1024
+
+
+def _write_chunk(file: BinaryIO, chunk_type: bytes, data: bytes) -> None:
+    """
+    Writes a PNG chunk: its length, type, data and CRC.
+
+    :param BinaryIO file: The file to write to.
+    :param bytes chunk_type: The 4-letter chunk type.
+    :param bytes data: The chunk data.
+    :return: None
+    """
+    file.write(struct.pack(">I", len(data)))
+    file.write(chunk_type)
+    file.write(data)
+    file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type))))
+
+
+def write_png_strips(
+    destination_path: str,
+    strips: Iterable[np.ndarray],
+    width: int,
+    height: int,
+    channels: int,
+    compression_level: int = 6,
+) -> None:
+    """
+    Writes a PNG image from horizontal strips of rows, compressing each strip as it comes.
+
+    Only one strip is held in memory at a time, so images far larger than the available memory can be written.
+    Rows are stored with the 'up' filter: barcodes are mostly made of vertical bands, so all but the first row of a
+    horizontal barcode compress to almost nothing.
+
+    :param str destination_path: The path of the PNG file to write.
+    :param Iterable[np.ndarray] strips: BGR or BGRA uint8 strips of shape (rows, width, channels), top to bottom.
+    :param int width: The width of the image.
+    :param int height: The height of the image, which the strips must add up to.
+    :param int channels: 3 for BGR strips, 4 for BGRA strips.
+    :param int compression_level: zlib compression level, from 0 (none) to 9 (smallest). Default is 6.
+    :return: None
+    :raises ValueError: If the number of channels is not supported, or the strips do not match the image size.
+    """
+    if channels not in PNG_COLOR_TYPES:
+        raise ValueError(f"Unsupported number of channels: {channels}")
+    conversion = cv2.COLOR_BGRA2RGBA if channels == 4 else cv2.COLOR_BGR2RGB
+    compressor = zlib.compressobj(compression_level)
+    previous_row = None
+    rows_written = 0
+
+    with open(destination_path, "wb") as file:
+        file.write(PNG_SIGNATURE)
+        _write_chunk(file, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, PNG_COLOR_TYPES[channels], 0, 0, 0))
+
+        for strip in strips:
+            if strip.ndim != 3 or strip.shape[1:] != (width, channels):
+                raise ValueError(f"Invalid strip shape {strip.shape} for a {width}x{height}x{channels} image")
+            if len(strip) == 0:
+                continue
+            rows = cv2.cvtColor(np.ascontiguousarray(strip), conversion).reshape(len(strip), -1)
+
+            # Each row starts with its filter type, followed by its difference (modulo 256) with the row above
+            filtered = np.empty((len(rows), rows.shape[1] + 1), dtype=np.uint8)
+            filtered[:, 0] = PNG_FILTER_UP
+            if rows_written == 0:
+                filtered[0, 0] = PNG_FILTER_NONE
+                filtered[0, 1:] = rows[0]
+            else:
+                np.subtract(rows[0], previous_row, out=filtered[0, 1:])
+            np.subtract(rows[1:], rows[:-1], out=filtered[1:, 1:])
+            previous_row = rows[-1].copy()
+            rows_written += len(rows)
+
+            data = compressor.compress(filtered)
+            if data:
+                _write_chunk(file, b"IDAT", data)
+
+        if rows_written != height:
+            raise ValueError(f"The strips have {rows_written} rows, expected {height}")
+        _write_chunk(file, b"IDAT", compressor.flush())
+        _write_chunk(file, b"IEND", b"")
+
+
+def write_png(destination_path: str, image: np.ndarray, compression_level: int = 6) -> None:
+    """
+    Writes a BGR or BGRA image to a PNG file.
+
+    The image is converted to RGB(A) and filtered one strip of rows at a time, so writing it takes little memory
+    beyond the image itself.
+
+    :param str destination_path: The path of the PNG file to write.
+    :param np.ndarray image: BGR or BGRA uint8 image of shape (height, width, channels).
+    :param int compression_level: zlib compression level, from 0 (none) to 9 (smallest). Default is 6.
+    :return: None
+    """
+    height, width, channels = image.shape
+    strip_rows = max(1, STRIP_BYTES // max(1, width * channels))
+    strips = (image[top : top + strip_rows] for top in range(0, height, strip_rows))
+    write_png_strips(destination_path, strips, width, height, channels, compression_level)
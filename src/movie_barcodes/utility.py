@@ -1,19 +1,31 @@
 import argparse
+import csv
+import glob
+import json
 import logging
-from os import path, access, W_OK, makedirs
-from typing import Callable
+from os import path, access, listdir, W_OK, makedirs
+from typing import Callable, Iterable, List, Optional, Tuple
 import cv2
 import numpy as np
-from PIL import Image
 
 
 from .color_extraction import (
     get_dominant_color_mean,
-    get_dominant_color_kmeans,
+    KMeansColorExtractor,
     get_dominant_color_hsv,
     get_dominant_color_bgr,
     get_smoothed_frame,
 )
+from .ffmpeg_decoder import find_ffmpeg
+from .png_writer import write_png, write_png_strips
+
+# Barcodes with more pixels than this are rendered and written to PNG strip by strip, never whole in memory
+STREAMING_MIN_PIXELS = 64_000_000
+# zlib level of PNG outputs when not specified, the level Pillow used to save them with
+DEFAULT_PNG_COMPRESSION = 6
+# Output formats that keep the alpha channel of circular barcodes
+ALPHA_FORMATS = (".png", ".webp", ".tif", ".tiff")
+VIDEO_EXTENSIONS = (".mp4", ".webm", ".mkv")
 
 
 def validate_args(args: argparse.Namespace, frame_count: int, MAX_PROCESSES: int, MIN_FRAME_COUNT: int) -> None:
@@ -27,15 +39,15 @@ def validate_args(args: argparse.Namespace, frame_count: int, MAX_PROCESSES: int
     :return: None
     :raises FileNotFoundError: If the input video file does not exist.
     :raises ValueError: If the video file has an invalid extension, the destination path is not writable, the number of
-        workers is invalid, the width is invalid, the frame count is invalid, or the method is invalid.
+        workers is invalid, the width is invalid, the frame count is invalid, the method is invalid, or the ffmpeg
+        decoder is selected but ffmpeg is not installed.
     :raises PermissionError: If the destination path is not writable.
     """
     # Check if input video file exists
     if not path.exists(args.input_video_path):
         raise FileNotFoundError(f"The specified input video file '{args.input_video_path}' does not exist.")
 
-    valid_extensions = [".mp4", ".webm", ".mkv"]
-    if path.splitext(args.input_video_path)[1].lower() not in valid_extensions:
+    if path.splitext(args.input_video_path)[1].lower() not in VIDEO_EXTENSIONS:
         raise ValueError("The specified video file must have a valid video extension (e.g., .mp4, .webm, .mkv).")
 
     # Check if the destination path is writable
@@ -66,6 +78,54 @@ def validate_args(args: argparse.Namespace, frame_count: int, MAX_PROCESSES: int
     if frame_count < MIN_FRAME_COUNT:
         raise ValueError(f"The video must have at least {MIN_FRAME_COUNT} frames.")
 
+    # Fail before extraction starts rather than in the first worker
+    if args.decoder == "ffmpeg":
+        find_ffmpeg()
+
+
+def list_batch_videos(source: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    Lists the videos of a batch.
+
+    The source is either a directory, whose video files are listed, a glob pattern, or a CSV or JSON manifest. A CSV
+    manifest has a 'path' column and an optional 'output_name' column. A JSON manifest is a list of paths, or of
+    objects with a 'path' and an optional 'output_name'. Relative paths in a manifest are relative to the manifest.
+
+    :param str source: The directory, glob pattern or manifest path.
+    :return: List[Tuple[str, Optional[str]]]: The path and custom output name, if any, of each video.
+    :raises FileNotFoundError: If the source does not exist or matches no file.
+    :raises ValueError: If a manifest is invalid.
+    """
+    if path.isdir(source):
+        names = sorted(name for name in listdir(source) if path.splitext(name)[1].lower() in VIDEO_EXTENSIONS)
+        return [(path.join(source, name), None) for name in names]
+
+    extension = path.splitext(source)[1].lower()
+    if extension in (".csv", ".json") and path.isfile(source):
+        with open(source, newline="", encoding="utf-8") as file:
+            if extension == ".csv":
+                entries = list(csv.DictReader(file))
+                if entries and "path" not in entries[0]:
+                    raise ValueError(f"The manifest '{source}' has no 'path' column.")
+            else:
+                entries = json.load(file)
+                if not isinstance(entries, list):
+                    raise ValueError(f"The manifest '{source}' must be a list of videos.")
+        manifest_dir = path.dirname(source)
+        videos = []
+        for entry in entries:
+            if isinstance(entry, str):
+                entry = {"path": entry}
+            if not isinstance(entry, dict) or not entry.get("path"):
+                raise ValueError(f"Invalid entry in the manifest '{source}': {entry!r}")
+            videos.append((path.join(manifest_dir, entry["path"]), entry.get("output_name") or None))
+        return videos
+
+    matches = sorted(match for match in glob.glob(source) if path.isfile(match))
+    if not matches:
+        raise FileNotFoundError(f"No video found for '{source}'.")
+    return [(match, None) for match in matches]
+
 
 def get_dominant_color_function(method: str) -> Callable:
     """
@@ -79,7 +139,8 @@ def get_dominant_color_function(method: str) -> Callable:
         # return get_dominant_color_avg
         return get_dominant_color_mean
     if method == "kmeans":
-        return get_dominant_color_kmeans
+        # A new stateful extractor per run, warm-started from frame to frame
+        return KMeansColorExtractor()
     if method == "hsv":
         return get_dominant_color_hsv
     if method == "bgr":
@@ -90,6 +151,62 @@ def get_dominant_color_function(method: str) -> Callable:
     raise ValueError(f"Invalid method: {method}")
 
 
+def parse_resolution(value: str) -> Tuple[int, int]:
+    """
+    Parses a resolution given as WIDTHxHEIGHT (e.g. '160x90').
+
+    :param str value: The resolution string.
+    :return: Tuple of (width, height).
+    :raises argparse.ArgumentTypeError: If the value is not a valid resolution.
+    """
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid resolution '{value}', expected WIDTHxHEIGHT (e.g. 160x90).")
+
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"Invalid resolution '{value}', width and height must be greater than 0.")
+
+    return width, height
+
+
+def parse_chunk_size(value: str) -> Tuple[float, str]:
+    """
+    Parses a chunk size given either in frames (e.g. '500') or in seconds (e.g. '30s').
+
+    :param str value: The chunk size string.
+    :return: Tuple of (amount, unit) where unit is 'frames' or 'seconds'.
+    :raises argparse.ArgumentTypeError: If the value is not a valid chunk size.
+    """
+    unit = "seconds" if value.lower().endswith("s") else "frames"
+    try:
+        amount = float(value[:-1]) if unit == "seconds" else int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid chunk size '{value}', expected frames (e.g. 500) or seconds (30s).")
+
+    if amount <= 0:
+        raise argparse.ArgumentTypeError(f"Invalid chunk size '{value}', it must be greater than 0.")
+
+    return amount, unit
+
+
+def chunk_size_in_frames(chunk_size: Optional[Tuple[float, str]], fps: float) -> Optional[int]:
+    """
+    Converts a chunk size returned by parse_chunk_size to a number of frames.
+
+    :param Optional[Tuple[float, str]] chunk_size: (amount, unit) tuple, or None.
+    :param float fps: Frame rate of the video, used for chunk sizes in seconds.
+    :return: The chunk size in frames (at least 1), or None if no chunk size was given.
+    """
+    if chunk_size is None:
+        return None
+
+    amount, unit = chunk_size
+    if unit == "seconds":
+        amount *= fps if fps > 0 else 1
+    return max(1, int(amount))
+
+
 def format_time(seconds: float) -> str:
     """
     Formats time in seconds to a string representation.
@@ -130,6 +247,101 @@ def save_barcode_image(barcode: np.ndarray, base_name: str, args: argparse.Names
     :param args: Command line arguments.
     :param str method: The method used for color extraction.
     """
+    destination_path = get_destination_path(base_name, args, method)
+    extension = path.splitext(destination_path)[1].lower()
+
+    if extension == ".png":
+        # Converted and compressed strip by strip, which is also faster than OpenCV's PNG encoder on barcodes
+        write_png(destination_path, barcode, args.png_compression)
+        logging.info("File saved at '%s'", destination_path)
+        return
+
+    # OpenCV encoders take BGR(A) directly, so the barcode is not converted or copied before encoding
+    if barcode.shape[2] == 4 and extension not in ALPHA_FORMATS:
+        barcode = cv2.cvtColor(barcode, cv2.COLOR_BGRA2BGR)
+
+    try:
+        success, encoded = cv2.imencode(extension, barcode, get_encoder_params(args, extension))
+    except cv2.error as e:
+        raise ValueError(f"Cannot save the barcode as '{extension}': {e}") from e
+    if not success:
+        raise ValueError(f"Cannot save the barcode as '{extension}'.")
+    # Written from Python rather than with cv2.imwrite, which does not support non-ASCII paths on every platform
+    encoded.tofile(destination_path)
+    logging.info("File saved at '%s'", destination_path)
+
+
+def get_encoder_params(args: argparse.Namespace, extension: str) -> list:
+    """
+    Returns the OpenCV encoder parameters for a JPEG or WebP output, from the command line arguments.
+
+    :param args: Command line arguments.
+    :param str extension: The lowercase extension of the output file, e.g. '.png'.
+    :return: list: Flat list of cv2.IMWRITE_* parameter ids and values.
+    """
+    quality = args.quality
+
+    if extension in (".jpg", ".jpeg") and quality is not None:
+        return [cv2.IMWRITE_JPEG_QUALITY, quality]
+    if extension == ".webp":
+        # A WebP quality above 100 selects lossless compression
+        if args.lossless:
+            return [cv2.IMWRITE_WEBP_QUALITY, 101]
+        if quality is not None:
+            return [cv2.IMWRITE_WEBP_QUALITY, quality]
+    return []
+
+
+def save_barcode_strips(
+    strips: Iterable[np.ndarray],
+    width: int,
+    height: int,
+    channels: int,
+    base_name: str,
+    args: argparse.Namespace,
+    method: str,
+) -> None:
+    """
+    Saves a barcode rendered strip by strip to a PNG file, one strip in memory at a time.
+
+    :param Iterable[np.ndarray] strips: BGR or BGRA strips of the barcode, top to bottom.
+    :param int width: The width of the barcode image.
+    :param int height: The height of the barcode image.
+    :param int channels: 3 for a BGR barcode, 4 for a BGRA one.
+    :param str base_name: The base name of the file to save.
+    :param args: Command line arguments.
+    :param str method: The method used for color extraction.
+    """
+    destination_path = get_destination_path(base_name, args, method)
+    write_png_strips(destination_path, strips, width, height, channels, args.png_compression)
+    logging.info("File saved at '%s'", destination_path)
+
+
+def use_streaming(args: argparse.Namespace, width: int, height: int) -> bool:
+    """
+    Whether a barcode should be rendered and saved strip by strip rather than whole.
+
+    Only PNG outputs are streamed, when the barcode has more than STREAMING_MIN_PIXELS pixels.
+
+    :param args: Command line arguments.
+    :param int width: The width of the barcode image.
+    :param int height: The height of the barcode image.
+    :return: bool: True to stream the barcode.
+    """
+    if args.destination_path and not args.destination_path.lower().endswith(".png"):
+        return False
+    return width * height > STREAMING_MIN_PIXELS
+
+
+def get_destination_path(base_name: str, args: argparse.Namespace, method: str) -> str:
+    """
+    Returns the path to save a barcode image to, creating its directory if needed.
+
+    :param str base_name: The base name of the file to save.
+    :param args: Command line arguments.
+    :param str method: The method used for color extraction.
+    :return: str: The destination path.
+    """
     current_dir = path.dirname(path.abspath(__file__))
     # Go up two directories to reach the repository root (…/src/movie_barcodes -> …/src -> repo root)
     project_root = path.dirname(path.dirname(current_dir))
@@ -157,17 +369,23 @@ def save_barcode_image(barcode: np.ndarray, base_name: str, args: argparse.Names
         parent_dir = path.dirname(destination_path) or "."
         ensure_directory(parent_dir)
 
-    if barcode.shape[2] == 4:  # If the image has an alpha channel (RGBA)
-        # Convert BGRA -> RGBA once at save-time
-        barcode_to_save = cv2.cvtColor(barcode, cv2.COLOR_BGRA2RGBA)
-        image = Image.fromarray(barcode_to_save, "RGBA")
-    else:  # If the image doesn't have an alpha channel (RGB)
-        # Convert BGR -> RGB once at save-time
-        barcode_to_save = cv2.cvtColor(barcode, cv2.COLOR_BGR2RGB)
-        image = Image.fromarray(barcode_to_save, "RGB")
+    return destination_path
 
-    image.save(destination_path)
-    logging.info("File saved at '%s'", destination_path)
+
+def resolve_output_path(output_path: str) -> str:
+    """
+    Resolves an output path like destination paths: relative paths are relative to the project root. Its parent
+    directory is created if needed.
+
+    :param str output_path: The output path.
+    :return: str: The absolute output path.
+    """
+    current_dir = path.dirname(path.abspath(__file__))
+    project_root = path.dirname(path.dirname(current_dir))
+    if not path.isabs(output_path):
+        output_path = path.join(project_root, output_path)
+    ensure_directory(path.dirname(output_path))
+    return output_path
 
 
 def ensure_directory(directory_name: str) -> None:
@@ -1,16 +1,214 @@
-from multiprocessing import Pool
-from typing import Callable, List, Optional
+import logging
+from bisect import bisect_left, bisect_right
+import copy
+import math
+import os
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from multiprocessing import Pool, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from queue import Empty, Queue
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import cv2
 import numpy as np
-from tqdm import tqdm
 
+from .color_extraction import get_batch_extractor
+from .color_sequence import ColorBuffer, ColorSequence, color_dtype
+from .cpu_budget import limit_threads, threads_per_worker
+from .ffmpeg_decoder import iter_ffmpeg_frames
+from .frame_index import FrameIndex
 
-def load_video(video_path: str) -> tuple:
+SAMPLING_STRATEGIES = ("auto", "grab", "seek", "keyframes")
+# Gap (in frames) above which seeking is cheaper than grabbing through: a seek decodes from the previous keyframe,
+# which for common encoder settings (keyframe every 2 to 10 seconds) costs about half a GOP on average.
+SEEK_MIN_GAP = 120
+# Size (in bytes) of the frame stack batched for vectorized extractors: a full batch of frames at the 160x90 analysis
+# resolution takes 2.8 MB, larger frames are stacked fewer at a time, and frames too large to stack two of are
+# extracted one by one.
+BATCH_MAX_BYTES = 4 * 1024 * 1024
+BATCH_SIZE = 64
+EXECUTORS = ("process", "thread")
+# Video decoders: OpenCV's VideoCapture, or an ffmpeg subprocess scaling and selecting frames before piping them
+DECODERS = ("opencv", "ffmpeg")
+# Decoded frames buffered between each decoder thread and its extractor thread
+THREAD_QUEUE_SIZE = 8
+# Default number of chunks per worker: idle workers pick the next pending chunk, so slow parts of the video are
+# spread across workers instead of stalling the last one
+CHUNKS_PER_WORKER = 4
+# Open video captures kept by each pool worker, so that consecutive chunks of a video skip opening the container
+MAX_CACHED_CAPTURES = 8
+
+# Per-process cache of open captures, only enabled in ExtractionPool workers
+_CACHE_CAPTURES = False
+# Decoder threads of the captures opened by this process, 0 for the backend default (one per CPU of the machine).
+# Set in ExtractionPool workers to their share of the CPU budget.
+_DECODE_THREADS = 0
+_CAPTURE_CACHE: "OrderedDict[tuple, cv2.VideoCapture]" = OrderedDict()
+
+
+def _progress_bar(iterable: Optional[Iterable] = None, **kwargs):
+    """
+    Returns a tqdm progress bar. tqdm is imported on first use, so that callers and worker processes that do not show
+    progress never load it.
+
+    :param Optional[Iterable] iterable: The iterable to track, if any.
+    :param kwargs: Keyword arguments of tqdm.
+    :return: tqdm: The progress bar.
+    """
+    from tqdm import tqdm
+
+    return tqdm(iterable, **kwargs)
+
+
+def _init_pool_worker(threads: int) -> None:
+    """
+    Initializer of ExtractionPool worker processes: enable the capture cache and keep the threads of OpenCV, BLAS
+    and the video decoders within the worker's share of the CPU budget.
+
+    :param int threads: The number of threads the worker may use.
+    """
+    global _CACHE_CAPTURES, _DECODE_THREADS
+    _CACHE_CAPTURES = True
+    _DECODE_THREADS = threads
+    limit_threads(threads)
+
+
+def _new_capture(video_path: str, decode_threads: int) -> cv2.VideoCapture:
+    """
+    Open a video capture with a number of decoder threads.
+
+    :param str video_path: The path to the video file.
+    :param int decode_threads: The number of decoder threads, 0 for the backend default.
+    :return: cv2.VideoCapture: The capture.
+    """
+    if decode_threads > 0:
+        return cv2.VideoCapture(video_path, cv2.CAP_ANY, [cv2.CAP_PROP_N_THREADS, decode_threads])
+    return cv2.VideoCapture(video_path)
+
+
+def _open_capture(video_path: str, decode_threads: Optional[int] = None) -> Tuple[cv2.VideoCapture, bool]:
+    """
+    Open a video capture, reusing the one cached by this worker process if there is one.
+
+    Cached captures are keyed by path, size and modification time, so a file replaced on disk is reopened.
+
+    :param str video_path: The path to the video file.
+    :param Optional[int] decode_threads: The number of decoder threads of a new capture. Defaults to the share of
+        this process.
+    :return: Tuple containing the capture and whether it is cached (and must not be released by the caller).
+    """
+    if decode_threads is None:
+        decode_threads = _DECODE_THREADS
+    if not _CACHE_CAPTURES or MAX_CACHED_CAPTURES < 1:
+        return _new_capture(video_path, decode_threads), False
+
+    try:
+        stat = os.stat(video_path)
+    except OSError:
+        return _new_capture(video_path, decode_threads), False
+
+    key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+    video = _CAPTURE_CACHE.get(key)
+    if video is not None:
+        _CAPTURE_CACHE.move_to_end(key)
+        return video, True
+
+    video = _new_capture(video_path, decode_threads)
+    if not video.isOpened():
+        return video, False
+    _CAPTURE_CACHE[key] = video
+    while len(_CAPTURE_CACHE) > MAX_CACHED_CAPTURES:
+        _, evicted = _CAPTURE_CACHE.popitem(last=False)
+        evicted.release()
+    return video, True
+
+
+class ExtractionPool:
+    """
+    Long-lived pool of worker processes for parallel color extraction.
+
+    Creating a multiprocessing pool costs a process start, module imports and, for every chunk, opening the video.
+    An ExtractionPool is created once, e.g. for a batch of videos, and passed to parallel_extract_colors for every
+    extraction. Its workers keep their last MAX_CACHED_CAPTURES videos open between chunks.
+
+    OpenCV, the BLAS library and the video decoders each start one thread per CPU by default, in every worker. The
+    CPU budget (see available_cpus) is instead split between workers, and each worker limits all of them to its share.
+
+    Use it as a context manager::
+
+        with ExtractionPool(8) as pool:
+            for path in paths:
+                colors = parallel_extract_colors(path, ..., pool=pool)
+    """
+
+    def __init__(self, workers: int, threads: Optional[int] = None) -> None:
+        """
+        :param int workers: Number of worker processes.
+        :param Optional[int] threads: Number of threads each worker may use. Defaults to an equal share of the CPU
+            budget.
+        """
+        self.workers = max(1, workers)
+        self.threads = threads if threads is not None else threads_per_worker(self.workers)
+        self._pool: Optional[Pool] = None
+
+    def __enter__(self) -> "ExtractionPool":
+        # Workers must share this process' resource tracker: one started by a worker would consider the shared
+        # result arrays it attaches to as leaked, and unlink them when the worker exits
+        resource_tracker.ensure_running()
+        self._pool = Pool(self.workers, initializer=_init_pool_worker, initargs=(self.threads,))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if self._pool is None:
+            return
+        if exc_type is None:
+            self._pool.close()
+        else:
+            self._pool.terminate()
+        self._pool.join()
+        self._pool = None
+
+    def imap_unordered(self, func: Callable, iterable) -> Iterator:
+        """
+        Run func over iterable in the worker processes, yielding results as they complete.
+
+        :param Callable func: A picklable function.
+        :param iterable: The arguments to call func with.
+        :return: Iterator over the results, in completion order.
+        :raises RuntimeError: If the pool is not open.
+        """
+        if self._pool is None:
+            raise RuntimeError("The extraction pool is not open, use it as a context manager.")
+        return self._pool.imap_unordered(func, iterable)
+
+    def apply_async(self, func: Callable, args: tuple, callback: Callable, error_callback: Callable) -> None:
+        """
+        Run func(*args) in a worker process, then call callback with its result or error_callback with its exception.
+
+        The callbacks run in a thread of this process.
+
+        :param Callable func: A picklable function.
+        :param tuple args: The arguments to call func with.
+        :param Callable callback: Called with the result.
+        :param Callable error_callback: Called with the exception if func raises.
+        :return: None
+        :raises RuntimeError: If the pool is not open.
+        """
+        if self._pool is None:
+            raise RuntimeError("The extraction pool is not open, use it as a context manager.")
+        self._pool.apply_async(func, args, callback=callback, error_callback=error_callback)
+
+
+def load_video(video_path: str, frame_index: Optional[FrameIndex] = None) -> tuple:
     """
     Load a video file and return its properties.
 
     :param str video_path: The path to the video file.
+    :param Optional[FrameIndex] frame_index: The index of the video. Its exact frame count is used instead of the
+        estimate of the container.
     :return: Tuple containing the video capture object, frame count, frame width, and frame height.
     """
     video = cv2.VideoCapture(video_path)
@@ -18,7 +216,10 @@ def load_video(video_path: str) -> tuple:
     if not video.isOpened():
         raise ValueError(f"Could not open the video file: {video_path}")
 
-    frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    if frame_index is not None:
+        frame_count = frame_index.frame_count
+    else:
+        frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
     frame_width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
     frame_height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
@@ -37,64 +238,751 @@ def parallel_extract_colors(
     color_extractor: Callable,
     workers: int,
     target_frames: Optional[int] = None,
-) -> list:
+    sampling: str = "auto",
+    return_indices: bool = False,
+    analysis_resolution: Optional[Tuple[int, int]] = None,
+    executor: str = "process",
+    chunk_size: Optional[int] = None,
+    pool: Optional[ExtractionPool] = None,
+    frame_index: Optional[FrameIndex] = None,
+    decoder: str = "opencv",
+):
     """
     Extract dominant colors from frames in a video file using parallel processing.
 
+    The video is split into many more chunks than workers, and idle workers pick the next pending chunk, so that a
+    slow part of the video (high bitrate, expensive frames) does not leave the other workers idle at the end.
+
+    With the 'process' executor chunks are dispatched to worker processes, which write colors directly into a shared
+    memory array at the offset of their chunk. That array is returned as is: no colors are pickled or copied back.
+    With the 'thread' executor each worker has a decoder thread feeding a bounded queue consumed by an extractor
+    thread: OpenCV and NumPy release the GIL, so threads use all cores without starting processes, pickling results
+    or duplicating memory.
+
     :param str video_path: The path to the video file.
     :param int frame_count: The total number of frames in the video.
     :param Callable color_extractor: A function to extract the dominant color from a frame.
     :param int workers: Number of parallel workers.
     :param Optional[int] target_frames: The total number of frames to sample.
-    :return: List of dominant colors for the frames in the video.
+    :param str sampling: Sampling strategy: 'auto', 'grab', 'seek' or 'keyframes'. Defaults to 'auto'.
+    :param bool return_indices: Whether to also return the index of the frame each color was extracted from.
+    :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames are downscaled to before color
+        extraction. Defaults to the full frame.
+    :param str executor: 'process' or 'thread'. Defaults to 'process'.
+    :param Optional[int] chunk_size: Number of frames per chunk. Defaults to splitting the video into
+        CHUNKS_PER_WORKER chunks per worker.
+    :param Optional[ExtractionPool] pool: An open pool to run the 'process' executor on, reused across calls.
+        Its number of workers takes precedence over workers. Defaults to a pool created for this call.
+    :param Optional[FrameIndex] frame_index: The index of the video, whose keyframes are used to reach frames with
+        the fewest decodes. Defaults to no index.
+    :param str decoder: Video decoder: 'opencv' or 'ffmpeg' (see iter_decoded_frames). Defaults to 'opencv'.
+    :return: Dominant colors for the frames in the video, as a NumPy array with one row per frame stored as in a
+        ColorSequence, or a (colors, frame indices) tuple if return_indices is True.
+    :raises ValueError: If the executor is invalid.
+    """
+    outputs, frame_indices = _parallel_extract(
+        video_path,
+        frame_count,
+        color_extractor,
+        False,
+        workers,
+        target_frames,
+        sampling,
+        analysis_resolution,
+        executor,
+        chunk_size,
+        pool,
+        frame_index,
+        decoder,
+    )
+    if return_indices:
+        return outputs[0], frame_indices
+    return outputs[0]
+
+
+def _parallel_extract(
+    video_path: str,
+    frame_count: int,
+    color_extractor: Callable,
+    combined: bool,
+    workers: int,
+    target_frames: Optional[int],
+    sampling: str,
+    analysis_resolution: Optional[Tuple[int, int]],
+    executor: str,
+    chunk_size: Optional[int],
+    pool: Optional[ExtractionPool],
+    frame_index: Optional[FrameIndex],
+    decoder: str,
+) -> Tuple[list, List[int]]:
+    """
+    Run a parallel extraction and return the colors of each extractor output separately.
+
+    See parallel_extract_colors for the parameters.
+
+    :param bool combined: Whether color_extractor applies several extractors (see _apply_extractors) and returns a
+        tuple of colors per frame.
+    :return: Tuple containing the colors of each extractor output, in order, and the frame indices.
+    :raises ValueError: If the executor is invalid.
     """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Invalid executor: {executor}")
+
     if target_frames is None:
         target_frames = frame_count
 
+    keyframes = _extraction_keyframes(video_path, sampling, frame_index)
+
+    if pool is not None and executor == "process":
+        workers = pool.workers
+
     # Cap workers to available work to avoid empty tasks
     active_workers = max(1, min(workers, frame_count, target_frames))
 
-    # Evenly distribute frame ranges across active workers
-    base_frames = frame_count // active_workers
-    remainder_frames = frame_count % active_workers
+    if chunk_size is None:
+        chunks = active_workers * CHUNKS_PER_WORKER
+    else:
+        chunks = math.ceil(frame_count / max(1, chunk_size))
+    segments = split_segments(frame_count, max(1, min(chunks, frame_count, target_frames)), target_frames)
+
+    if executor == "thread":
+        results = _extract_segments_threaded(
+            video_path, segments, color_extractor, active_workers, sampling, keyframes, analysis_resolution, decoder
+        )
+        return _merge_chunk_results(results, _extractor_outputs(color_extractor))
+
+    blocks, offsets, tasks = _plan_chunk_tasks(
+        video_path, color_extractor, combined, segments, sampling, keyframes, analysis_resolution, decoder
+    )
+    try:
+        if pool is None:
+            with ExtractionPool(active_workers) as call_pool:
+                chunk_indices = _run_chunks(call_pool, tasks)
+        else:
+            chunk_indices = _run_chunks(pool, tasks)
+    except BaseException:
+        _discard_result_blocks(blocks)
+        raise
+    return _collect_chunk_results(blocks, offsets, chunk_indices)
+
+
+def _plan_chunk_tasks(
+    video_path: str,
+    color_extractor: Callable,
+    combined: bool,
+    segments: List[Tuple[int, int, int]],
+    sampling: str,
+    keyframes: Optional[List[int]],
+    analysis_resolution: Optional[Tuple[int, int]],
+    decoder: str,
+) -> Tuple[List[Tuple[SharedMemory, tuple, str]], List[int], List[tuple]]:
+    """
+    Allocate the shared result arrays of a video and build the worker task of each of its segments.
+
+    :param str video_path: The path to the video file.
+    :param Callable color_extractor: The color extractor the workers run.
+    :param bool combined: Whether color_extractor returns a tuple of colors per frame.
+    :param List[Tuple[int, int, int]] segments: The (start frame, end frame, number of samples) of each chunk.
+    :param str sampling: Sampling strategy.
+    :param Optional[List[int]] keyframes: The keyframes of the video, if known.
+    :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames are downscaled to.
+    :param str decoder: The video decoder.
+    :return: Tuple containing the shared result blocks, the first row of each chunk and the arguments of
+        _extract_colors_task for each chunk.
+    """
+    blocks = _create_result_blocks(
+        video_path, color_extractor, combined, analysis_resolution, sum(samples for _, _, samples in segments)
+    )
+    offsets = np.cumsum([0] + [samples for _, _, samples in segments[:-1]]).tolist()
+    task_args = [
+        (
+            video_path,
+            start_frame,
+            end_frame,
+            color_extractor,
+            samples,
+            sampling,
+            keyframes,
+            True,
+            analysis_resolution,
+            BATCH_SIZE,
+            False,
+            decoder,
+        )
+        for start_frame, end_frame, samples in segments
+    ]
+    layout = [(block.name, shape, dtype) for block, shape, dtype in blocks]
+    tasks = [
+        (position, args, layout, offset, combined) for position, (args, offset) in enumerate(zip(task_args, offsets))
+    ]
+    return blocks, offsets, tasks
+
+
+def _discard_result_blocks(blocks: List[Tuple[SharedMemory, tuple, str]]) -> None:
+    """
+    Close and unlink the shared result blocks of an extraction that did not complete.
+
+    :param blocks: The (shared memory block, array shape, dtype name) of each extractor output.
+    :return: None
+    """
+    for block, _, _ in blocks:
+        block.close()
+        block.unlink()
+
+
+def _collect_chunk_results(
+    blocks: List[Tuple[SharedMemory, tuple, str]], offsets: List[int], chunk_indices: List[List[int]]
+) -> Tuple[list, List[int]]:
+    """
+    Build the result arrays of an extraction from the shared blocks its chunks wrote to.
+
+    :param blocks: The (shared memory block, array shape, dtype name) of each extractor output.
+    :param List[int] offsets: The first row of each chunk.
+    :param List[List[int]] chunk_indices: The indices of the frames each chunk wrote, in chunk order.
+    :return: Tuple containing the colors of each extractor output, in order, and the frame indices.
+    """
+    # Workers are done with the blocks, only this process' mappings remain
+    for block, _, _ in blocks:
+        block.unlink()
+
+    # Chunks may decode fewer frames than planned, and neighbouring chunks may snap to the same keyframe: keep the
+    # rows each chunk wrote, and each frame once
+    rows: List[int] = []
+    frame_indices: List[int] = []
+    for offset, indices in zip(offsets, chunk_indices):
+        for row, index in enumerate(indices, offset):
+            if frame_indices and index <= frame_indices[-1]:
+                continue
+            rows.append(row)
+            frame_indices.append(index)
+
+    outputs = []
+    for block, shape, dtype in blocks:
+        flat = np.frombuffer(block.buf, dtype, count=int(np.prod(shape)))
+        if rows == list(range(shape[0])):
+            # The common case: every planned row was written, hand out the shared array itself. The block is closed
+            # once the memoryview the array and its views hold is destroyed: the array itself is finalized while it
+            # still holds the memoryview, too early to close the block.
+            finalizer = weakref.finalize(flat.base, block.close)
+            finalizer.atexit = False
+            outputs.append(flat.reshape(shape))
+            del flat
+        else:
+            outputs.append(flat.reshape(shape)[rows])
+            del flat
+            block.close()
+    return outputs, frame_indices
+
+
+def _merge_chunk_results(results: list, outputs: int) -> Tuple[list, List[int]]:
+    """
+    Concatenate the (colors, indices) results of all chunks, keeping a frame snapped to by neighbouring chunks once.
+
+    :param list results: The results of each chunk, in chunk order: a list with one array per extractor output and
+        the frame indices.
+    :param int outputs: Number of extractor outputs (see _extractor_outputs).
+    :return: Tuple containing the colors of each extractor output, in order, and the frame indices.
+    """
+    kept = []
+    final_indices: List[int] = []
+    for colors, indices in results:
+        rows = []
+        for row, index in enumerate(indices):
+            if final_indices and index <= final_indices[-1]:
+                continue
+            rows.append(row)
+            final_indices.append(index)
+        if rows:
+            kept.append((colors, rows))
+
+    if not kept:
+        return [ColorBuffer(0).colors for _ in range(outputs)], final_indices
+    return [np.concatenate([colors[output][rows] for colors, rows in kept]) for output in range(outputs)], final_indices
+
+
+def _create_result_blocks(
+    video_path: str,
+    color_extractor: Callable,
+    combined: bool,
+    analysis_resolution: Optional[Tuple[int, int]],
+    rows: int,
+) -> List[Tuple[SharedMemory, tuple, str]]:
+    """
+    Allocate one shared memory array per extractor output, with one row per sampled frame.
+
+    The shape of a row is found by running a copy of the extractor on a black frame of the analysed size, and its
+    dtype is the one ColorSequence stores these colors as.
+
+    :param str video_path: The path to the video file.
+    :param Callable color_extractor: The color extractor the workers run.
+    :param bool combined: Whether color_extractor returns a tuple of colors per frame.
+    :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames are downscaled to.
+    :param int rows: Number of rows to allocate.
+    :return: List of (shared memory block, array shape, dtype name) tuples, one per extractor output.
+    """
+    video = cv2.VideoCapture(video_path)
+    frame_shape = (int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(video.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+    video.release()
+    probe = copy.deepcopy(color_extractor)(downscale_frame(np.zeros(frame_shape, np.uint8), analysis_resolution))
+
+    blocks = []
+    for output in probe if combined else (probe,):
+        output = np.asarray(output)
+        shape = (rows,) + output.shape
+        # Stored as a ColorSequence stores colors, so that it wraps the shared array without a copy
+        dtype = color_dtype(output.dtype)
+        block = SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+        blocks.append((block, shape, dtype.str))
+    return blocks
+
+
+def _run_chunks(pool: ExtractionPool, tasks: List[tuple]) -> list:
+    """
+    Run the chunk tasks on a pool and put each result back at the position of its chunk.
+
+    :param ExtractionPool pool: The open pool to use.
+    :param List[tuple] tasks: The arguments of _extract_colors_task for each chunk.
+    :return: List of the frame indices of each chunk, in chunk order.
+    """
+    results: list = [None] * len(tasks)
+    for position, result in _progress_bar(
+        pool.imap_unordered(_extract_colors_task, tasks),
+        total=len(tasks),
+        desc="Processing chunks",
+    ):
+        results[position] = result
+    return results
+
+
+def _extract_colors_task(task: Tuple[int, tuple, list, int, bool]) -> Tuple[int, List[int]]:
+    """
+    Run extract_colors for one chunk in a worker process and write its colors into the shared result arrays.
+
+    :param tuple task: The chunk position, the positional arguments of extract_colors, the (name, shape, dtype) of
+        each shared result array, the first row of the chunk and whether colors are tuples with one color per
+        extractor.
+    :return: Tuple containing the chunk position and the indices of the frames written.
+    """
+    position, args, layout, offset, combined = task
+    colors, indices = extract_colors(*args)
+
+    for output_colors, (name, shape, dtype) in zip(colors if combined else [colors], layout):
+        block = SharedMemory(name=name)
+        try:
+            array = np.ndarray(shape, dtype, buffer=block.buf)
+            array[offset : offset + len(output_colors)] = output_colors
+            del array
+        finally:
+            block.close()
+    return position, indices
+
+
+def split_segments(frame_count: int, segments: int, target_frames: int) -> List[Tuple[int, int, int]]:
+    """
+    Split a video into contiguous frame ranges and spread the samples evenly across them.
+
+    :param int frame_count: The total number of frames in the video.
+    :param int segments: Number of segments to split the video into.
+    :param int target_frames: The total number of frames to sample.
+    :return: List of (start frame, end frame, number of samples) tuples, skipping segments without samples.
+    """
+    # Evenly distribute frame ranges across segments
+    base_frames = frame_count // segments
+    remainder_frames = frame_count % segments
     frame_ranges = []
     start = 0
-    for i in range(active_workers):
+    for i in range(segments):
         length = base_frames + (1 if i < remainder_frames else 0)
         end = start + length - 1
         frame_ranges.append((start, end))
         start = end + 1
 
     # Evenly distribute target samples ensuring total equals target_frames
-    base_samples = target_frames // active_workers
-    remainder_samples = target_frames % active_workers
-    samples_per_worker = [base_samples + (1 if i < remainder_samples else 0) for i in range(active_workers)]
-
-    # Build only tasks that have at least one sample (avoid passing 0 -> falsy)
-    task_args = []
-    for i in range(active_workers):
-        if samples_per_worker[i] <= 0:
-            continue
-        start_frame, end_frame = frame_ranges[i]
-        if end_frame < start_frame:
+    base_samples = target_frames // segments
+    remainder_samples = target_frames % segments
+    samples_per_segment = [base_samples + (1 if i < remainder_samples else 0) for i in range(segments)]
+
+    # Keep only segments that have at least one sample (avoid passing 0 -> falsy)
+    return [
+        (start_frame, end_frame, samples)
+        for (start_frame, end_frame), samples in zip(frame_ranges, samples_per_segment)
+        if samples > 0 and end_frame >= start_frame
+    ]
+
+
+def _decode_chunks_into_queue(
+    video_path: str,
+    chunk_queue: Queue,
+    frame_queue: Queue,
+    analysis_resolution: Optional[Tuple[int, int]],
+    keyframes: Optional[List[int]] = None,
+    decode_threads: Optional[int] = None,
+    decoder: str = "opencv",
+) -> None:
+    """
+    Producer side of the threaded pipeline: decode pending chunks until none is left, pushing their frames into a
+    bounded queue, then a None sentinel.
+
+    :param str video_path: The path to the video file.
+    :param Queue chunk_queue: Queue of (chunk position, frame indices, sampling strategy) shared by all decoders.
+    :param Queue frame_queue: The bounded queue shared with this decoder's extractor thread.
+    :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames are downscaled to.
+    :param Optional[List[int]] keyframes: Keyframe indices of the video, if known.
+    :param Optional[int] decode_threads: The number of threads of the decoder. Defaults to the share of this process.
+    :param str decoder: 'opencv' or 'ffmpeg'. Defaults to 'opencv'.
+    """
+    try:
+        while True:
+            try:
+                position, frame_indices, sampling = chunk_queue.get_nowait()
+            except Empty:
+                return
+            for index, frame in iter_decoded_frames(
+                video_path, frame_indices, sampling, analysis_resolution, keyframes, decode_threads, decoder
+            ):
+                # Frames of the ffmpeg decoder share one buffer, overwritten by the next frame
+                frame_queue.put((position, index, frame.copy() if decoder == "ffmpeg" else frame))
+    finally:
+        frame_queue.put(None)
+
+
+def _extract_queued_frames(
+    frame_queue: Queue, color_extractor: Callable, on_frame: Callable, capacities: Dict[int, int]
+) -> Dict[int, tuple]:
+    """
+    Consumer side of the threaded pipeline: extract the color of each queued frame until the None sentinel.
+
+    The queue is always drained, even after an error, so that the decoder thread never blocks on a full queue.
+
+    :param Queue frame_queue: The bounded queue shared with the decoder thread.
+    :param Callable color_extractor: A function to extract the dominant color from a frame.
+    :param Callable on_frame: Called after each frame, e.g. to update a progress bar.
+    :param Dict[int, int] capacities: The number of frames planned for each chunk position.
+    :return: Dictionary mapping each chunk position to its colors, a list with one array per extractor output, and
+        its frame indices.
+    """
+    buffers: Dict[int, Tuple[List[ColorBuffer], List[int]]] = {}
+    combined = _is_combined(color_extractor)
+    outputs = _extractor_outputs(color_extractor)
+    error = None
+    while (item := frame_queue.get()) is not None:
+        if error is not None:
             continue
-        task_args.append(
-            (
-                video_path,
-                start_frame,
-                end_frame,
-                color_extractor,
-                samples_per_worker[i],
-            )
+        position, index, frame = item
+        try:
+            if position not in buffers:
+                buffers[position] = ([ColorBuffer(capacities[position]) for _ in range(outputs)], [])
+            colors, indices = buffers[position]
+            for buffer, color in zip(colors, _output_colors(color_extractor(frame), combined)):
+                buffer.append(color)
+            indices.append(index)
+        except Exception as exc:
+            error = exc
+        on_frame()
+
+    if error is not None:
+        raise error
+    return {
+        position: ([buffer.colors for buffer in colors], indices) for position, (colors, indices) in buffers.items()
+    }
+
+
+def _extract_segments_threaded(
+    video_path: str,
+    segments: List[Tuple[int, int, int]],
+    color_extractor: Callable,
+    workers: int,
+    sampling: str,
+    keyframes: Optional[List[int]],
+    analysis_resolution: Optional[Tuple[int, int]],
+    decoder: str = "opencv",
+) -> List[Tuple[list, list]]:
+    """
+    Extract the colors of several chunks with, per worker, a decoder thread and an extractor thread.
+
+    Decoder threads pick the next pending chunk when they are done with the previous one.
+
+    :param str video_path: The path to the video file.
+    :param List[Tuple[int, int, int]] segments: (start frame, end frame, number of samples) of each chunk.
+    :param Callable color_extractor: A function to extract the dominant color from a frame.
+    :param int workers: Number of decoder/extractor thread pairs.
+    :param str sampling: Sampling strategy: 'auto', 'grab', 'seek' or 'keyframes'.
+    :param Optional[List[int]] keyframes: Keyframe indices of the video, if known.
+    :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames are downscaled to before color
+        extraction.
+    :param str decoder: 'opencv' or 'ffmpeg'. Defaults to 'opencv'.
+    :return: List of (colors, frame indices) tuples, one per chunk, in order. Colors are a list with one array per
+        extractor output.
+    """
+    chunk_queue: Queue = Queue()
+    capacities: Dict[int, int] = {}
+    for position, (start_frame, end_frame, samples) in enumerate(segments):
+        frame_indices, chunk_sampling = plan_frame_indices(
+            video_path, start_frame, end_frame, samples, sampling, keyframes
         )
+        chunk_queue.put((position, frame_indices, chunk_sampling))
+        capacities[position] = len(frame_indices)
+
+    total_samples = sum(samples for _, _, samples in segments)
+    workers = max(1, min(workers, len(segments)))
+    # Decoders run at once in this process: split the CPU budget between them
+    decode_threads = threads_per_worker(workers)
+    with (
+        _progress_bar(total=total_samples, desc="Processing frames") as progress,
+        ThreadPoolExecutor(max_workers=2 * workers) as thread_pool,
+    ):
+        decoders = []
+        extractors = []
+        for _ in range(workers):
+            frame_queue: Queue = Queue(maxsize=THREAD_QUEUE_SIZE)
+            decoders.append(
+                thread_pool.submit(
+                    _decode_chunks_into_queue,
+                    video_path,
+                    chunk_queue,
+                    frame_queue,
+                    analysis_resolution,
+                    keyframes,
+                    decode_threads,
+                    decoder,
+                )
+            )
+            # Stateful extractors (e.g. KMeans warm-start) get their own copy per worker, as worker processes do
+            extractors.append(
+                thread_pool.submit(
+                    _extract_queued_frames, frame_queue, copy.deepcopy(color_extractor), progress.update, capacities
+                )
+            )
+
+        for future in decoders:
+            future.result()
+        results: Dict[int, tuple] = {}
+        for extractor in extractors:
+            results.update(extractor.result())
+
+    return [results.get(position, ([], [])) for position in range(len(segments))]
+
+
+def sample_frame_indices(start_frame: int, end_frame: int, target_frames: Optional[int] = None) -> List[int]:
+    """
+    Compute the indices of the frames to sample between two frames, evenly spaced.
 
-    with Pool(active_workers) as pool:
-        results = pool.starmap(extract_colors, task_args)
+    :param int start_frame: The index of the first frame to process.
+    :param int end_frame: The index of the last frame to process.
+    :param Optional[int] target_frames: The total number of frames to sample. Defaults to every frame.
+    :return: List of frame indices to decode, in increasing order.
+    """
+    total_frames = end_frame - start_frame + 1
+    frame_skip = max(1, total_frames // target_frames) if target_frames else 1
+    return [start_frame + i * frame_skip for i in range(target_frames or total_frames)]
 
-    # Concatenate results from all workers
-    final_colors = [color for colors in results for color in colors]
 
-    return final_colors
+def find_keyframes(video_path: str) -> List[int]:
+    """
+    List the keyframe positions of a video by demuxing its packets, without decoding them.
+
+    :param str video_path: The path to the video file.
+    :return: Increasing list of keyframe indices, or an empty list if the backend cannot report keyframes.
+    """
+    video = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+    # Raw mode makes grab() return compressed packets, which exposes their keyframe flag
+    if not video.isOpened() or not video.set(cv2.CAP_PROP_FORMAT, -1):
+        video.release()
+        return []
+
+    keyframes = []
+    index = 0
+    while video.grab():
+        if video.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+            keyframes.append(index)
+        index += 1
+
+    video.release()
+    return keyframes
+
+
+def _extraction_keyframes(video_path: str, sampling: str, frame_index: Optional[FrameIndex]) -> Optional[List[int]]:
+    """
+    Returns the keyframes to hand to the chunks of an extraction, so that they are scanned once rather than once per
+    chunk.
+
+    :param str video_path: The path to the video file.
+    :param str sampling: Sampling strategy.
+    :param Optional[FrameIndex] frame_index: The index of the video, if any.
+    :return: The keyframes of the index if there is one, else those scanned for the 'keyframes' sampling, else None.
+    """
+    if frame_index is not None:
+        return frame_index.keyframes
+    return find_keyframes(video_path) if sampling == "keyframes" else None
+
+
+def snap_to_keyframes(frame_indices: List[int], keyframes: List[int]) -> List[int]:
+    """
+    Replace each frame index by the nearest keyframe, dropping duplicates.
+
+    :param List[int] frame_indices: Increasing indices of the frames to sample.
+    :param List[int] keyframes: Increasing keyframe indices.
+    :return: Increasing list of distinct keyframe indices.
+    """
+    snapped: List[int] = []
+    for index in frame_indices:
+        position = bisect_left(keyframes, index)
+        candidates = keyframes[max(0, position - 1) : position + 1]
+        nearest = min(candidates, key=lambda keyframe: abs(keyframe - index))
+        if not snapped or nearest > snapped[-1]:
+            snapped.append(nearest)
+    return snapped
+
+
+def iter_sampled_frames(
+    video: cv2.VideoCapture,
+    frame_indices: List[int],
+    sampling: str = "auto",
+    keyframes: Optional[List[int]] = None,
+) -> Iterator[tuple]:
+    """
+    Decode the requested frames from an opened video, either grabbing through or seeking between them.
+
+    Grabbing demuxes and decodes every frame in between two samples, while seeking jumps to the previous keyframe
+    and only decodes from there. "auto" grabs through short gaps and seeks over gaps longer than SEEK_MIN_GAP, so
+    sparse sampling costs scale with the number of samples rather than the length of the video. When the keyframes
+    are known, "auto" instead seeks exactly when a keyframe lies between the current position and the next sample,
+    which is when seeking decodes fewer frames than grabbing through.
+
+    :param cv2.VideoCapture video: The video capture object, positioned on the first requested frame.
+    :param List[int] frame_indices: Increasing indices of the frames to decode.
+    :param str sampling: Sampling strategy: 'auto', 'grab' or 'seek'. Defaults to 'auto'.
+    :param Optional[List[int]] keyframes: Increasing keyframe indices of the video, if known.
+    :return: Iterator of (frame index, frame) tuples. Stops early if the video ends.
+    :raises ValueError: If the sampling strategy is invalid.
+    """
+    if sampling not in ("auto", "grab", "seek"):
+        raise ValueError(f"Invalid sampling strategy: {sampling}")
+
+    position = frame_indices[0] if frame_indices else 0
+    for index in frame_indices:
+        gap = index - position
+        if sampling == "auto" and gap > 0 and keyframes:
+            # A seek decodes from the last keyframe at or before the sample
+            previous = bisect_right(keyframes, index) - 1
+            seek = previous >= 0 and keyframes[previous] > position
+        else:
+            seek = (gap > 0 and sampling == "seek") or (gap > SEEK_MIN_GAP and sampling == "auto")
+        if gap < 0 or seek:
+            video.set(cv2.CAP_PROP_POS_FRAMES, index)
+        else:
+            for _ in range(gap):
+                video.grab()  # Skip frames
+
+        ret, frame = video.read()
+        if not ret:
+            break
+        position = index + 1
+        yield index, frame
+
+
+def downscale_frame(frame: np.ndarray, analysis_resolution: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """
+    Downscale a frame to the analysis resolution before color extraction.
+
+    Area interpolation averages the pixels it merges, so mean and histogram based colors are preserved while the
+    extractors process orders of magnitude fewer pixels. Frames already at or below the resolution are left as is.
+
+    :param np.ndarray frame: The decoded frame.
+    :param Optional[Tuple[int, int]] analysis_resolution: Target (width, height). None keeps the full frame.
+    :return: np.ndarray: The downscaled frame.
+    """
+    if analysis_resolution is None:
+        return frame
+
+    width, height = analysis_resolution
+    if frame.shape[1] <= width and frame.shape[0] <= height:
+        return frame
+    return cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def plan_frame_indices(
+    video_path: str,
+    start_frame: int,
+    end_frame: int,
+    target_frames: Optional[int] = None,
+    sampling: str = "auto",
+    keyframes: Optional[List[int]] = None,
+) -> Tuple[List[int], str]:
+    """
+    Decide which frames of a segment to decode, and how to reach them.
+
+    With the 'keyframes' sampling strategy, each sampled frame is replaced by its nearest keyframe and keyframes are
+    reached by seeking, so that only keyframes are decoded.
+
+    :param str video_path: The path to the video file.
+    :param int start_frame: The index of the first frame to process.
+    :param int end_frame: The index of the last frame to process.
+    :param Optional[int] target_frames: The total number of frames to sample.
+    :param str sampling: Sampling strategy: 'auto', 'grab', 'seek' or 'keyframes'. Defaults to 'auto'.
+    :param Optional[List[int]] keyframes: Keyframe indices of the video, as returned by find_keyframes. Scanned
+        from the video if needed and not provided.
+    :return: Tuple containing the frame indices to decode and the strategy to pass to iter_sampled_frames.
+    """
+    frame_indices = sample_frame_indices(start_frame, end_frame, target_frames)
+
+    if sampling == "keyframes":
+        if keyframes is None:
+            keyframes = find_keyframes(video_path)
+        if keyframes:
+            frame_indices = snap_to_keyframes(frame_indices, keyframes)
+        else:
+            logging.warning("Keyframes are not available for %s, seeking to exact frames instead.", video_path)
+        # Jumping straight to each keyframe only decodes the keyframes themselves
+        sampling = "seek"
+
+    return frame_indices, sampling
+
+
+def iter_decoded_frames(
+    video_path: str,
+    frame_indices: List[int],
+    sampling: str = "auto",
+    analysis_resolution: Optional[Tuple[int, int]] = None,
+    keyframes: Optional[List[int]] = None,
+    decode_threads: Optional[int] = None,
+    decoder: str = "opencv",
+) -> Iterator[tuple]:
+    """
+    Open a video and decode the requested frames, downscaled to the analysis resolution.
+
+    The 'opencv' decoder reaches frames with the sampling strategy and downscales full decoded frames. The 'ffmpeg'
+    decoder reads each call in one pass from the first requested frame, whatever the sampling strategy, and its
+    frames share one buffer: each is only valid until the next one is requested (see iter_ffmpeg_frames).
+
+    :param str video_path: The path to the video file.
+    :param List[int] frame_indices: Increasing indices of the frames to decode.
+    :param str sampling: Sampling strategy: 'auto', 'grab' or 'seek'. Defaults to 'auto'.
+    :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames are downscaled to. Defaults to the
+        full frame.
+    :param Optional[List[int]] keyframes: Increasing keyframe indices of the video, if known.
+    :param Optional[int] decode_threads: The number of decoder threads if the video is opened. Defaults to the share
+        of this process.
+    :param str decoder: 'opencv' or 'ffmpeg'. Defaults to 'opencv'.
+    :return: Iterator of (frame index, frame) tuples.
+    :raises ValueError: If the decoder is invalid.
+    """
+    if decoder not in DECODERS:
+        raise ValueError(f"Invalid decoder: {decoder}")
+    if decode_threads is None:
+        decode_threads = _DECODE_THREADS
+    if decoder == "ffmpeg":
+        yield from iter_ffmpeg_frames(video_path, frame_indices, analysis_resolution, keyframes, decode_threads)
+        return
+
+    video, cached = _open_capture(video_path, decode_threads)
+    try:
+        video.set(cv2.CAP_PROP_POS_FRAMES, frame_indices[0] if frame_indices else 0)
+        for index, frame in iter_sampled_frames(video, frame_indices, sampling, keyframes):
+            yield index, downscale_frame(frame, analysis_resolution)
+    finally:
+        if not cached:
+            video.release()
 
 
 def extract_colors(
@@ -103,41 +991,673 @@ def extract_colors(
     end_frame: int,
     color_extractor: Callable,
     target_frames: Optional[int] = None,
-) -> List:
+    sampling: str = "auto",
+    keyframes: Optional[List[int]] = None,
+    return_indices: bool = False,
+    analysis_resolution: Optional[Tuple[int, int]] = None,
+    batch_size: int = BATCH_SIZE,
+    show_progress: bool = True,
+    decoder: str = "opencv",
+):
     """
     Extracts dominant colors from frames in a video file.
 
+    With the 'keyframes' sampling strategy, each sampled frame is replaced by its nearest keyframe so that only
+    keyframes are decoded. Fewer colors than target_frames may then be returned; use return_indices to know where
+    each color belongs in the video.
+
     :param str video_path: The video capture object.
     :param int start_frame: The index of the first frame to process.
     :param int end_frame: The index of the last frame to process.
     :param Callable color_extractor: A function to extract the dominant color from a frame.
     :param Optional[int] target_frames: The total number of frames to sample.
-    :return: List of dominant colors from the sampled frames.
+    :param str sampling: Sampling strategy: 'auto', 'grab', 'seek' or 'keyframes'. Defaults to 'auto'.
+    :param Optional[List[int]] keyframes: Keyframe indices of the video, as returned by find_keyframes or recorded
+        in a FrameIndex, also used to choose between grabbing and seeking. Scanned from the video if needed and not
+        provided.
+    :param bool return_indices: Whether to also return the index of the frame each color was extracted from.
+    :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames are downscaled to before color
+        extraction. Defaults to the full frame.
+    :param int batch_size: Number of frames stacked for extractors with a vectorized batch version, at most as many as
+        fit in BATCH_MAX_BYTES. Defaults to BATCH_SIZE.
+    :param bool show_progress: Whether to display a progress bar. Defaults to True.
+    :param str decoder: Video decoder: 'opencv' or 'ffmpeg' (see iter_decoded_frames). Defaults to 'opencv'.
+    :return: Dominant colors of the sampled frames, as an array with one row per frame stored as in a
+        ColorSequence (for extractors combining several ones, see _apply_extractors, a list with one such array per
+        extractor), or a (colors, frame indices) tuple if return_indices is True.
     """
-    video = cv2.VideoCapture(video_path)
-    video.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    if sampling == "keyframes" and keyframes is None:
+        # Scanned here rather than while planning, so that decoders also know the sampled frames are keyframes
+        keyframes = find_keyframes(video_path)
+    frame_indices, sampling = plan_frame_indices(video_path, start_frame, end_frame, target_frames, sampling, keyframes)
 
-    # Calculate frame_skip based on target_frames
-    total_frames = end_frame - start_frame + 1
-    if target_frames:
-        frame_skip = total_frames // target_frames
-    else:
-        frame_skip = 1
+    # Each batch is copied into arrays allocated once for all the planned frames
+    buffers = [ColorBuffer(len(frame_indices)) for _ in range(_extractor_outputs(color_extractor))]
+    used_indices: List[int] = []
+    for batch_colors, batch_indices in _iter_color_batches(
+        video_path,
+        frame_indices,
+        sampling,
+        color_extractor,
+        analysis_resolution,
+        batch_size,
+        show_progress,
+        keyframes,
+        decoder,
+    ):
+        for buffer, colors in zip(buffers, batch_colors):
+            buffer.extend(colors)
+        used_indices.extend(batch_indices)
 
-    colors = []
+    colors = [buffer.colors for buffer in buffers] if _is_combined(color_extractor) else buffers[0].colors
+    if return_indices:
+        return colors, used_indices
+    return colors
 
-    for _ in tqdm(range(target_frames or total_frames), desc="Processing frames"):
-        ret, frame = video.read()  # Read the first or next frame
-        if not ret:
-            break
-        dominant_color = color_extractor(frame)
-        colors.append(dominant_color)
-        for _ in range(frame_skip - 1):
-            video.grab()  # Skip frames
 
+def _iter_color_batches(
+    video_path: str,
+    frame_indices: List[int],
+    sampling: str,
+    color_extractor: Callable,
+    analysis_resolution: Optional[Tuple[int, int]],
+    batch_size: int,
+    show_progress: bool,
+    keyframes: Optional[List[int]] = None,
+    decoder: str = "opencv",
+) -> Iterator[Tuple[List[np.ndarray], List[int]]]:
+    """
+    Decode the requested frames and extract their colors, batch_size frames at a time.
+
+    :param str video_path: The path to the video file.
+    :param List[int] frame_indices: Increasing indices of the frames to decode, as planned by plan_frame_indices.
+    :param str sampling: Sampling strategy: 'auto', 'grab' or 'seek'.
+    :param Callable color_extractor: A function to extract the dominant color from a frame.
+    :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames are downscaled to.
+    :param int batch_size: Number of frames per batch. Frames of extractors with a vectorized batch version are
+        stacked and extracted in one call, as many at a time as fit in BATCH_MAX_BYTES.
+    :param bool show_progress: Whether to display a progress bar.
+    :param Optional[List[int]] keyframes: Keyframe indices of the video, if known.
+    :param str decoder: 'opencv' or 'ffmpeg'. Defaults to 'opencv'.
+    :return: Iterator of (colors, frame indices) tuples, one per batch. Colors are a list with one array per
+        extractor output (see _extractor_outputs).
+    """
+    combined = _is_combined(color_extractor)
+    outputs = _extractor_outputs(color_extractor)
+    colors = [ColorBuffer(batch_size) for _ in range(outputs)]
+    indices: List[int] = []
+    batch_extractor = _get_batch_function(color_extractor)
+    batch: Optional[np.ndarray] = None
+    batched = 0
+
+    frames = iter_decoded_frames(video_path, frame_indices, sampling, analysis_resolution, keyframes, None, decoder)
+    if show_progress:
+        frames = _progress_bar(frames, total=len(frame_indices), desc="Processing frames")
+    for index, frame in frames:
+        indices.append(index)
+
+        if batch_extractor is not None and batch is None:
+            stacked = batch_stack_size(frame, batch_size)
+            if stacked > 1:
+                batch = np.empty((stacked,) + frame.shape, dtype=frame.dtype)
+
+        if batch is None:
+            for buffer, color in zip(colors, _output_colors(color_extractor(frame), combined)):
+                buffer.append(color)
+        else:
+            # Accumulate frames into a preallocated stack and extract their colors in one call
+            batch[batched] = frame
+            batched += 1
+
+        # A full stack, or the stacked frames ending a batch, have their colors extracted
+        if batched and (batched == len(batch) or len(indices) == batch_size):
+            for buffer, batch_colors in zip(colors, _output_colors(batch_extractor(batch[:batched]), combined)):
+                buffer.extend(batch_colors)
+            batched = 0
+
+        if len(indices) == batch_size:
+            yield [buffer.colors for buffer in colors], indices
+            colors, indices = [ColorBuffer(batch_size) for _ in range(outputs)], []
+
+    if batched:
+        for buffer, batch_colors in zip(colors, _output_colors(batch_extractor(batch[:batched]), combined)):
+            buffer.extend(batch_colors)
+    if indices:
+        yield [buffer.colors for buffer in colors], indices
+
+
+def batch_stack_size(frame: np.ndarray, batch_size: int) -> int:
+    """
+    Returns the number of frames like the given one stacked for vectorized extractors.
+
+    :param np.ndarray frame: A decoded (and downscaled) frame.
+    :param int batch_size: The number of frames per batch.
+    :return: int: The number of frames fitting in BATCH_MAX_BYTES, at most batch_size.
+    """
+    return min(batch_size, BATCH_MAX_BYTES // frame.nbytes)
+
+
+def iter_colors(
+    video_path: str,
+    color_extractor: Callable,
+    target_frames: Optional[int] = None,
+    sampling: str = "auto",
+    analysis_resolution: Optional[Tuple[int, int]] = None,
+    batch_size: int = BATCH_SIZE,
+    frame_index: Optional[FrameIndex] = None,
+    decoder: str = "opencv",
+) -> Iterator[ColorSequence]:
+    """
+    Extracts dominant colors from a video as they are decoded, one batch of frames at a time.
+
+    Unlike extract_colors, colors are handed out as soon as each batch is done, so callers can render, store or
+    upload them while the video is being processed, and memory does not grow with the length of the video.
+
+    :param str video_path: The path to the video file.
+    :param Callable color_extractor: A function to extract the dominant color from a frame.
+    :param Optional[int] target_frames: The total number of frames to sample. Defaults to every frame.
+    :param str sampling: Sampling strategy: 'auto', 'grab', 'seek' or 'keyframes'. Defaults to 'auto'.
+    :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames are downscaled to before color
+        extraction. Defaults to the full frame.
+    :param int batch_size: Number of frames per batch. Defaults to BATCH_SIZE.
+    :param Optional[FrameIndex] frame_index: The index of the video, for its exact frame count, timestamps and
+        keyframes. Defaults to no index.
+    :param str decoder: Video decoder: 'opencv' or 'ffmpeg' (see iter_decoded_frames). Defaults to 'opencv'.
+    :return: Iterator of ColorSequence batches, with the frame index and timestamp of each color, in frame order.
+    """
+    video, frame_count, _, _ = load_video(video_path, frame_index)
+    fps = video.get(cv2.CAP_PROP_FPS)
     video.release()
 
-    return colors
+    keyframes = _extraction_keyframes(video_path, sampling, frame_index)
+    frame_indices, sampling = plan_frame_indices(video_path, 0, frame_count - 1, target_frames, sampling, keyframes)
+    for colors, indices in _iter_color_batches(
+        video_path, frame_indices, sampling, color_extractor, analysis_resolution, batch_size, False, keyframes, decoder
+    ):
+        yield ColorSequence.from_colors(colors[0], indices, frame_timestamps(indices, fps, frame_index))
+
+
+def parallel_iter_colors(
+    video_path: str,
+    color_extractor: Callable,
+    workers: int,
+    target_frames: Optional[int] = None,
+    sampling: str = "auto",
+    analysis_resolution: Optional[Tuple[int, int]] = None,
+    chunk_size: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    pool: Optional[ExtractionPool] = None,
+    frame_index: Optional[FrameIndex] = None,
+    decoder: str = "opencv",
+) -> Iterator[ColorSequence]:
+    """
+    Extracts dominant colors from a video in parallel, handing out the colors of each chunk in video order as soon
+    as it and the chunks before it are done.
+
+    At most max_in_flight chunks are being processed or waiting to be handed out at any time, so memory stays
+    bounded however long the video and however slow the consumer is.
+
+    :param str video_path: The path to the video file.
+    :param Callable color_extractor: A function to extract the dominant color from a frame.
+    :param int workers: Number of parallel workers, ignored if a pool is provided.
+    :param Optional[int] target_frames: The total number of frames to sample. Defaults to every frame.
+    :param str sampling: Sampling strategy: 'auto', 'grab', 'seek' or 'keyframes'. Defaults to 'auto'.
+    :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames are downscaled to before color
+        extraction. Defaults to the full frame.
+    :param Optional[int] chunk_size: Number of frames per chunk. Defaults to CHUNKS_PER_WORKER chunks per worker.
+    :param Optional[int] max_in_flight: Maximum number of chunks submitted but not handed out yet. Defaults to twice
+        the number of workers.
+    :param Optional[ExtractionPool] pool: An open pool to run the extraction on, reused across calls.
+    :param Optional[FrameIndex] frame_index: The index of the video. Defaults to no index.
+    :param str decoder: Video decoder: 'opencv' or 'ffmpeg'. Defaults to 'opencv'.
+    :return: Iterator of ColorSequence chunks, with the frame index and timestamp of each color, in frame order.
+    """
+    if pool is None:
+        with ExtractionPool(workers) as call_pool:
+            yield from parallel_iter_colors(
+                video_path,
+                color_extractor,
+                workers,
+                target_frames,
+                sampling,
+                analysis_resolution,
+                chunk_size,
+                max_in_flight,
+                call_pool,
+                frame_index,
+                decoder,
+            )
+        return
+
+    video, frame_count, _, _ = load_video(video_path, frame_index)
+    fps = video.get(cv2.CAP_PROP_FPS)
+    video.release()
+    if target_frames is None:
+        target_frames = frame_count
+    if max_in_flight is None:
+        max_in_flight = 2 * pool.workers
+    max_in_flight = max(1, max_in_flight)
+
+    keyframes = _extraction_keyframes(video_path, sampling, frame_index)
+    if chunk_size is None:
+        chunks = pool.workers * CHUNKS_PER_WORKER
+    else:
+        chunks = math.ceil(frame_count / max(1, chunk_size))
+    segments = split_segments(frame_count, max(1, min(chunks, frame_count, target_frames)), target_frames)
+
+    completed: Queue = Queue()
+    results: Dict[int, tuple] = {}
+    submitted = 0
+    last_index = -1
+    for position in range(len(segments)):
+        # Submit chunks ahead of the one handed out next, up to the in-flight limit
+        while submitted < len(segments) and submitted - position < max_in_flight:
+            start_frame, end_frame, samples = segments[submitted]
+            args = (video_path, start_frame, end_frame, color_extractor, samples, sampling, keyframes)
+            pool.apply_async(
+                _extract_chunk_colors,
+                (submitted, args, analysis_resolution, decoder),
+                completed.put,
+                completed.put,
+            )
+            submitted += 1
+
+        while position not in results:
+            result = completed.get()
+            if isinstance(result, BaseException):
+                raise result
+            results[result[0]] = result[1:]
+
+        colors, indices = results.pop(position)
+        # Neighbouring chunks may snap to the same keyframe: hand out each frame once
+        keep = [row for row, index in enumerate(indices) if index > last_index]
+        if keep:
+            last_index = indices[keep[-1]]
+            kept_indices = [indices[row] for row in keep]
+            yield ColorSequence.from_colors(
+                colors[keep], kept_indices, frame_timestamps(kept_indices, fps, frame_index)
+            )
+
+
+def _extract_chunk_colors(
+    position: int, args: tuple, analysis_resolution: Optional[Tuple[int, int]], decoder: str
+) -> Tuple[int, np.ndarray, List[int]]:
+    """
+    Run extract_colors for one chunk in a worker process.
+
+    :param int position: The position of the chunk.
+    :param tuple args: The first positional arguments of extract_colors.
+    :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames are downscaled to.
+    :param str decoder: The video decoder.
+    :return: Tuple containing the chunk position, its colors as an array and the indices of their frames.
+    """
+    colors, indices = extract_colors(
+        *args, return_indices=True, analysis_resolution=analysis_resolution, show_progress=False, decoder=decoder
+    )
+    return position, colors, indices
+
+
+def frame_timestamps(
+    frame_indices: Sequence[int], fps: float, frame_index: Optional[FrameIndex] = None
+) -> Optional[Sequence[float]]:
+    """
+    Returns the timestamps of frames, recorded in the index of the video or computed from its frame rate.
+
+    :param Sequence[int] frame_indices: The indices of the frames.
+    :param float fps: The frame rate of the video, 0 if unknown.
+    :param Optional[FrameIndex] frame_index: The index of the video, if any.
+    :return: The timestamp of each frame in seconds, or None if there is no index and the frame rate is unknown.
+    """
+    if frame_index is not None:
+        return frame_index.timestamps[np.asarray(frame_indices, dtype=np.int64)]
+    return [index / fps for index in frame_indices] if fps > 0 else None
+
+
+def _apply_extractors(extractors: tuple, frame: np.ndarray) -> tuple:
+    """
+    Apply several color extractors to the same decoded frame.
+
+    :param tuple extractors: The color extractor functions to apply, in order.
+    :param np.ndarray frame: The decoded frame.
+    :return: Tuple with one color per extractor.
+    """
+    return tuple(extractor(frame) for extractor in extractors)
+
+
+def _apply_extractors_batch(extractors: tuple, frames: np.ndarray) -> List[np.ndarray]:
+    """
+    Apply several color extractors to a stack of frames, using their batch version when they have one.
+
+    :param tuple extractors: The color extractor functions to apply, in order.
+    :param np.ndarray frames: Frames as a (N, H, W, 3) array.
+    :return: List with the colors of each extractor, as an array with one row per frame.
+    """
+    colors_per_extractor = []
+    for extractor in extractors:
+        batch_extractor = get_batch_extractor(extractor)
+        if batch_extractor is not None:
+            colors_per_extractor.append(np.asarray(batch_extractor(frames)))
+        else:
+            colors_per_extractor.append(np.array([extractor(frame) for frame in frames]))
+    return colors_per_extractor
+
+
+def _is_combined(color_extractor: Callable) -> bool:
+    """
+    Whether a color extractor combines several ones (see _apply_extractors).
+
+    :param Callable color_extractor: The color extractor.
+    :return: bool: True if it returns a tuple with one color per extractor.
+    """
+    return isinstance(color_extractor, partial) and color_extractor.func is _apply_extractors
+
+
+def _extractor_outputs(color_extractor: Callable) -> int:
+    """
+    Returns the number of colors a color extractor returns per frame.
+
+    :param Callable color_extractor: The color extractor.
+    :return: int: The number of extractors it combines, 1 if it does not combine several ones.
+    """
+    return len(color_extractor.args[0]) if _is_combined(color_extractor) else 1
+
+
+def _output_colors(colors, combined: bool) -> tuple:
+    """
+    Returns the colors of each output of an extractor, as a tuple for single extractors too.
+
+    :param colors: What the extractor, or its batch version, returned.
+    :param bool combined: Whether the extractor combines several ones (see _is_combined).
+    :return: tuple: The colors of each output.
+    """
+    return tuple(colors) if combined else (colors,)
+
+
+def _get_batch_function(color_extractor: Callable) -> Optional[Callable]:
+    """
+    Returns the function extracting colors from a stack of frames for an extractor, if batching helps.
+
+    :param Callable color_extractor: A color extractor, possibly combining several ones (see _apply_extractors).
+    :return: A function taking a (N, H, W, 3) stack and returning one color per frame, or None.
+    """
+    if _is_combined(color_extractor):
+        extractors = color_extractor.args[0]
+        if any(get_batch_extractor(extractor) is not None for extractor in extractors):
+            return partial(_apply_extractors_batch, extractors)
+        return None
+    return get_batch_extractor(color_extractor)
+
+
+def extract_colors_multi(
+    video_path: str,
+    start_frame: int,
+    end_frame: int,
+    color_extractors: Dict[str, Callable],
+    target_frames: Optional[int] = None,
+    sampling: str = "auto",
+    return_indices: bool = False,
+    analysis_resolution: Optional[Tuple[int, int]] = None,
+    frame_index: Optional[FrameIndex] = None,
+    decoder: str = "opencv",
+):
+    """
+    Extracts colors with several methods at once, decoding each sampled frame only once.
+
+    :param str video_path: The path to the video file.
+    :param int start_frame: The index of the first frame to process.
+    :param int end_frame: The index of the last frame to process.
+    :param Dict[str, Callable] color_extractors: Mapping of method name to color extractor function.
+    :param Optional[int] target_frames: The total number of frames to sample.
+    :param str sampling: Sampling strategy: 'auto', 'grab', 'seek' or 'keyframes'. Defaults to 'auto'.
+    :param bool return_indices: Whether to also return the index of the frame each color was extracted from.
+    :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames are downscaled to before color
+        extraction. Defaults to the full frame.
+    :param Optional[FrameIndex] frame_index: The index of the video, whose keyframes are used to reach frames with
+        the fewest decodes. Defaults to no index.
+    :param str decoder: Video decoder: 'opencv' or 'ffmpeg' (see iter_decoded_frames). Defaults to 'opencv'.
+    :return: Dictionary mapping each method name to its colors as an array (see extract_colors), or a
+        (colors by method, frame indices) tuple if return_indices is True.
+    """
+    combined_extractor = partial(_apply_extractors, tuple(color_extractors.values()))
+    outputs, frame_indices = extract_colors(
+        video_path,
+        start_frame,
+        end_frame,
+        combined_extractor,
+        target_frames,
+        sampling,
+        None if frame_index is None else frame_index.keyframes,
+        return_indices=True,
+        analysis_resolution=analysis_resolution,
+        decoder=decoder,
+    )
+    colors_by_method = dict(zip(color_extractors, outputs))
+    if return_indices:
+        return colors_by_method, frame_indices
+    return colors_by_method
+
+
+def parallel_extract_colors_multi(
+    video_path: str,
+    frame_count: int,
+    color_extractors: Dict[str, Callable],
+    workers: int,
+    target_frames: Optional[int] = None,
+    sampling: str = "auto",
+    return_indices: bool = False,
+    analysis_resolution: Optional[Tuple[int, int]] = None,
+    executor: str = "process",
+    chunk_size: Optional[int] = None,
+    pool: Optional[ExtractionPool] = None,
+    frame_index: Optional[FrameIndex] = None,
+    decoder: str = "opencv",
+):
+    """
+    Extracts colors with several methods at once using parallel processing, decoding each sampled frame only once.
+
+    :param str video_path: The path to the video file.
+    :param int frame_count: The total number of frames in the video.
+    :param Dict[str, Callable] color_extractors: Mapping of method name to color extractor function.
+    :param int workers: Number of parallel workers.
+    :param Optional[int] target_frames: The total number of frames to sample.
+    :param str sampling: Sampling strategy: 'auto', 'grab', 'seek' or 'keyframes'. Defaults to 'auto'.
+    :param bool return_indices: Whether to also return the index of the frame each color was extracted from.
+    :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames are downscaled to before color
+        extraction. Defaults to the full frame.
+    :param str executor: 'process' or 'thread'. Defaults to 'process'.
+    :param Optional[int] chunk_size: Number of frames per chunk. Defaults to CHUNKS_PER_WORKER chunks per worker.
+    :param Optional[ExtractionPool] pool: An open pool to run the 'process' executor on, reused across calls.
+    :param Optional[FrameIndex] frame_index: The index of the video. Defaults to no index.
+    :param str decoder: Video decoder: 'opencv' or 'ffmpeg'. Defaults to 'opencv'.
+    :return: Dictionary mapping each method name to its colors (see parallel_extract_colors), or a
+        (colors by method, frame indices) tuple if return_indices is True.
+    """
+    combined_extractor = partial(_apply_extractors, tuple(color_extractors.values()))
+    outputs, frame_indices = _parallel_extract(
+        video_path,
+        frame_count,
+        combined_extractor,
+        True,
+        workers,
+        target_frames,
+        sampling,
+        analysis_resolution,
+        executor,
+        chunk_size,
+        pool,
+        frame_index,
+        decoder,
+    )
+    colors_by_method = dict(zip(color_extractors, outputs))
+    if return_indices:
+        return colors_by_method, frame_indices
+    return colors_by_method
+
+
+def batch_extract_colors_multi(
+    videos: List[Tuple[str, int, Optional[int]]],
+    color_extractors: Dict[str, Callable],
+    pool: ExtractionPool,
+    sampling: str = "auto",
+    analysis_resolution: Optional[Tuple[int, int]] = None,
+    chunk_sizes: Optional[Sequence[Optional[int]]] = None,
+    frame_indexes: Optional[Sequence[Optional[FrameIndex]]] = None,
+    decoder: str = "opencv",
+) -> Iterator[Tuple[int, Optional[Dict[str, np.ndarray]], List[int], Optional[BaseException]]]:
+    """
+    Extracts colors from many videos with several methods, scheduling the chunks of all videos on a shared pool.
+
+    Chunks are sized from the total number of samples of the batch rather than per video: large videos are split
+    into several chunks and small ones are packed together into a single task, and videos are scheduled from the
+    largest to the smallest, so that all workers stay busy until the end of the batch instead of waiting for the
+    slowest chunk of every video. Only a few tasks per worker are submitted at a time, so the shared result arrays of
+    only a few videos are allocated at once.
+
+    Videos that cannot be processed do not stop the batch: their error is returned in place of their colors.
+
+    :param List[Tuple[str, int, Optional[int]]] videos: The path, total number of frames and number of frames to
+        sample (None for every frame) of each video.
+    :param Dict[str, Callable] color_extractors: Mapping of method name to color extractor function.
+    :param ExtractionPool pool: The open pool to run the extraction on.
+    :param str sampling: Sampling strategy: 'auto', 'grab', 'seek' or 'keyframes'. Defaults to 'auto'.
+    :param Optional[Tuple[int, int]] analysis_resolution: (width, height) frames are downscaled to before color
+        extraction. Defaults to the full frame.
+    :param Optional[Sequence[Optional[int]]] chunk_sizes: Number of frames per chunk of each video, or None for
+        videos without one. Defaults to CHUNKS_PER_WORKER tasks per worker over the whole batch.
+    :param Optional[Sequence[Optional[FrameIndex]]] frame_indexes: The index of each video, or None for videos
+        without one. Defaults to no index.
+    :param str decoder: Video decoder: 'opencv' or 'ffmpeg'. Defaults to 'opencv'.
+    :return: Iterator over (position of the video in videos, colors by method, frame indices, error) tuples, in
+        completion order. Colors are None and frame indices empty if the video failed.
+    """
+    combined_extractor = partial(_apply_extractors, tuple(color_extractors.values()))
+    samples = [min(frame_count, target_frames or frame_count) for _, frame_count, target_frames in videos]
+    default_chunk_samples = max(1, math.ceil(sum(samples) / (pool.workers * CHUNKS_PER_WORKER)))
+
+    def chunk_samples(position: int) -> int:
+        """
+        Return the number of samples per task of a video, from its chunk size in frames if it has one.
+        """
+        chunk_size = chunk_sizes[position] if chunk_sizes else None
+        if chunk_size is None:
+            return default_chunk_samples
+        return max(1, math.ceil(chunk_size * samples[position] / videos[position][1]))
+
+    jobs: Dict[int, dict] = {}
+    failures: List[Tuple[int, BaseException]] = []
+    completed: Queue = Queue()
+
+    def plan(position: int) -> List[Tuple[int, tuple, int]]:
+        """
+        Allocate the results of a video and return its (video position, task, samples) chunks.
+        """
+        video_path, frame_count, _ = videos[position]
+        try:
+            keyframes = _extraction_keyframes(video_path, sampling, frame_indexes[position] if frame_indexes else None)
+            segments = split_segments(
+                frame_count,
+                max(1, min(math.ceil(samples[position] / chunk_samples(position)), samples[position])),
+                samples[position],
+            )
+            blocks, offsets, tasks = _plan_chunk_tasks(
+                video_path, combined_extractor, True, segments, sampling, keyframes, analysis_resolution, decoder
+            )
+        except Exception as exc:
+            failures.append((position, exc))
+            return []
+        jobs[position] = {
+            "blocks": blocks,
+            "offsets": offsets,
+            "chunk_indices": [None] * len(tasks),
+            "remaining": len(tasks),
+            "error": None,
+        }
+        return [(position, task, segment[2]) for task, segment in zip(tasks, segments)]
+
+    def iter_groups() -> Iterator[list]:
+        """
+        Yield the tasks to submit, packing consecutive small chunks until they reach the samples per task of their
+        video.
+        """
+        group: list = []
+        group_samples = 0
+        for position in sorted(range(len(videos)), key=lambda position: -samples[position]):
+            for job, task, task_samples in plan(position):
+                group.append((job, task))
+                group_samples += task_samples
+                if group_samples >= chunk_samples(position):
+                    yield group
+                    group, group_samples = [], 0
+        if group:
+            yield group
+
+    groups = iter_groups()
+    in_flight = 0
+    max_in_flight = 2 * pool.workers
+    progress = _progress_bar(total=len(videos), desc="Processing videos")
+    try:
+        while True:
+            # Keep every worker busy, with a task waiting for each
+            group = None
+            while in_flight < max_in_flight:
+                group = next(groups, None)
+                if group is None:
+                    break
+                pool.apply_async(_extract_colors_task_group, (group,), completed.put, completed.put)
+                in_flight += 1
+
+            while failures:
+                position, error = failures.pop()
+                progress.update()
+                yield position, None, [], error
+            if in_flight == 0 and group is None:
+                break
+
+            results = completed.get()
+            in_flight -= 1
+            if isinstance(results, BaseException):
+                raise results
+            for job, position, indices, error in results:
+                state = jobs[job]
+                state["chunk_indices"][position] = indices
+                state["error"] = state["error"] or error
+                state["remaining"] -= 1
+                if state["remaining"] > 0:
+                    continue
+
+                del jobs[job]
+                progress.update()
+                if state["error"] is not None:
+                    _discard_result_blocks(state["blocks"])
+                    yield job, None, [], state["error"]
+                else:
+                    outputs, frame_indices = _collect_chunk_results(
+                        state["blocks"], state["offsets"], state["chunk_indices"]
+                    )
+                    yield job, dict(zip(color_extractors, outputs)), frame_indices, None
+    finally:
+        progress.close()
+        for state in jobs.values():
+            _discard_result_blocks(state["blocks"])
+
+
+def _extract_colors_task_group(group: List[Tuple[int, tuple]]) -> List[Tuple[int, int, List[int], Optional[Exception]]]:
+    """
+    Run the chunk tasks of one or more videos in a worker process, one after the other.
+
+    :param List[Tuple[int, tuple]] group: The position of the video and the arguments of _extract_colors_task for
+        each chunk.
+    :return: List of (position of the video, chunk position, frame indices, error) tuples. A failed chunk has no
+        frame indices and the exception it raised.
+    """
+    results = []
+    for job, task in group:
+        try:
+            position, indices = _extract_colors_task(task)
+            results.append((job, position, indices, None))
+        except Exception as exc:
+            results.append((job, task[0], [], exc))
+    return results
 
 
 def crop_black_borders(frame: np.ndarray, threshold: int = 30) -> np.ndarray:
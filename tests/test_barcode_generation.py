@@ -1,7 +1,10 @@
 import unittest
+from unittest.mock import patch
+
 import numpy as np
 from movie_barcodes import (
     barcode_generation,
+    ColorSequence,
 )
 
 
@@ -43,6 +46,54 @@ class TestBarcodeGeneration(unittest.TestCase):
         self.assertIsInstance(barcode, np.ndarray)
         self.assertEqual(barcode.shape, (self.frame_height, self.width, 3))
 
+    def test_generate_barcode_with_frame_indices(self) -> None:
+        """
+        Test that generate_barcode places colors at the position of their frame when indices are given.
+        :return: None
+        """
+        colors = [np.array([255, 0, 0]), np.array([0, 255, 0])]
+        barcode = barcode_generation.generate_barcode(colors, 1, 100, 10, frame_indices=[0, 70])
+
+        # The first color spans the columns up to the frame of the second one
+        np.testing.assert_array_equal(barcode[0, :7], np.tile([255, 0, 0], (7, 1)))
+        np.testing.assert_array_equal(barcode[0, 7:], np.tile([0, 255, 0], (3, 1)))
+
+    def test_generate_barcode_averages_extra_colors(self) -> None:
+        """
+        Test that generate_barcode averages colors down to the barcode width rather than dropping some.
+        :return: None
+        """
+        colors = [np.array([0, 0, 0]), np.array([100, 100, 100]), np.array([200, 200, 200])]
+        barcode = barcode_generation.generate_barcode(colors, 1, 3, 2)
+
+        # Each column covers one color and a half
+        np.testing.assert_array_equal(barcode[0], [[33, 33, 33], [167, 167, 167]])
+
+    def test_generate_barcode_from_color_sequence(self) -> None:
+        """
+        Test that generate_barcode renders a ColorSequence of float colors and of smoothed frame columns.
+        :return: None
+        """
+        colors = ColorSequence.from_colors([np.array([10.7, 20.0, 30.0]), np.array([40.0, 50.0, 60.0])])
+        barcode = barcode_generation.generate_barcode(colors, 2, 2)
+        np.testing.assert_array_equal(barcode[0], [[10, 20, 30], [40, 50, 60]])
+
+        columns = ColorSequence(np.full((2, 4, 1, 3), 7, dtype=np.uint8))
+        barcode = barcode_generation.generate_barcode(columns, 4, 2)
+        np.testing.assert_array_equal(barcode, np.full((4, 2, 3), 7))
+
+    def test_generate_barcode_leaves_missing_columns_black(self) -> None:
+        """
+        Test that columns without a color stay black when there are fewer colors than the barcode width.
+        :return: None
+        """
+        columns = ColorSequence(np.full((2, 3, 1, 3), 9, dtype=np.uint8))
+        barcode = barcode_generation.generate_barcode(columns, 6, 2, 4)
+
+        self.assertEqual(barcode.shape, (6, 4, 3))
+        np.testing.assert_array_equal(barcode[:, :2], np.full((6, 2, 3), 9))
+        np.testing.assert_array_equal(barcode[:, 2:], np.zeros((6, 2, 3)))
+
     def test_generate_circular_barcode(self) -> None:
         """
         Test the generate_circular_barcode function.
@@ -53,6 +104,61 @@ class TestBarcodeGeneration(unittest.TestCase):
         self.assertIsInstance(barcode, np.ndarray)
         self.assertEqual(barcode.shape, (self.img_size, self.img_size, 4))  # RGBA image
 
+    def test_generate_circular_barcode_ignores_scale_factor(self) -> None:
+        """
+        Test that the deprecated scale_factor argument is still accepted, with a warning, and has no effect.
+        :return: None
+        """
+        with self.assertLogs(level="WARNING"):
+            barcode = barcode_generation.generate_circular_barcode(self.colors, self.img_size, scale_factor=10)
+
+        np.testing.assert_array_equal(barcode, barcode_generation.generate_circular_barcode(self.colors, self.img_size))
+
+    def test_generate_circular_barcode_rings(self) -> None:
+        """
+        Test that the circular barcode draws the first color at the center, the last one at the edge, and leaves the
+        corners transparent.
+        :return: None
+        """
+        colors = ColorSequence.from_colors([np.array([255, 0, 0])] * 50 + [np.array([0, 0, 255])] * 50)
+        barcode = barcode_generation.generate_circular_barcode(colors, self.img_size)
+
+        center = self.img_size // 2
+        np.testing.assert_array_equal(barcode[center, center + 10], [255, 0, 0, 255])
+        np.testing.assert_array_equal(barcode[center, self.img_size - 3], [0, 0, 255, 255])
+        np.testing.assert_array_equal(barcode[0, 0], [0, 0, 0, 0])
+        np.testing.assert_array_equal(barcode[center], barcode[:, center])
+
+    def test_generate_circular_barcode_empty(self) -> None:
+        """
+        Test that a circular barcode without colors is fully transparent.
+        :return: None
+        """
+        barcode = barcode_generation.generate_circular_barcode([], self.img_size)
+
+        self.assertFalse(barcode.any())
+
+    @patch("movie_barcodes.barcode_generation.STRIP_BYTES", 1000)
+    def test_strips_match_whole_barcodes(self) -> None:
+        """
+        Test that barcodes rendered strip by strip match the barcodes rendered whole.
+        :return: None
+        """
+        rng = np.random.default_rng(0)
+        colors = ColorSequence(rng.uniform(0, 255, (30, 3)))
+        columns = ColorSequence(rng.integers(0, 256, (30, 7, 1, 3), dtype=np.uint8))
+
+        strips = list(barcode_generation.iter_barcode_strips(colors, 40, 30, 25))
+        self.assertGreater(len(strips), 1)
+        np.testing.assert_array_equal(np.concatenate(strips), barcode_generation.generate_barcode(colors, 40, 30, 25))
+
+        stretched = np.concatenate(list(barcode_generation.iter_barcode_strips(columns, 40, 30, 25)))
+        expected = barcode_generation.generate_barcode(columns, 40, 30, 25)
+        self.assertLessEqual(np.abs(stretched.astype(int) - expected).max(), 1)
+
+        circular = np.concatenate(list(barcode_generation.iter_circular_barcode_strips(colors, 50)))
+        np.testing.assert_array_equal(circular, barcode_generation.generate_circular_barcode(colors, 50))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,137 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from movie_barcodes import ColorSequence
+from movie_barcodes.cache import ColorCache, resample_colors
+
+
+class TestColorCache(unittest.TestCase):
+    """
+    Test the on-disk color cache.
+    """
+
+    def setUp(self) -> None:
+        """
+        Set up a cache in a temporary directory.
+        :return: None
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache_dir = os.path.join(directory.name, "cache")
+        self.cache = ColorCache(self.cache_dir)
+        self.video_path = "tests/sample.mp4"
+        self.colors = ColorSequence(
+            np.arange(93 * 3, dtype=np.float32).reshape(93, 3), np.arange(93), np.arange(93) / 25
+        )
+
+    def test_store_and_load(self) -> None:
+        """
+        Test that stored colors are loaded back for the same parameters only.
+        :return: None
+        """
+        self.cache.store(self.video_path, "avg", "auto", None, self.colors)
+
+        loaded = self.cache.load(self.video_path, "avg", "seek", None, 93, 93)
+        np.testing.assert_array_equal(loaded.colors, self.colors.colors)
+        np.testing.assert_array_equal(loaded.frame_indices, self.colors.frame_indices)
+        np.testing.assert_array_equal(loaded.timestamps, self.colors.timestamps)
+
+        self.assertIsNone(self.cache.load(self.video_path, "hsv", "auto", None, 93, 93))
+        self.assertIsNone(self.cache.load(self.video_path, "avg", "keyframes", None, 93, 93))
+        self.assertIsNone(self.cache.load(self.video_path, "avg", "auto", (160, 90), 93, 93))
+
+    def test_load_resamples_to_fewer_samples(self) -> None:
+        """
+        Test that an entry serves requests for fewer samples, but not for more.
+        :return: None
+        """
+        self.cache.store(self.video_path, "avg", "auto", None, self.colors[:50])
+
+        loaded = self.cache.load(self.video_path, "avg", "auto", None, 50, 10)
+        self.assertEqual(len(loaded), 10)
+        np.testing.assert_array_equal(loaded.frame_indices, np.arange(0, 50, 5))
+        # Each sample averages the cached colors it covers
+        loaded = self.cache.load(self.video_path, "avg", "auto", None, 50, 25)
+        np.testing.assert_allclose(loaded.colors, self.colors.colors[:50].reshape(25, 2, 3).mean(axis=1))
+        self.assertIsNone(self.cache.load(self.video_path, "avg", "auto", None, 93, 93))
+
+    def test_store_and_load_keyframes(self) -> None:
+        """
+        Test that keyframe colors, fewer than the samples requested, are loaded back for as many samples.
+        :return: None
+        """
+        keyframe_colors = ColorSequence(np.zeros((4, 3), dtype=np.float32), [0, 25, 50, 75])
+        self.cache.store(self.video_path, "avg", "keyframes", None, keyframe_colors, 93)
+
+        loaded = self.cache.load(self.video_path, "avg", "keyframes", None, 93, 93)
+        np.testing.assert_array_equal(loaded.frame_indices, keyframe_colors.frame_indices)
+        loaded = self.cache.load(self.video_path, "avg", "keyframes", None, 93, 2)
+        np.testing.assert_array_equal(loaded.frame_indices, [0, 50])
+        self.assertIsNone(self.cache.load(self.video_path, "avg", "keyframes", None, 93, 94))
+
+    def test_decoders_have_separate_entries(self) -> None:
+        """
+        Test that colors decoded with ffmpeg and OpenCV are stored in separate entries.
+        :return: None
+        """
+        self.cache.store(self.video_path, "avg", "auto", (160, 90), self.colors)
+        self.assertIsNone(self.cache.load(self.video_path, "avg", "auto", (160, 90), 93, 93, "ffmpeg"))
+
+        self.cache.store(self.video_path, "avg", "auto", (160, 90), self.colors[:50], decoder="ffmpeg")
+
+        self.assertEqual(len([name for name in os.listdir(self.cache_dir) if name.endswith(".npz")]), 2)
+        self.assertEqual(len(self.cache.load(self.video_path, "avg", "auto", (160, 90), 93, 93)), 93)
+        self.assertEqual(len(self.cache.load(self.video_path, "avg", "auto", (160, 90), 50, 50, "ffmpeg")), 50)
+
+    def test_truncated_entry_is_a_miss(self) -> None:
+        """
+        Test that a truncated entry is not loaded, and is replaced by the next extraction.
+        :return: None
+        """
+        self.cache.store(self.video_path, "avg", "auto", None, self.colors)
+        data_path = self.cache._data_path(self.cache.key(self.video_path, "avg", "auto", None))
+        with open(data_path, "r+b") as file:
+            file.truncate(os.path.getsize(data_path) // 2)
+
+        self.assertIsNone(self.cache.load(self.video_path, "avg", "auto", None, 93, 93))
+
+        self.cache.store(self.video_path, "avg", "auto", None, self.colors)
+        loaded = self.cache.load(self.video_path, "avg", "auto", None, 93, 93)
+        np.testing.assert_array_equal(loaded.colors, self.colors.colors)
+
+    def test_resample_colors_picks_nearest_frames(self) -> None:
+        """
+        Test that resampling picks the cached frame nearest to each target frame.
+        :return: None
+        """
+        colors = ColorSequence(np.zeros((4, 3)), [0, 9, 30, 60])
+
+        resampled = resample_colors(colors, 100, 2)
+
+        # The targets are frames 0 and 50
+        np.testing.assert_array_equal(resampled.frame_indices, [0, 60])
+
+    def test_evicts_least_recently_used_entries(self) -> None:
+        """
+        Test that the least recently used entries are deleted once the cache is over its maximum size.
+        :return: None
+        """
+        self.cache.store(self.video_path, "avg", "auto", None, self.colors)
+        entry_size = sum(os.path.getsize(os.path.join(self.cache_dir, name)) for name in os.listdir(self.cache_dir))
+        self.cache.max_size = entry_size * 2
+
+        self.cache.store(self.video_path, "hsv", "auto", None, self.colors)
+        os.utime(self.cache._data_path(self.cache.key(self.video_path, "avg", "auto", None)), (0, 0))
+        self.cache.store(self.video_path, "bgr", "auto", None, self.colors)
+
+        self.assertIsNone(self.cache.load(self.video_path, "avg", "auto", None, 93, 93))
+        self.assertIsNotNone(self.cache.load(self.video_path, "hsv", "auto", None, 93, 93))
+        self.assertIsNotNone(self.cache.load(self.video_path, "bgr", "auto", None, 93, 93))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
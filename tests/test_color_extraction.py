@@ -34,6 +34,68 @@ class TestColorExtraction(unittest.TestCase):
         self.assertIsInstance(dominant_color, np.ndarray)
         self.assertEqual(dominant_color.shape, (3,))  # Should be a 3-element array representing a color
 
+    def test_get_dominant_color_kmeans_largest_cluster(self) -> None:
+        """
+        Test that get_dominant_color_kmeans returns the color of the largest cluster on a subsampled frame.
+        :return: None
+        """
+        frame = np.zeros((100, 100, 3), dtype=np.uint8)
+        frame[:70] = [10, 200, 30]
+        frame[70:90] = [250, 250, 250]
+        frame[90:] = [0, 0, 128]
+
+        dominant_color = color_extraction.get_dominant_color_kmeans(frame, sample_size=500)
+
+        np.testing.assert_allclose(dominant_color, [10, 200, 30], atol=1)
+
+    def test_fit_kmeans_warm_start_converges_quickly(self) -> None:
+        """
+        Test that fit_kmeans respects max_iter and converges immediately from the previous frame's centroids.
+        :return: None
+        """
+        rng = np.random.default_rng(1)
+        frame = rng.integers(0, 256, (60, 80, 3), dtype=np.uint8)
+
+        centroids, counts, iterations = color_extraction.fit_kmeans(frame, max_iter=50)
+        self.assertEqual(centroids.shape, (3, 3))
+        self.assertEqual(counts.sum(), color_extraction.KMEANS_SAMPLE_SIZE)
+        self.assertLessEqual(iterations, 50)
+
+        _, _, capped_iterations = color_extraction.fit_kmeans(frame, max_iter=1)
+        self.assertEqual(capped_iterations, 1)
+
+        _, _, warm_iterations = color_extraction.fit_kmeans(frame, max_iter=50, init=centroids)
+        self.assertLessEqual(warm_iterations, 2)
+
+    def test_kmeans_color_extractor_warm_starts_within_a_scene(self) -> None:
+        """
+        Test that KMeansColorExtractor reuses the previous centroids within a scene and re-seeds on scene cuts.
+        :return: None
+        """
+        rng = np.random.default_rng(2)
+        frame = np.zeros((90, 160, 3), dtype=np.int16)
+        frame[:50] = [20, 120, 200]
+        frame[50:80] = [200, 60, 30]
+        frame[80:] = [90, 90, 90]
+        frame = np.clip(frame + rng.integers(-15, 16, frame.shape), 0, 255).astype(np.uint8)
+        extractor = color_extraction.KMeansColorExtractor(max_iter=50)
+
+        first_color = extractor(frame)
+        cold_iterations = extractor.last_iterations
+
+        # A slightly different frame from the same shot converges right away
+        similar_frame = np.clip(frame.astype(np.int16) + 2, 0, 255).astype(np.uint8)
+        extractor(similar_frame)
+        self.assertLessEqual(extractor.last_iterations, 2)
+        self.assertLess(extractor.last_iterations, cold_iterations)
+
+        # A completely different frame is detected as a scene cut
+        cut_thumbnail = np.full((9, 16, 3), 255, dtype=np.int16)
+        self.assertTrue(extractor.is_scene_cut(cut_thumbnail))
+
+        extractor.reset()
+        np.testing.assert_allclose(extractor(frame), first_color)
+
     def test_get_smoothed_frame(self) -> None:
         """
         Test the get_smoothed_frame function.
@@ -79,6 +141,32 @@ class TestColorExtraction(unittest.TestCase):
         self.assertEqual(smoothed_uniform.shape, (50, 1, 3))
         np.testing.assert_array_equal(smoothed_uniform[0, 0], [100, 150, 200])
 
+    def test_batch_extractors_match_single_frame_extractors(self) -> None:
+        """
+        Test that the batch extractors return the same colors as their single-frame counterparts.
+        :return: None
+        """
+        rng = np.random.default_rng(3)
+        frames = rng.integers(0, 256, (6, 9, 16, 3), dtype=np.uint8)
+
+        for single_extractor, batch_extractor in color_extraction.BATCH_EXTRACTORS.items():
+            expected = np.array([single_extractor(frame) for frame in frames])
+            actual = batch_extractor(frames)
+            self.assertEqual(actual.shape, (6, 3))
+            np.testing.assert_allclose(actual, expected, err_msg=single_extractor.__name__)
+
+    def test_get_batch_extractor(self) -> None:
+        """
+        Test that get_batch_extractor only returns batch versions for extractors that have one.
+        :return: None
+        """
+        self.assertIs(
+            color_extraction.get_batch_extractor(color_extraction.get_dominant_color_mean),
+            color_extraction.get_dominant_color_mean_batch,
+        )
+        self.assertIsNone(color_extraction.get_batch_extractor(color_extraction.get_smoothed_frame))
+        self.assertIsNone(color_extraction.get_batch_extractor(color_extraction.KMeansColorExtractor()))
+
 
 if __name__ == "__main__":
     unittest.main()
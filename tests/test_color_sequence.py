@@ -0,0 +1,175 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from movie_barcodes import ColorSequence
+from movie_barcodes.color_sequence import (
+    ColorBuffer,
+    area_resample,
+    build_color_pyramid,
+    load_color_file,
+    resample_from_pyramid,
+    save_color_file,
+    select_pyramid_level,
+)
+
+
+class TestColorSequence(unittest.TestCase):
+    """
+    Test the ColorSequence color store.
+    """
+
+    def test_from_colors_stores_float_colors_as_float32(self) -> None:
+        """
+        Test that a list of cv2.mean colors is stored as one contiguous float32 array.
+        :return: None
+        """
+        colors = [np.array([1.5, 2.0, 3.0]), np.array([4.0, 5.0, 6.25])]
+        sequence = ColorSequence.from_colors(colors, frame_indices=[0, 10], timestamps=[0.0, 0.4])
+
+        self.assertEqual(len(sequence), 2)
+        self.assertEqual(sequence.colors.dtype, np.float32)
+        self.assertTrue(sequence.colors.flags.c_contiguous)
+        self.assertFalse(sequence.is_columns)
+        np.testing.assert_array_equal(sequence[1], [4.0, 5.0, 6.25])
+        np.testing.assert_array_equal(sequence.frame_indices, [0, 10])
+        self.assertEqual(sequence.nbytes, 2 * 3 * 4 + 2 * 8 + 2 * 8)
+
+    def test_from_colors_keeps_uint8_arrays_without_copy(self) -> None:
+        """
+        Test that uint8 colors and smoothed frame columns are wrapped as is.
+        :return: None
+        """
+        columns = np.zeros((4, 6, 1, 3), dtype=np.uint8)
+        columns[:, :, :, 2] = 200
+        sequence = ColorSequence.from_colors(columns)
+
+        self.assertIs(sequence.colors, columns)
+        self.assertTrue(sequence.is_columns)
+        np.testing.assert_array_equal(sequence.mean_colors(), np.tile([0, 0, 200], (4, 1)))
+        self.assertIs(ColorSequence.from_colors(sequence), sequence)
+
+    def test_slice_keeps_frame_indices(self) -> None:
+        """
+        Test that slicing returns a ColorSequence with the matching frame indices.
+        :return: None
+        """
+        sequence = ColorSequence(np.arange(12, dtype=np.uint8).reshape(4, 3), frame_indices=[0, 5, 10, 15])
+        part = sequence[1:3]
+
+        self.assertIsInstance(part, ColorSequence)
+        np.testing.assert_array_equal(part.frame_indices, [5, 10])
+        np.testing.assert_array_equal(np.asarray(part), [[3, 4, 5], [6, 7, 8]])
+
+    def test_empty_and_invalid_colors(self) -> None:
+        """
+        Test empty colors, and that invalid shapes or mismatched indices raise a ValueError.
+        :return: None
+        """
+        self.assertEqual(len(ColorSequence.from_colors([])), 0)
+        with self.assertRaises(ValueError):
+            ColorSequence(np.zeros((2, 4)))
+        with self.assertRaises(ValueError):
+            ColorSequence(np.zeros((2, 3)), frame_indices=[0])
+
+    def test_color_buffer_fills_preallocated_array(self) -> None:
+        """
+        Test that a color buffer stores appended colors in one array of its capacity and refuses more.
+        :return: None
+        """
+        buffer = ColorBuffer(3)
+        np.testing.assert_array_equal(buffer.colors, np.empty((0, 3)))
+
+        buffer.append(np.array([1.5, 2.0, 3.0]))
+        buffer.extend(np.array([[4.0, 5.0, 6.0], [7.0, 8.0, 9.0]]))
+
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(buffer.colors.dtype, np.float32)
+        np.testing.assert_array_equal(buffer.colors[1:], [[4.0, 5.0, 6.0], [7.0, 8.0, 9.0]])
+        with self.assertRaises(ValueError):
+            buffer.append(np.zeros(3))
+
+    def test_area_resample_averages_covered_colors(self) -> None:
+        """
+        Test that area resampling weights each color by how much of it a sample covers.
+        :return: None
+        """
+        colors = ColorSequence(np.arange(10, dtype=np.float32).repeat(3).reshape(10, 3), np.arange(10))
+        resampled = area_resample(colors, 4)
+
+        # Each sample covers two colors and a half
+        np.testing.assert_allclose(resampled.colors[:, 0], [0.8, 3.2, 5.8, 8.2], rtol=1e-6)
+        np.testing.assert_array_equal(resampled.frame_indices, [0, 2, 5, 7])
+        self.assertIs(area_resample(colors, 10), colors)
+
+    def test_color_pyramid(self) -> None:
+        """
+        Test the pyramid levels, and that resampling from a level averages like resampling the full colors.
+        :return: None
+        """
+        rng = np.random.default_rng(0)
+        colors = ColorSequence(rng.uniform(0, 255, (1000, 3)), np.arange(1000) * 2)
+        levels = build_color_pyramid(colors)
+
+        self.assertEqual([len(level) for level in levels], [1000, 500, 250, 125, 63, 32, 16, 8, 4, 2, 1])
+        self.assertEqual(select_pyramid_level([len(level) for level in levels], 100), 3)
+        # The last level is the mean of all colors, even though the halved levels have odd lengths
+        np.testing.assert_allclose(levels[-1].colors[0], colors.colors.mean(axis=0), rtol=1e-5)
+
+        # Levels cover whole numbers of colors here, so the averages are exact
+        for samples in (500, 250, 125):
+            resampled = resample_from_pyramid(levels, samples)
+            expected = area_resample(colors, samples)
+            np.testing.assert_allclose(resampled.colors, expected.colors, rtol=1e-4)
+            np.testing.assert_array_equal(resampled.frame_indices, expected.frame_indices)
+
+    def test_color_pyramid_keeps_uint8_columns(self) -> None:
+        """
+        Test that the pyramid of smoothed frame columns stays uint8.
+        :return: None
+        """
+        columns = ColorSequence(np.stack([np.full((4, 1, 3), 10 * i, dtype=np.uint8) for i in range(5)]))
+        levels = build_color_pyramid(columns)
+
+        self.assertTrue(all(level.colors.dtype == np.uint8 for level in levels))
+        np.testing.assert_array_equal(levels[1].colors[:, 0, 0, 0], [5, 25, 40])
+        self.assertEqual(area_resample(columns, 2).colors.shape, (2, 4, 1, 3))
+
+    def test_color_file_round_trip(self) -> None:
+        """
+        Test that colors of several methods and the metadata are saved to and loaded from one color file.
+        :return: None
+        """
+        colors_by_method = {
+            "avg": ColorSequence(np.array([[1.5, 2, 3], [4, 5, 6]]), [0, 10], [0.0, 0.4]),
+            "smoothed": ColorSequence(np.full((2, 4, 1, 3), 7, dtype=np.uint8), [0, 10]),
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "video.colors")
+            save_color_file(file_path, colors_by_method, {"frame_count": 11})
+            loaded, metadata = load_color_file(file_path)
+
+        self.assertEqual(metadata["frame_count"], 11)
+        self.assertEqual(set(loaded), {"avg", "smoothed"})
+        np.testing.assert_array_equal(loaded["avg"].colors, colors_by_method["avg"].colors)
+        np.testing.assert_array_equal(loaded["avg"].timestamps, [0.0, 0.4])
+        self.assertTrue(loaded["smoothed"].is_columns)
+        self.assertIsNone(loaded["smoothed"].timestamps)
+        np.testing.assert_array_equal(loaded["smoothed"].frame_indices, [0, 10])
+
+    def test_load_color_file_rejects_other_files(self) -> None:
+        """
+        Test that loading an .npz file without metadata raises a ValueError.
+        :return: None
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "other.npz")
+            np.savez(file_path, colors=np.zeros((2, 3)))
+            with self.assertRaises(ValueError):
+                load_color_file(file_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from movie_barcodes import cpu_budget, video_processing
+
+
+class TestCpuBudget(unittest.TestCase):
+    """
+    Test the CPU budget functions.
+    """
+
+    def setUp(self) -> None:
+        """
+        Point the cgroup files to a temporary directory.
+        :return: None
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        for name in ("CGROUP_V2_CPU_MAX", "CGROUP_V1_CPU_QUOTA", "CGROUP_V1_CPU_PERIOD"):
+            patcher = patch.object(cpu_budget, name, os.path.join(self.directory, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write(self, name: str, content: str) -> None:
+        """
+        Write a fake cgroup file.
+        :param name: The name of the cpu_budget constant with the path of the file.
+        :param content: The content of the file.
+        :return: None
+        """
+        with open(getattr(cpu_budget, name), "w", encoding="ascii") as file:
+            file.write(content)
+
+    def test_cgroup_cpu_limit(self) -> None:
+        """
+        Test that cgroup v2 and v1 CPU quotas are read, and that no quota gives no limit.
+        :return: None
+        """
+        self.assertIsNone(cpu_budget.cgroup_cpu_limit())
+
+        self.write("CGROUP_V1_CPU_QUOTA", "-1\n")
+        self.write("CGROUP_V1_CPU_PERIOD", "100000\n")
+        self.assertIsNone(cpu_budget.cgroup_cpu_limit())
+        self.write("CGROUP_V1_CPU_QUOTA", "150000\n")
+        self.assertEqual(cpu_budget.cgroup_cpu_limit(), 1.5)
+
+        self.write("CGROUP_V2_CPU_MAX", "max 100000\n")
+        self.assertIsNone(cpu_budget.cgroup_cpu_limit())
+        self.write("CGROUP_V2_CPU_MAX", "400000 100000\n")
+        self.assertEqual(cpu_budget.cgroup_cpu_limit(), 4)
+
+    @patch("os.sched_getaffinity", create=True, return_value=set(range(16)))
+    def test_available_cpus(self, _) -> None:
+        """
+        Test that the CPU budget is the smallest of the affinity mask and the cgroup quota, rounded down.
+        :return: None
+        """
+        self.assertEqual(cpu_budget.available_cpus(), 16)
+        self.write("CGROUP_V2_CPU_MAX", "250000 100000\n")
+        self.assertEqual(cpu_budget.available_cpus(), 2)
+        self.write("CGROUP_V2_CPU_MAX", "50000 100000\n")
+        self.assertEqual(cpu_budget.available_cpus(), 1)
+
+    def test_threads_per_worker(self) -> None:
+        """
+        Test that workers share the CPU budget, with at least one thread each.
+        :return: None
+        """
+        self.assertEqual(cpu_budget.threads_per_worker(4, 16), 4)
+        self.assertEqual(cpu_budget.threads_per_worker(3, 8), 2)
+        self.assertEqual(cpu_budget.threads_per_worker(8, 4), 1)
+
+    @patch("threadpoolctl.threadpool_limits")
+    @patch("movie_barcodes.cpu_budget.cv2.setNumThreads")
+    def test_limit_threads(self, mock_set_num_threads, mock_threadpool_limits) -> None:
+        """
+        Test that OpenCV and the BLAS/OpenMP thread pools are limited.
+        :return: None
+        """
+        cpu_budget.limit_threads(2)
+        mock_set_num_threads.assert_called_once_with(2)
+        mock_threadpool_limits.assert_called_once_with(limits=2)
+
+    @patch("movie_barcodes.video_processing.limit_threads")
+    @patch("movie_barcodes.video_processing.cv2.VideoCapture")
+    def test_pool_worker_limits_threads(self, mock_video, mock_limit_threads) -> None:
+        """
+        Test that pool workers limit their threads and open captures with their share of decoder threads.
+        :return: None
+        """
+        with (
+            patch.object(video_processing, "_CACHE_CAPTURES", False),
+            patch.object(video_processing, "_DECODE_THREADS", 0),
+            patch.dict(video_processing._CAPTURE_CACHE, clear=True),
+        ):
+            video_processing._init_pool_worker(3)
+            mock_limit_threads.assert_called_once_with(3)
+            video_processing._open_capture("tests/sample.mp4")
+        mock_video.assert_called_once_with(
+            "tests/sample.mp4", video_processing.cv2.CAP_ANY, [video_processing.cv2.CAP_PROP_N_THREADS, 3]
+        )
+        self.assertEqual(video_processing.ExtractionPool(4, threads=2).threads, 2)
@@ -0,0 +1,260 @@
+import io
+import shutil
+import unittest
+from typing import BinaryIO, List
+from unittest.mock import patch
+
+import numpy as np
+
+from movie_barcodes import ffmpeg_decoder, video_processing
+
+# The installed ffmpeg, if any, looked up before tests patch shutil.which
+FFMPEG_PATH = shutil.which(ffmpeg_decoder.FFMPEG_EXECUTABLE)
+
+
+class FakeProcess:
+    """
+    Stand-in for an ffmpeg process, writing given raw frames to its standard output.
+    """
+
+    def __init__(self, frames: np.ndarray, returncode: int = 0, error: bytes = b"") -> None:
+        """
+        :param np.ndarray frames: The raw frames ffmpeg outputs.
+        :param int returncode: The exit status of ffmpeg.
+        :param bytes error: What ffmpeg writes to its standard error.
+        """
+        self.stdout = io.BytesIO(frames.tobytes())
+        self.error = error
+        self.returncode = returncode
+
+    def start(self, command: List[str], stdout: int, stderr: BinaryIO) -> "FakeProcess":
+        """
+        Stand-in for subprocess.Popen, writing the error message to the standard error file.
+
+        :param List[str] command: The ffmpeg command.
+        :param int stdout: subprocess.PIPE.
+        :param BinaryIO stderr: The file standard error is written to.
+        :return: FakeProcess: The process.
+        """
+        stderr.write(self.error)
+        return self
+
+    def __enter__(self) -> "FakeProcess":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    def wait(self) -> int:
+        return self.returncode
+
+    def poll(self) -> int:
+        return self.returncode
+
+    def kill(self) -> None:
+        pass
+
+
+class TestFfmpegDecoder(unittest.TestCase):
+    """
+    Test the ffmpeg decoder.
+    """
+
+    def setUp(self) -> None:
+        """
+        Set up the sample video (320x240 at 25 fps) and distinct 4x2 frames ffmpeg could output.
+        :return: None
+        """
+        self.video_path = "tests/sample.mp4"
+        self.frames = np.arange(10, dtype=np.uint8)[:, None, None, None] * np.ones((1, 2, 4, 3), np.uint8)
+        which_patcher = patch("movie_barcodes.ffmpeg_decoder.shutil.which", return_value="/usr/bin/ffmpeg")
+        which_patcher.start()
+        self.addCleanup(which_patcher.stop)
+
+    def decode(self, frame_indices: list, frames: np.ndarray, **kwargs) -> tuple:
+        """
+        Decode frames with a fake ffmpeg process outputting the given frames.
+
+        :param list frame_indices: The indices of the frames to decode.
+        :param np.ndarray frames: The raw frames ffmpeg outputs.
+        :return: Tuple containing the decoded (index, frame) pairs and the ffmpeg command.
+        """
+        with patch("movie_barcodes.ffmpeg_decoder.subprocess.Popen", side_effect=FakeProcess(frames).start) as popen:
+            decoded = [
+                (index, frame.copy())
+                for index, frame in ffmpeg_decoder.iter_ffmpeg_frames(
+                    self.video_path, frame_indices, analysis_resolution=(4, 2), **kwargs
+                )
+            ]
+        return decoded, popen.call_args[0][0]
+
+    def test_find_ffmpeg_raises_error_when_missing(self) -> None:
+        """
+        Test that find_ffmpeg raises a ValueError when ffmpeg is not on the PATH.
+        :return: None
+        """
+        with patch("movie_barcodes.ffmpeg_decoder.shutil.which", return_value=None):
+            with self.assertRaises(ValueError):
+                ffmpeg_decoder.find_ffmpeg()
+
+    def test_output_size(self) -> None:
+        """
+        Test that frames are only scaled down to the analysis resolution.
+        :return: None
+        """
+        self.assertEqual(ffmpeg_decoder.output_size(320, 240), (320, 240))
+        self.assertEqual(ffmpeg_decoder.output_size(320, 240, (160, 90)), (160, 90))
+        self.assertEqual(ffmpeg_decoder.output_size(120, 80, (160, 90)), (120, 80))
+
+    def test_build_ffmpeg_command(self) -> None:
+        """
+        Test that the command seeks, selects, scales and skips frames in ffmpeg.
+        :return: None
+        """
+        command = ffmpeg_decoder.build_ffmpeg_command("ffmpeg", "video.mp4", 1.5, (160, 90), 5, 10, True, 2)
+
+        self.assertEqual(command[command.index("-ss") + 1], "1.500000")
+        self.assertEqual(command[command.index("-vf") + 1], "select=not(mod(n\\,5)),scale=160:90:flags=area")
+        self.assertEqual(command[command.index("-frames:v") + 1], "10")
+        self.assertEqual(command[command.index("-threads") + 1], "2")
+        self.assertEqual(command[command.index("-skip_frame") + 1], "nokey")
+        # Input options come before the input
+        self.assertLess(command.index("-skip_frame"), command.index("-i"))
+        # Output frames are not duplicated in place of dropped ones
+        self.assertEqual(command[command.index("-vsync") + 1], "passthrough")
+        self.assertEqual(command[-1], "pipe:1")
+
+        command = ffmpeg_decoder.build_ffmpeg_command("ffmpeg", "video.mp4", 0.0, (160, 90), 1, 10, False, 0)
+        self.assertEqual(command[command.index("-vf") + 1], "scale=160:90:flags=area")
+        for option in ("-ss", "-threads", "-skip_frame"):
+            self.assertNotIn(option, command)
+
+    def test_iter_ffmpeg_frames_selects_evenly_spaced_frames(self) -> None:
+        """
+        Test that evenly spaced frames are selected by ffmpeg, from half a frame before the first one.
+        :return: None
+        """
+        decoded, command = self.decode([10, 13, 16], self.frames[:3])
+
+        self.assertEqual([index for index, _ in decoded], [10, 13, 16])
+        for (_, frame), expected in zip(decoded, self.frames[:3]):
+            np.testing.assert_array_equal(frame, expected)
+        self.assertEqual(command[command.index("-ss") + 1], f"{9.5 / 25:.6f}")
+        self.assertIn("select=not(mod(n\\,3))", command[command.index("-vf") + 1])
+        self.assertEqual(command[command.index("-frames:v") + 1], "3")
+
+    def test_iter_ffmpeg_frames_drops_irregular_frames(self) -> None:
+        """
+        Test that frames at irregular positions are read from every decoded frame, dropping the others.
+        :return: None
+        """
+        decoded, command = self.decode([0, 1, 4], self.frames[:5])
+
+        self.assertEqual([index for index, _ in decoded], [0, 1, 4])
+        for (_, frame), expected in zip(decoded, self.frames[[0, 1, 4]]):
+            np.testing.assert_array_equal(frame, expected)
+        self.assertNotIn("select", command[command.index("-vf") + 1])
+        self.assertEqual(command[command.index("-frames:v") + 1], "5")
+
+    def test_iter_ffmpeg_frames_decodes_only_keyframes(self) -> None:
+        """
+        Test that requesting only keyframes skips every other frame in the decoder.
+        :return: None
+        """
+        decoded, command = self.decode([0, 50], self.frames[:2], keyframes=[0, 25, 50, 75])
+
+        self.assertEqual([index for index, _ in decoded], [0, 50])
+        np.testing.assert_array_equal(decoded[1][1], self.frames[1])
+        self.assertIn("-skip_frame", command)
+        # Frames are counted among the decoded keyframes
+        self.assertIn("select=not(mod(n\\,2))", command[command.index("-vf") + 1])
+
+    def test_iter_ffmpeg_frames_passes_frames_through(self) -> None:
+        """
+        Test that ffmpeg is run with -vsync passthrough, which ffmpeg 4.x understands, rather than -fps_mode.
+        :return: None
+        """
+        _, command = self.decode([0, 1, 4], self.frames[:5])
+
+        self.assertEqual(command[command.index("-vsync") : command.index("-vsync") + 2], ["-vsync", "passthrough"])
+        self.assertNotIn("-fps_mode", command)
+
+    def test_iter_ffmpeg_frames_stops_at_end_of_stream(self) -> None:
+        """
+        Test that decoding stops when ffmpeg outputs fewer frames than requested.
+        :return: None
+        """
+        decoded, _ = self.decode([0, 1, 2, 3], self.frames[:2])
+
+        self.assertEqual([index for index, _ in decoded], [0, 1])
+
+    def test_iter_ffmpeg_frames_raises_error_on_failure(self) -> None:
+        """
+        Test that a failing ffmpeg raises a ValueError with its message.
+        :return: None
+        """
+        process = FakeProcess(self.frames[:0], returncode=1, error=b"Invalid data")
+        with patch("movie_barcodes.ffmpeg_decoder.subprocess.Popen", side_effect=process.start):
+            with self.assertRaisesRegex(ValueError, "Invalid data"):
+                list(ffmpeg_decoder.iter_ffmpeg_frames(self.video_path, [0]))
+
+    def test_extract_colors_with_ffmpeg_decoder(self) -> None:
+        """
+        Test that extract_colors decodes through ffmpeg when selected.
+        :return: None
+        """
+        with patch("movie_barcodes.ffmpeg_decoder.subprocess.Popen", side_effect=FakeProcess(self.frames[:3]).start):
+            colors = video_processing.extract_colors(
+                self.video_path,
+                0,
+                2,
+                lambda frame: frame.mean(axis=(0, 1)),
+                analysis_resolution=(4, 2),
+                show_progress=False,
+                decoder="ffmpeg",
+            )
+
+        np.testing.assert_array_equal(np.array(colors), self.frames[:3, 0, 0])
+
+    @unittest.skipUnless(FFMPEG_PATH, "ffmpeg is not installed")
+    def test_iter_ffmpeg_frames_decodes_requested_frames(self) -> None:
+        """
+        Test with a real ffmpeg that each yielded frame is the requested one: the OpenCV frame closest to it has the
+        same index, for evenly spaced, irregular and keyframe indices.
+        :return: None
+        """
+        opencv_frames = np.array(
+            [
+                frame
+                for _, frame in video_processing.iter_decoded_frames(
+                    self.video_path, list(range(93)), "grab", analysis_resolution=(32, 24)
+                )
+            ],
+            dtype=np.int16,
+        )
+
+        for frame_indices, keyframes in (([3, 10, 17, 24, 31], None), ([0, 1, 4, 40, 41, 90], None), ([0], [0])):
+            with (
+                self.subTest(frame_indices=frame_indices),
+                patch("movie_barcodes.ffmpeg_decoder.shutil.which", return_value=FFMPEG_PATH),
+            ):
+                # Frames share one buffer, so each is compared as soon as it is yielded
+                closest = [
+                    (index, int(np.abs(opencv_frames - frame).mean(axis=(1, 2, 3)).argmin()))
+                    for index, frame in ffmpeg_decoder.iter_ffmpeg_frames(
+                        self.video_path, frame_indices, (32, 24), keyframes
+                    )
+                ]
+                self.assertEqual(closest, [(index, index) for index in frame_indices])
+
+    def test_unknown_decoder_raises_error(self) -> None:
+        """
+        Test that an unknown decoder raises a ValueError.
+        :return: None
+        """
+        with self.assertRaises(ValueError):
+            list(video_processing.iter_decoded_frames(self.video_path, [0], decoder="gstreamer"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from movie_barcodes import frame_index, video_processing
+
+
+class TestFrameIndex(unittest.TestCase):
+    """
+    Test the persistent frame index.
+    """
+
+    def setUp(self) -> None:
+        """
+        Set up an index directory in a temporary directory.
+        :return: None
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.index_dir = os.path.join(directory.name, "index")
+        self.video_path = "tests/sample.mp4"
+
+    def test_scan_frame_index(self) -> None:
+        """
+        Test that scanning a video records its exact frame count, timestamps and keyframes.
+        :return: None
+        """
+        index = frame_index.scan_frame_index(self.video_path)
+
+        self.assertEqual(index.frame_count, 93)
+        self.assertEqual(index.keyframes, [0])
+        np.testing.assert_allclose(index.timestamps, np.arange(93) / 25)
+
+    def test_scan_frame_index_raises_error_on_file_not_open(self) -> None:
+        """
+        Test that scanning a missing video raises a ValueError.
+        :return: None
+        """
+        with self.assertRaises(ValueError):
+            frame_index.scan_frame_index("missing_video.mp4")
+
+    def test_load_frame_index_scans_once(self) -> None:
+        """
+        Test that the index is stored on first use and loaded back without scanning the video again.
+        :return: None
+        """
+        first = frame_index.load_frame_index(self.video_path, self.index_dir)
+        self.assertEqual(len(os.listdir(self.index_dir)), 1)
+
+        with patch("movie_barcodes.frame_index.scan_frame_index") as mock_scan:
+            second = frame_index.load_frame_index(self.video_path, self.index_dir)
+        mock_scan.assert_not_called()
+        self.assertEqual(second.keyframes, first.keyframes)
+        np.testing.assert_array_equal(second.timestamps, first.timestamps)
+
+    def test_load_frame_index_rescans_corrupt_index(self) -> None:
+        """
+        Test that a truncated index file is replaced by scanning the video again.
+        :return: None
+        """
+        frame_index.load_frame_index(self.video_path, self.index_dir)
+        index_path = os.path.join(self.index_dir, os.listdir(self.index_dir)[0])
+        with open(index_path, "r+b") as file:
+            file.truncate(os.path.getsize(index_path) // 2)
+
+        with patch("movie_barcodes.frame_index.scan_frame_index", wraps=frame_index.scan_frame_index) as mock_scan:
+            index = frame_index.load_frame_index(self.video_path, self.index_dir)
+        mock_scan.assert_called_once()
+        self.assertEqual(index.frame_count, 93)
+        self.assertEqual(frame_index.load_frame_index(self.video_path, self.index_dir).frame_count, 93)
+        self.assertEqual(os.listdir(self.index_dir), [os.path.basename(index_path)])
+
+    def test_load_video_uses_index_frame_count(self) -> None:
+        """
+        Test that load_video reports the frame count of the index rather than the estimate of the container.
+        :return: None
+        """
+        index = frame_index.FrameIndex(np.arange(90) / 25, [0])
+        video, frame_count, _, _ = video_processing.load_video(self.video_path, index)
+        video.release()
+        self.assertEqual(frame_count, 90)
@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+import unittest
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+# Generous budget for the cumulative import time of the package itself, in microseconds
+PACKAGE_IMPORT_BUDGET = 100_000
+HEAVY_MODULES = ["cv2", "numpy", "tqdm", "sklearn", "PIL"]
+
+
+def run_python(code: str, *options: str) -> subprocess.CompletedProcess:
+    """
+    Runs Python code in a fresh interpreter, with the package importable.
+
+    :param str code: The code to run.
+    :param str options: Interpreter options.
+    :return: subprocess.CompletedProcess: The finished process, with its output.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [SRC_DIR, os.environ.get("PYTHONPATH")])))
+    return subprocess.run(
+        [sys.executable, *options, "-c", code], env=env, capture_output=True, text=True, check=True, timeout=120
+    )
+
+
+def loaded_modules(code: str) -> set:
+    """
+    Returns the top-level heavy modules loaded after running some code in a fresh interpreter.
+
+    :param str code: The code to run.
+    :return: set: The names of the loaded heavy modules.
+    """
+    result = run_python(f"{code}\nimport sys\nprint(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    return set(result.stdout.split())
+
+
+class TestImports(unittest.TestCase):
+    def test_package_import_is_light(self) -> None:
+        """
+        Test that importing the package loads none of the heavy dependencies, within the import time budget.
+
+        :return: None
+        """
+        self.assertEqual(loaded_modules("import movie_barcodes"), set())
+
+        # -X importtime lines are "import time: self [us] | cumulative | imported package"
+        result = run_python("import movie_barcodes", "-X", "importtime")
+        cumulative = [
+            int(line.split("|")[1])
+            for line in result.stderr.splitlines()
+            if line.startswith("import time:") and line.split("|")[2].strip() == "movie_barcodes"
+        ]
+        self.assertEqual(len(cumulative), 1)
+        self.assertLess(cumulative[0], PACKAGE_IMPORT_BUDGET)
+
+    def test_cli_import_skips_optional_dependencies(self) -> None:
+        """
+        Test that the command line and worker modules do not load tqdm, scikit-learn or Pillow.
+
+        :return: None
+        """
+        self.assertFalse(loaded_modules("import movie_barcodes.cli") & {"tqdm", "sklearn", "PIL"})
+        self.assertFalse(loaded_modules("import movie_barcodes.video_processing") & {"tqdm", "sklearn", "PIL"})
+
+    def test_lazy_attributes(self) -> None:
+        """
+        Test that public names are imported on first access.
+
+        :return: None
+        """
+        import movie_barcodes
+        from movie_barcodes.color_sequence import ColorSequence
+
+        self.assertIs(movie_barcodes.ColorSequence, ColorSequence)
+        self.assertTrue(callable(movie_barcodes.main))
+        self.assertIn("video_processing", dir(movie_barcodes))
+        with self.assertRaises(AttributeError):
+            _ = movie_barcodes.missing
@@ -1,7 +1,10 @@
 import unittest
 import os
 import glob
+import json
+import shutil
 import sys
+import tempfile
 from unittest.mock import patch
 
 from movie_barcodes import cli as main
@@ -11,7 +14,7 @@ class TestIntegration(unittest.TestCase):
     def setUp(self) -> None:
         self.input_video_path = "tests/sample.mp4"
 
-    def _run_test(self, barcode_type, workers, width=None):
+    def _run_test(self, barcode_type, workers, width=None, extra_args=None):
         # Build the command line arguments list
         args = [
             "movie-barcodes",
@@ -26,6 +29,8 @@ class TestIntegration(unittest.TestCase):
         ]
         if width is not None:
             args.extend(["--width", str(width)])
+        if extra_args is not None:
+            args.extend(extra_args)
 
         # Use patch to simulate command line arguments
         with patch.object(sys, "argv", args):
@@ -55,6 +60,125 @@ class TestIntegration(unittest.TestCase):
     def test_circular_2_workers_defined_width(self):
         self._run_test("circular", 2, 90)
 
+    def test_horizontal_1_worker_fast(self):
+        self._run_test("horizontal", 1, 90, ["--fast"])
+
+    def test_horizontal_1_worker_analysis_resolution(self):
+        self._run_test("horizontal", 1, 90, ["--analysis_resolution", "160x90"])
+
+    @unittest.skipIf(main.MAX_PROCESSES < 2, "2 workers need at least 2 CPU cores")
+    def test_horizontal_2_workers_thread_executor(self):
+        self._run_test("horizontal", 2, 90, ["--executor", "thread"])
+
+    @patch("movie_barcodes.utility.STREAMING_MIN_PIXELS", 0)
+    def test_horizontal_1_worker_streaming(self):
+        self._run_test("horizontal", 1, 90)
+
+    @patch("movie_barcodes.utility.STREAMING_MIN_PIXELS", 0)
+    def test_circular_1_worker_streaming(self):
+        self._run_test("circular", 1, 90)
+
+    def test_horizontal_1_worker_cached(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self._run_test("horizontal", 1, 90, ["--cache_dir", cache_dir])
+            with patch("movie_barcodes.cli.extract_colors_multi") as mock_extract:
+                self._run_test("circular", 1, 45, ["--cache_dir", cache_dir])
+            mock_extract.assert_not_called()
+
+    def test_horizontal_1_worker_indexed(self):
+        with tempfile.TemporaryDirectory() as index_dir:
+            self._run_test("horizontal", 1, 90, ["--index_dir", index_dir])
+            with patch("movie_barcodes.frame_index.scan_frame_index") as mock_scan:
+                self._run_test("horizontal", 1, 90, ["--index_dir", index_dir, "--fast"])
+            mock_scan.assert_not_called()
+
+    def test_extract_then_render(self):
+        with tempfile.TemporaryDirectory() as directory:
+            color_file = os.path.join(directory, "sample.colors.npz")
+            args = ["movie-barcodes", "extract", "-i", self.input_video_path, "-d", color_file, "-a", "-w", "1"]
+            with patch.object(sys, "argv", args + ["--interval", "100"]):
+                main.main()
+
+            for barcode_type, width in (("horizontal", 500), ("circular", 64)):
+                destination_path = os.path.join(directory, f"{barcode_type}.png")
+                args = ["movie-barcodes", "render", "-i", color_file, "-m", "smoothed", "-t", barcode_type]
+                args += ["-d", destination_path, "--width", str(width), "--height", "20"]
+                with patch.object(sys, "argv", args), patch("movie_barcodes.cli.load_video") as mock_load_video:
+                    main.main()
+                mock_load_video.assert_not_called()
+                self.assertTrue(os.path.exists(destination_path))
+
+    def test_batch_1_worker(self):
+        with tempfile.TemporaryDirectory() as directory:
+            video_dir = os.path.join(directory, "videos")
+            os.makedirs(video_dir)
+            for name in ("first.mp4", "second.mkv"):
+                shutil.copy(self.input_video_path, os.path.join(video_dir, name))
+            with open(os.path.join(video_dir, "broken.mp4"), "wb") as file:
+                file.write(b"not a video")
+
+            output_dir = os.path.join(directory, "barcodes")
+            args = ["movie-barcodes", "batch", "-i", video_dir, "-d", output_dir, "-w", "1", "--width", "30"]
+            with patch.object(sys, "argv", args):
+                main.main()
+
+            with open(os.path.join(output_dir, "batch_report.json"), encoding="utf-8") as file:
+                report = json.load(file)
+            self.assertEqual((report["succeeded"], report["failed"]), (2, 1))
+            for entry in report["videos"]:
+                for output in entry["outputs"]:
+                    self.assertTrue(os.path.exists(output))
+            self.assertEqual(
+                sorted(os.listdir(output_dir)),
+                sorted(["batch_report.json", "first_avg_horizontal.png", "second_avg_horizontal.png"]),
+            )
+
+    def test_batch_records_save_errors(self):
+        with tempfile.TemporaryDirectory() as directory:
+            video_dir = os.path.join(directory, "videos")
+            os.makedirs(video_dir)
+            for name in ("first.mp4", "second.mkv"):
+                shutil.copy(self.input_video_path, os.path.join(video_dir, name))
+
+            def save_barcodes(args, colors, frame_count, frame_width, frame_height, base_name):
+                if base_name == "first":
+                    raise OSError("Disk full")
+                save_barcodes_function(args, colors, frame_count, frame_width, frame_height, base_name)
+
+            save_barcodes_function = main.save_barcodes
+            output_dir = os.path.join(directory, "barcodes")
+            args = ["movie-barcodes", "batch", "-i", video_dir, "-d", output_dir, "-w", "1", "--width", "30"]
+            with patch.object(sys, "argv", args), patch.object(main, "save_barcodes", side_effect=save_barcodes):
+                main.main()
+
+            with open(os.path.join(output_dir, "batch_report.json"), encoding="utf-8") as file:
+                report = json.load(file)
+            self.assertEqual((report["succeeded"], report["failed"]), (1, 1))
+            failed = [entry for entry in report["videos"] if entry["status"] != "ok"]
+            self.assertEqual([entry["error"] for entry in failed], ["Disk full"])
+            self.assertIn("second_avg_horizontal.png", os.listdir(output_dir))
+
+    def test_batch_converts_chunk_size_per_video(self):
+        with tempfile.TemporaryDirectory() as directory:
+            video_dir = os.path.join(directory, "videos")
+            os.makedirs(video_dir)
+            for name in ("first.mp4", "second.mkv"):
+                shutil.copy(self.input_video_path, os.path.join(video_dir, name))
+
+            properties = [(93, 25.0, 320, 240), (93, 50.0, 320, 240)]
+            args = ["movie-barcodes", "batch", "-i", video_dir, "-d", directory, "-w", "2", "-c", "2s"]
+            with (
+                patch.object(sys, "argv", args),
+                patch.object(main, "MAX_PROCESSES", 2),
+                patch.object(main, "get_video_properties", side_effect=properties),
+                patch.object(main, "ExtractionPool"),
+                patch.object(main, "batch_extract_colors_multi", return_value=iter([])) as batch_extract,
+            ):
+                main.main()
+
+            # 2 seconds at 25 and 50 fps
+            self.assertEqual(batch_extract.call_args[0][5], [50, 100])
+
     @classmethod
     def tearDownClass(cls) -> None:
         """
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+from movie_barcodes import png_writer
+
+
+class TestPngWriter(unittest.TestCase):
+    """
+    Test the streaming PNG writer.
+    """
+
+    def setUp(self) -> None:
+        """
+        Set up a temporary destination file.
+        :return: None
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.destination_path = os.path.join(directory.name, "barcode.png")
+
+    def test_write_png_strips_round_trip(self) -> None:
+        """
+        Test that BGR and BGRA images written in strips of uneven sizes read back identical.
+        :return: None
+        """
+        rng = np.random.default_rng(0)
+        for channels in (3, 4):
+            image = rng.integers(0, 256, (37, 53, channels), dtype=np.uint8)
+            strips = [image[:10], image[10:10], image[10:31], image[31:]]
+            png_writer.write_png_strips(self.destination_path, strips, 53, 37, channels)
+
+            np.testing.assert_array_equal(cv2.imread(self.destination_path, cv2.IMREAD_UNCHANGED), image)
+
+    @patch("movie_barcodes.png_writer.STRIP_BYTES", 100)
+    def test_write_png(self) -> None:
+        """
+        Test that a whole image written through strips reads back identical.
+        :return: None
+        """
+        image = np.random.default_rng(1).integers(0, 256, (20, 9, 4), dtype=np.uint8)
+        png_writer.write_png(self.destination_path, image, 9)
+
+        np.testing.assert_array_equal(cv2.imread(self.destination_path, cv2.IMREAD_UNCHANGED), image)
+
+    def test_write_png_strips_invalid_strips(self) -> None:
+        """
+        Test that strips of the wrong width, or not adding up to the image height, raise a ValueError.
+        :return: None
+        """
+        image = np.zeros((4, 5, 3), dtype=np.uint8)
+        with self.assertRaises(ValueError):
+            png_writer.write_png_strips(self.destination_path, [image], 6, 4, 3)
+        with self.assertRaises(ValueError):
+            png_writer.write_png_strips(self.destination_path, [image], 5, 8, 3)
+        with self.assertRaises(ValueError):
+            png_writer.write_png_strips(self.destination_path, [image], 5, 4, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 import argparse
+import os
+import tempfile
 from unittest.mock import patch, MagicMock, Mock
 import cv2
 import numpy as np
@@ -27,6 +29,7 @@ class TestUtility(unittest.TestCase):
             all_methods=False,
             method="avg",
             height=None,
+            decoder="opencv",
         )
         self.frame_count = 300
         self.MAX_PROCESSES = 8
@@ -158,6 +161,16 @@ class TestUtility(unittest.TestCase):
         """
         utility.validate_args(self.args, self.frame_count, self.MAX_PROCESSES, self.MIN_FRAME_COUNT)
 
+    def test_ffmpeg_decoder_without_ffmpeg(self) -> None:
+        """
+        Test that selecting the ffmpeg decoder raises a ValueError when ffmpeg is not installed.
+        :return: None
+        """
+        self.args.decoder = "ffmpeg"
+        with patch("movie_barcodes.ffmpeg_decoder.shutil.which", return_value=None):
+            with self.assertRaises(ValueError):
+                utility.validate_args(self.args, self.frame_count, self.MAX_PROCESSES, self.MIN_FRAME_COUNT)
+
     @patch("movie_barcodes.utility.makedirs")
     @patch("movie_barcodes.utility.path.exists")
     def test_ensure_directory_creates_directory(self, mock_exists: MagicMock, mock_makedirs: MagicMock) -> None:
@@ -174,6 +187,62 @@ class TestUtility(unittest.TestCase):
         mock_exists.assert_called_once_with(self.args.destination_path)
         mock_makedirs.assert_called_once_with(self.args.destination_path)
 
+    def test_parse_resolution(self) -> None:
+        """
+        Test that parse_resolution parses WIDTHxHEIGHT strings and rejects invalid ones.
+        :return: None
+        """
+        self.assertEqual(utility.parse_resolution("160x90"), (160, 90))
+        self.assertEqual(utility.parse_resolution("64X36"), (64, 36))
+        for invalid in ["160", "x90", "160x90x3", "0x90", "axb"]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                utility.parse_resolution(invalid)
+
+    def test_list_batch_videos(self) -> None:
+        """
+        Test that list_batch_videos lists the videos of a directory, a glob pattern and CSV or JSON manifests.
+        :return: None
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ("b.mkv", "a.mp4", "notes.txt"):
+                open(os.path.join(directory, name), "w", encoding="utf-8").close()
+            with open(os.path.join(directory, "videos.csv"), "w", encoding="utf-8") as file:
+                file.write("path,output_name\na.mp4,first\n/movies/b.mkv,\n")
+            with open(os.path.join(directory, "videos.json"), "w", encoding="utf-8") as file:
+                file.write('["a.mp4", {"path": "b.mkv", "output_name": "second"}]')
+            with open(os.path.join(directory, "invalid.csv"), "w", encoding="utf-8") as file:
+                file.write("video\na.mp4\n")
+
+            a_path, b_path = os.path.join(directory, "a.mp4"), os.path.join(directory, "b.mkv")
+            self.assertEqual(utility.list_batch_videos(directory), [(a_path, None), (b_path, None)])
+            self.assertEqual(utility.list_batch_videos(os.path.join(directory, "*.mp4")), [(a_path, None)])
+            self.assertEqual(
+                utility.list_batch_videos(os.path.join(directory, "videos.csv")),
+                [(a_path, "first"), ("/movies/b.mkv", None)],
+            )
+            self.assertEqual(
+                utility.list_batch_videos(os.path.join(directory, "videos.json")), [(a_path, None), (b_path, "second")]
+            )
+            with self.assertRaises(ValueError):
+                utility.list_batch_videos(os.path.join(directory, "invalid.csv"))
+            with self.assertRaises(FileNotFoundError):
+                utility.list_batch_videos(os.path.join(directory, "*.webm"))
+
+    def test_parse_chunk_size(self) -> None:
+        """
+        Test that parse_chunk_size accepts frames and seconds, and that chunk_size_in_frames converts them.
+        :return: None
+        """
+        self.assertEqual(utility.parse_chunk_size("500"), (500, "frames"))
+        self.assertEqual(utility.parse_chunk_size("2.5s"), (2.5, "seconds"))
+        for invalid in ["0", "-3", "abc", "s", "1.5"]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                utility.parse_chunk_size(invalid)
+
+        self.assertIsNone(utility.chunk_size_in_frames(None, 25))
+        self.assertEqual(utility.chunk_size_in_frames((500, "frames"), 25), 500)
+        self.assertEqual(utility.chunk_size_in_frames((2.5, "seconds"), 24), 60)
+
     def test_format_time_seconds_only(self) -> None:
         """
         Test that format_time correctly formats times less than 60 seconds.
@@ -235,7 +304,7 @@ class TestUtility(unittest.TestCase):
         """
         # Mocking the specific functions to test if the correct one is returned
         utility.get_dominant_color_mean = Mock(name="get_dominant_color_mean")
-        utility.get_dominant_color_kmeans = Mock(name="get_dominant_color_kmeans")
+        utility.KMeansColorExtractor = Mock(name="KMeansColorExtractor")
         utility.get_dominant_color_hsv = Mock(name="get_dominant_color_hsv")
         utility.get_dominant_color_bgr = Mock(name="get_dominant_color_bgr")
         utility.get_smoothed_frame = Mock(name="get_smoothed_frame")
@@ -243,7 +312,7 @@ class TestUtility(unittest.TestCase):
         self.assertEqual(utility.get_dominant_color_function("avg"), utility.get_dominant_color_mean)
         self.assertEqual(
             utility.get_dominant_color_function("kmeans"),
-            utility.get_dominant_color_kmeans,
+            utility.KMeansColorExtractor.return_value,
         )
         self.assertEqual(utility.get_dominant_color_function("hsv"), utility.get_dominant_color_hsv)
         self.assertEqual(utility.get_dominant_color_function("bgr"), utility.get_dominant_color_bgr)
@@ -289,21 +358,21 @@ class TestUtility(unittest.TestCase):
         mock_getsize.assert_called_once_with(args.input_video_path)
 
     @patch("movie_barcodes.utility.path.join")
-    @patch("movie_barcodes.utility.Image.fromarray")
+    @patch("movie_barcodes.utility.write_png")
     @patch("movie_barcodes.utility.path.dirname")
     @patch("movie_barcodes.utility.path.abspath")
     def test_save_barcode_image_variations(
         self,
         mock_abspath: MagicMock,
         mock_dirname: MagicMock,
-        mock_fromarray: MagicMock,
+        mock_write_png: MagicMock,
         mock_path_join: MagicMock,
     ) -> None:
         """
         Test variations of save_barcode_image behavior based on different argument conditions.
         :param mock_abspath: MagicMock object for path.abspath function
         :param mock_dirname: MagicMock object for path.dirname function
-        :param mock_fromarray: MagicMock object for Image.fromarray function
+        :param mock_write_png: MagicMock object for write_png function
         :param mock_path_join: MagicMock object for path.join function
         :return: None
         """
@@ -318,13 +387,23 @@ class TestUtility(unittest.TestCase):
 
         # Test without workers and without output name
         args_without_workers = argparse.Namespace(
-            destination_path=None, output_name=None, barcode_type="type1", workers=None
+            destination_path=None,
+            output_name=None,
+            barcode_type="type1",
+            workers=None,
+            png_compression=utility.DEFAULT_PNG_COMPRESSION,
         )
         utility.save_barcode_image(barcode, base_name, args_without_workers, "avg")
         self.assertTrue("workers_" not in mock_path_join.call_args[0][-1])
 
         # Test with workers
-        args_with_workers = argparse.Namespace(destination_path=None, output_name=None, barcode_type="type1", workers=4)
+        args_with_workers = argparse.Namespace(
+            destination_path=None,
+            output_name=None,
+            barcode_type="type1",
+            workers=4,
+            png_compression=utility.DEFAULT_PNG_COMPRESSION,
+        )
         utility.save_barcode_image(barcode, base_name, args_with_workers, "avg")
         self.assertTrue("workers_4" in mock_path_join.call_args[0][-1])
 
@@ -334,6 +413,7 @@ class TestUtility(unittest.TestCase):
             output_name="custom_name",
             barcode_type="type1",
             workers=None,
+            png_compression=utility.DEFAULT_PNG_COMPRESSION,
         )
         utility.save_barcode_image(barcode, base_name, args_with_output_name, "avg")
         self.assertIn("custom_name.png", mock_path_join.call_args[0][-1])
@@ -345,12 +425,12 @@ class TestUtility(unittest.TestCase):
         self.assertIn(expected_name, mock_path_join.call_args[0][-1])
 
         # Test image saving
-        mock_image = mock_fromarray.return_value
         utility.save_barcode_image(barcode, base_name, args_without_workers, "avg")
-        mock_image.save.assert_called()  # Ensure the image is attempted to be saved
+        mock_write_png.assert_called()  # Ensure the image is attempted to be saved
+        self.assertEqual(mock_write_png.call_args[0][2], utility.DEFAULT_PNG_COMPRESSION)
 
     @patch("movie_barcodes.utility.path.join")
-    @patch("movie_barcodes.utility.Image.fromarray")
+    @patch("movie_barcodes.utility.write_png")
     @patch("movie_barcodes.utility.path.isabs")
     @patch("movie_barcodes.utility.path.dirname")
     @patch("movie_barcodes.utility.path.abspath")
@@ -359,7 +439,7 @@ class TestUtility(unittest.TestCase):
         mock_abspath: MagicMock,
         mock_dirname: MagicMock,
         mock_isabs: MagicMock,
-        mock_fromarray: MagicMock,
+        mock_write_png: MagicMock,
         mock_path_join: MagicMock,
     ) -> None:
         """
@@ -386,12 +466,72 @@ class TestUtility(unittest.TestCase):
             output_name=None,
             barcode_type="type1",
             workers=None,
+            png_compression=utility.DEFAULT_PNG_COMPRESSION,
         )
 
         utility.save_barcode_image(barcode, "video_sample", args, "avg")
 
         expected_saved_path = "/fake/root/relative/output.png"
-        mock_fromarray.return_value.save.assert_called_with(expected_saved_path)
+        mock_write_png.assert_called_with(expected_saved_path, barcode, utility.DEFAULT_PNG_COMPRESSION)
+
+    def test_use_streaming(self) -> None:
+        """
+        Test that only PNG barcodes larger than STREAMING_MIN_PIXELS are streamed.
+        :return: None
+        """
+        default_args = argparse.Namespace(destination_path=None)
+        jpeg_args = argparse.Namespace(destination_path="out/barcode.jpg")
+        png_args = argparse.Namespace(destination_path="out/barcode.PNG")
+        large = utility.STREAMING_MIN_PIXELS + 1
+
+        self.assertFalse(utility.use_streaming(default_args, 1920, 1080))
+        self.assertTrue(utility.use_streaming(default_args, large, 1))
+        self.assertTrue(utility.use_streaming(png_args, large, 1))
+        self.assertFalse(utility.use_streaming(jpeg_args, large, 1))
+
+    def test_save_barcode_image_formats(self) -> None:
+        """
+        Test saving barcodes as PNG, JPEG and WebP with encoder options, dropping alpha for JPEG, and logging where
+        they are saved.
+        :return: None
+        """
+        barcode = np.zeros((8, 8, 4), dtype=np.uint8)
+        barcode[:, :4] = [255, 0, 0, 255]
+        encoding = {"png_compression": utility.DEFAULT_PNG_COMPRESSION, "quality": None, "lossless": False}
+        with tempfile.TemporaryDirectory() as directory:
+            for name, extra in (
+                ("barcode.png", {"png_compression": 9}),
+                ("barcode.jpg", {"quality": 80}),
+                ("barcode.webp", {"lossless": True}),
+            ):
+                destination_path = os.path.join(directory, name)
+                args = argparse.Namespace(destination_path=destination_path, output_name=None, **{**encoding, **extra})
+                with self.assertLogs(level="INFO") as logs:
+                    utility.save_barcode_image(barcode, "video_sample", args, "avg")
+                self.assertIn(f"File saved at '{destination_path}'", logs.output[-1])
+
+                saved = cv2.imread(destination_path, cv2.IMREAD_UNCHANGED)
+                self.assertEqual(saved.shape[2], 3 if name.endswith(".jpg") else 4)
+                if not name.endswith(".jpg"):
+                    np.testing.assert_array_equal(saved, barcode)
+
+            args = argparse.Namespace(
+                destination_path=os.path.join(directory, "barcode.xyz"), output_name=None, **encoding
+            )
+            with self.assertRaises(ValueError):
+                utility.save_barcode_image(barcode, "video_sample", args, "avg")
+
+    def test_get_encoder_params(self) -> None:
+        """
+        Test the OpenCV encoder parameters built from the command line arguments.
+        :return: None
+        """
+        args = argparse.Namespace(quality=70, lossless=False)
+        self.assertEqual(utility.get_encoder_params(args, ".jpeg"), [cv2.IMWRITE_JPEG_QUALITY, 70])
+        self.assertEqual(utility.get_encoder_params(args, ".webp"), [cv2.IMWRITE_WEBP_QUALITY, 70])
+        args.lossless = True
+        self.assertEqual(utility.get_encoder_params(args, ".webp"), [cv2.IMWRITE_WEBP_QUALITY, 101])
+        self.assertEqual(utility.get_encoder_params(args, ".bmp"), [])
 
 
 if __name__ == "__main__":
@@ -1,6 +1,11 @@
 import unittest
+from collections import OrderedDict
+from multiprocessing.shared_memory import SharedMemory
 from unittest.mock import patch, MagicMock
-from movie_barcodes import video_processing
+
+import numpy as np
+
+from movie_barcodes import color_extraction, video_processing
 
 
 class TestVideoProcessing(unittest.TestCase):
@@ -21,11 +26,11 @@ class TestVideoProcessing(unittest.TestCase):
     @staticmethod
     def mock_color_extractor(frame):
         """
-        Mock color extractor function.
+        Mock color extractor function, coloring frames named after their index with a gray of that index.
         :param frame:
-        :return: frame
+        :return: np.ndarray: The frame index as a BGR color.
         """
-        return frame
+        return np.full(3, int(frame.rsplit("_", 1)[1]))
 
     @patch("movie_barcodes.video_processing.cv2.VideoCapture")
     def test_load_video_raises_error_on_file_not_open(self, mock_video: MagicMock) -> None:
@@ -109,10 +114,10 @@ class TestVideoProcessing(unittest.TestCase):
 
         # Mock color_extractor to return a predictable color
         def special_color_extractor(frame):
-            return "red" if frame == "frame_data" else "unknown"
+            return [0, 0, 255] if frame == "frame_data" else [0, 0, 0]
 
         # Expected result
-        expected_colors = ["red"] * self.target_frames
+        expected_colors = [[0, 0, 255]] * self.target_frames
 
         # Run the test
         actual_colors = video_processing.extract_colors(
@@ -124,7 +129,7 @@ class TestVideoProcessing(unittest.TestCase):
         )
 
         # Verify the result
-        self.assertEqual(actual_colors, expected_colors)
+        np.testing.assert_array_equal(actual_colors, expected_colors)
 
     @patch("cv2.VideoCapture")
     def test_frame_skipping_logic(self, mock_video: MagicMock) -> None:
@@ -155,7 +160,7 @@ class TestVideoProcessing(unittest.TestCase):
         mock_video_instance.read.side_effect = read_side_effect
         mock_video_instance.grab.side_effect = grab_side_effect
 
-        expected_colors = [f"frame_data_{i * 10}" for i in range(self.target_frames)]
+        expected_colors = [[i * 10] * 3 for i in range(self.target_frames)]
 
         actual_colors = video_processing.extract_colors(
             self.video_path,
@@ -165,7 +170,7 @@ class TestVideoProcessing(unittest.TestCase):
             self.target_frames,
         )
 
-        self.assertEqual(actual_colors, expected_colors)
+        np.testing.assert_array_equal(actual_colors, expected_colors)
 
     @patch("cv2.VideoCapture")
     def test_frame_skip_default(self, mock_video: MagicMock) -> None:
@@ -227,6 +232,517 @@ class TestVideoProcessing(unittest.TestCase):
         # Assert that all frames were processed since target_frames was not given
         self.assertEqual(len(colors), self.end_frame)
 
+    @patch("cv2.VideoCapture")
+    def test_extract_colors_multi_decodes_each_frame_once(self, mock_video: MagicMock) -> None:
+        """
+        Test that extract_colors_multi reads each sampled frame once and returns one color list per method.
+        :param mock_video: MagicMock object for cv2.VideoCapture
+        :return: None
+        """
+        mock_video_instance = mock_video.return_value
+        mock_video_instance.read.side_effect = [(True, f"frame_{i}") for i in range(self.target_frames)]
+
+        extractors = {
+            "double": lambda frame: 2 * self.mock_color_extractor(frame),
+            "identity": self.mock_color_extractor,
+        }
+        colors_by_method = video_processing.extract_colors_multi(
+            self.video_path,
+            self.start_frame,
+            self.end_frame,
+            extractors,
+            self.target_frames,
+        )
+
+        self.assertEqual(list(colors_by_method), ["double", "identity"])
+        np.testing.assert_array_equal(colors_by_method["identity"], [[i] * 3 for i in range(self.target_frames)])
+        np.testing.assert_array_equal(colors_by_method["double"], [[2 * i] * 3 for i in range(self.target_frames)])
+        self.assertEqual(mock_video_instance.read.call_count, self.target_frames)
+
+    def test_sample_frame_indices(self) -> None:
+        """
+        Test that sample_frame_indices spreads samples evenly and defaults to every frame.
+        :return: None
+        """
+        self.assertEqual(
+            video_processing.sample_frame_indices(self.start_frame, self.end_frame, self.target_frames),
+            [0, 10, 20, 30, 40],
+        )
+        self.assertEqual(video_processing.sample_frame_indices(10, 14), [10, 11, 12, 13, 14])
+        # More samples than frames never goes backwards
+        self.assertEqual(video_processing.sample_frame_indices(0, 2, 3), [0, 1, 2])
+
+    @patch("cv2.VideoCapture")
+    def test_seek_sampling_sets_position_for_each_sample(self, mock_video: MagicMock) -> None:
+        """
+        Test that the seek strategy jumps to each sampled frame instead of grabbing through.
+        :param mock_video: MagicMock object for cv2.VideoCapture
+        :return: None
+        """
+        mock_video_instance = mock_video.return_value
+        mock_video_instance.read.side_effect = [(True, f"frame_{i}") for i in range(self.target_frames)]
+
+        video_processing.extract_colors(
+            self.video_path,
+            self.start_frame,
+            self.end_frame,
+            self.mock_color_extractor,
+            self.target_frames,
+            sampling="seek",
+        )
+
+        mock_video_instance.grab.assert_not_called()
+        positions = [call.args[1] for call in mock_video_instance.set.call_args_list]
+        self.assertEqual(positions, [0, 10, 20, 30, 40])
+
+    @patch("cv2.VideoCapture")
+    def test_auto_sampling_seeks_over_large_gaps_only(self, mock_video: MagicMock) -> None:
+        """
+        Test that the auto strategy grabs through short gaps and seeks over long ones.
+        :param mock_video: MagicMock object for cv2.VideoCapture
+        :return: None
+        """
+        mock_video_instance = mock_video.return_value
+        mock_video_instance.read.return_value = (True, "frame")
+        video = mock_video_instance
+
+        short_gap = video_processing.SEEK_MIN_GAP
+        long_gap = video_processing.SEEK_MIN_GAP + 1
+        frame_indices = [0, short_gap + 1, short_gap + 1 + long_gap + 1]
+        frames = list(video_processing.iter_sampled_frames(video, frame_indices, "auto"))
+
+        self.assertEqual([index for index, _ in frames], frame_indices)
+        self.assertEqual(video.grab.call_count, short_gap)
+        video.set.assert_called_once_with(video_processing.cv2.CAP_PROP_POS_FRAMES, frame_indices[2])
+
+    @patch("cv2.VideoCapture")
+    def test_auto_sampling_seeks_past_keyframes_only(self, mock_video: MagicMock) -> None:
+        """
+        Test that with known keyframes, the auto strategy seeks exactly when a keyframe lies before the next sample.
+        :param mock_video: MagicMock object for cv2.VideoCapture
+        :return: None
+        """
+        video = mock_video.return_value
+        video.read.return_value = (True, "frame")
+
+        # 0 -> 500 has no keyframe in between, 500 -> 510 has one at 505
+        frames = list(video_processing.iter_sampled_frames(video, [0, 500, 510], "auto", keyframes=[0, 505]))
+
+        self.assertEqual([index for index, _ in frames], [0, 500, 510])
+        self.assertEqual(video.grab.call_count, 499)
+        video.set.assert_called_once_with(video_processing.cv2.CAP_PROP_POS_FRAMES, 510)
+
+    def test_invalid_sampling_strategy(self) -> None:
+        """
+        Test that iter_sampled_frames raises a ValueError for an unknown sampling strategy.
+        :return: None
+        """
+        with self.assertRaises(ValueError):
+            list(video_processing.iter_sampled_frames(MagicMock(), [0], "teleport"))
+
+    def test_snap_to_keyframes(self) -> None:
+        """
+        Test that sampled frames are replaced by their nearest keyframe without duplicates.
+        :return: None
+        """
+        keyframes = [0, 12, 24, 48]
+        self.assertEqual(video_processing.snap_to_keyframes([0, 10, 20, 30, 40], keyframes), [0, 12, 24, 48])
+        self.assertEqual(video_processing.snap_to_keyframes([1, 2, 3], keyframes), [0])
+
+    @patch("movie_barcodes.video_processing.find_keyframes")
+    @patch("cv2.VideoCapture")
+    def test_extract_colors_keyframes_reports_indices(self, mock_video: MagicMock, mock_find: MagicMock) -> None:
+        """
+        Test that keyframe sampling only seeks to keyframes and reports the frame indices used.
+        :param mock_video: MagicMock object for cv2.VideoCapture
+        :param mock_find: MagicMock object for find_keyframes
+        :return: None
+        """
+        mock_find.return_value = [0, 24, 48]
+        mock_video_instance = mock_video.return_value
+        mock_video_instance.read.side_effect = [(True, f"frame_{i}") for i in range(3)]
+
+        colors, indices = video_processing.extract_colors(
+            self.video_path,
+            self.start_frame,
+            self.end_frame,
+            self.mock_color_extractor,
+            self.target_frames,
+            sampling="keyframes",
+            return_indices=True,
+        )
+
+        self.assertEqual(indices, [0, 24, 48])
+        self.assertEqual(len(colors), 3)
+        mock_video_instance.grab.assert_not_called()
+
+    @patch("movie_barcodes.video_processing.find_keyframes", return_value=[])
+    @patch("cv2.VideoCapture")
+    def test_extract_colors_keyframes_falls_back_to_exact_frames(
+        self, mock_video: MagicMock, mock_find: MagicMock
+    ) -> None:
+        """
+        Test that keyframe sampling falls back to exact frames when keyframes cannot be listed.
+        :param mock_video: MagicMock object for cv2.VideoCapture
+        :param mock_find: MagicMock object for find_keyframes
+        :return: None
+        """
+        mock_video.return_value.read.side_effect = [(True, f"frame_{i}") for i in range(self.target_frames)]
+
+        with self.assertLogs(level="WARNING"):
+            _, indices = video_processing.extract_colors(
+                self.video_path,
+                self.start_frame,
+                self.end_frame,
+                self.mock_color_extractor,
+                self.target_frames,
+                sampling="keyframes",
+                return_indices=True,
+            )
+
+        self.assertEqual(indices, [0, 10, 20, 30, 40])
+
+    def test_downscale_frame(self) -> None:
+        """
+        Test that downscale_frame averages frames down to the analysis resolution and never upscales.
+        :return: None
+        """
+        frame = np.zeros((4, 8, 3), dtype=np.uint8)
+        frame[:, 4:] = 200
+
+        downscaled = video_processing.downscale_frame(frame, (2, 1))
+        self.assertEqual(downscaled.shape, (1, 2, 3))
+        np.testing.assert_array_equal(downscaled[0], [[0, 0, 0], [200, 200, 200]])
+
+        self.assertIs(video_processing.downscale_frame(frame, None), frame)
+        self.assertIs(video_processing.downscale_frame(frame, (16, 9)), frame)
+
+    @patch("cv2.VideoCapture")
+    def test_extract_colors_applies_analysis_resolution(self, mock_video: MagicMock) -> None:
+        """
+        Test that extract_colors hands downscaled frames to the color extractor.
+        :param mock_video: MagicMock object for cv2.VideoCapture
+        :return: None
+        """
+        frame = np.full((90, 160, 3), 50, dtype=np.uint8)
+        mock_video.return_value.read.side_effect = [(True, frame)] * self.target_frames
+
+        shapes = video_processing.extract_colors(
+            self.video_path,
+            self.start_frame,
+            self.end_frame,
+            lambda f: f.shape,
+            self.target_frames,
+            analysis_resolution=(16, 9),
+        )
+
+        np.testing.assert_array_equal(shapes, [(9, 16, 3)] * self.target_frames)
+
+    @patch("cv2.VideoCapture")
+    def test_extract_colors_batches_small_frames(self, mock_video: MagicMock) -> None:
+        """
+        Test that small frames are stacked for batch extractors and give the same colors as per-frame extraction.
+        :param mock_video: MagicMock object for cv2.VideoCapture
+        :return: None
+        """
+        rng = np.random.default_rng(4)
+        frames = [rng.integers(0, 256, (9, 16, 3), dtype=np.uint8) for _ in range(self.target_frames)]
+        mock_video.return_value.read.side_effect = [(True, frame) for frame in frames]
+
+        with patch.object(
+            color_extraction,
+            "BATCH_EXTRACTORS",
+            {color_extraction.get_dominant_color_bgr: MagicMock(wraps=color_extraction.get_dominant_color_bgr_batch)},
+        ) as batch_extractors:
+            colors = video_processing.extract_colors(
+                self.video_path,
+                self.start_frame,
+                self.end_frame,
+                color_extraction.get_dominant_color_bgr,
+                self.target_frames,
+                batch_size=2,
+            )
+            batch_calls = batch_extractors[color_extraction.get_dominant_color_bgr].call_count
+
+        # 5 frames in batches of 2: two full batches and the remaining frame
+        self.assertEqual(batch_calls, 3)
+        expected = [color_extraction.get_dominant_color_bgr(frame) for frame in frames]
+        np.testing.assert_array_equal(np.array(colors), np.array(expected))
+
+    @patch("cv2.VideoCapture")
+    def test_extract_colors_batches_analysis_resolution_frames(self, mock_video: MagicMock) -> None:
+        """
+        Test that frames at the 160x90 analysis resolution are batched, in stacks bounded by BATCH_MAX_BYTES.
+        :param mock_video: MagicMock object for cv2.VideoCapture
+        :return: None
+        """
+        rng = np.random.default_rng(5)
+        frames = [rng.integers(0, 256, (90, 160, 3), dtype=np.uint8) for _ in range(self.target_frames)]
+        self.assertEqual(video_processing.batch_stack_size(frames[0], video_processing.BATCH_SIZE), 64)
+
+        for max_bytes, expected_calls in ((video_processing.BATCH_MAX_BYTES, 1), (2 * frames[0].nbytes, 3)):
+            mock_video.return_value.read.side_effect = [(True, frame) for frame in frames]
+            with (
+                self.subTest(max_bytes=max_bytes),
+                patch.object(video_processing, "BATCH_MAX_BYTES", max_bytes),
+                patch.object(
+                    color_extraction,
+                    "BATCH_EXTRACTORS",
+                    {
+                        color_extraction.get_dominant_color_hsv: MagicMock(
+                            wraps=color_extraction.get_dominant_color_hsv_batch
+                        )
+                    },
+                ) as batch_extractors,
+            ):
+                colors = video_processing.extract_colors(
+                    self.video_path,
+                    self.start_frame,
+                    self.end_frame,
+                    color_extraction.get_dominant_color_hsv,
+                    self.target_frames,
+                    show_progress=False,
+                )
+
+                self.assertEqual(batch_extractors[color_extraction.get_dominant_color_hsv].call_count, expected_calls)
+                expected = [color_extraction.get_dominant_color_hsv(frame) for frame in frames]
+                np.testing.assert_array_equal(colors, expected)
+
+    def test_split_segments(self) -> None:
+        """
+        Test that split_segments covers every frame and spreads the samples evenly.
+        :return: None
+        """
+        segments = video_processing.split_segments(10, 3, 5)
+        self.assertEqual(segments, [(0, 3, 2), (4, 6, 2), (7, 9, 1)])
+        # Segments without samples are skipped
+        self.assertEqual(video_processing.split_segments(10, 3, 2), [(0, 3, 1), (4, 6, 1)])
+
+    def test_parallel_extract_colors_thread_executor(self) -> None:
+        """
+        Test that the thread executor returns the same colors, in order, as sequential extraction.
+        :return: None
+        """
+        video_path = "tests/sample.mp4"
+        _, frame_count, _, _ = video_processing.load_video(video_path)
+
+        expected_colors, expected_indices = video_processing.extract_colors(
+            video_path, 0, frame_count - 1, color_extraction.get_dominant_color_mean, 20, return_indices=True
+        )
+        colors, indices = video_processing.parallel_extract_colors(
+            video_path,
+            frame_count,
+            color_extraction.get_dominant_color_mean,
+            3,
+            20,
+            return_indices=True,
+            executor="thread",
+        )
+
+        self.assertEqual(len(colors), 20)
+        self.assertEqual(indices, sorted(indices))
+        self.assertEqual(indices[0], expected_indices[0])
+        np.testing.assert_allclose(colors[0], expected_colors[0])
+
+    def test_parallel_extract_colors_chunks_are_reassembled_in_order(self) -> None:
+        """
+        Test that small chunks dispatched out of order give the same result with both executors.
+        :return: None
+        """
+        video_path = "tests/sample.mp4"
+        results = {
+            executor: video_processing.parallel_extract_colors(
+                video_path,
+                93,
+                color_extraction.get_dominant_color_mean,
+                2,
+                30,
+                return_indices=True,
+                executor=executor,
+                chunk_size=10,
+            )
+            for executor in video_processing.EXECUTORS
+        }
+
+        process_colors, process_indices = results["process"]
+        thread_colors, thread_indices = results["thread"]
+        self.assertEqual(len(process_colors), 30)
+        self.assertEqual(process_indices, sorted(process_indices))
+        self.assertEqual(process_indices, thread_indices)
+        # Both executors return arrays stored the same way
+        self.assertIsInstance(thread_colors, np.ndarray)
+        self.assertEqual(thread_colors.dtype, process_colors.dtype)
+        np.testing.assert_allclose(process_colors, thread_colors)
+
+    def test_thread_executor_propagates_extractor_errors(self) -> None:
+        """
+        Test that an error raised by an extractor thread reaches the caller instead of blocking the decoder.
+        :return: None
+        """
+
+        def failing_extractor(frame):
+            raise RuntimeError("extractor failed")
+
+        with self.assertRaises(RuntimeError):
+            video_processing.parallel_extract_colors(
+                "tests/sample.mp4", 93, failing_extractor, 2, 20, executor="thread"
+            )
+
+    def test_parallel_extract_colors_invalid_executor(self) -> None:
+        """
+        Test that parallel_extract_colors raises a ValueError for an unknown executor.
+        :return: None
+        """
+        with self.assertRaises(ValueError):
+            video_processing.parallel_extract_colors(self.video_path, 50, self.mock_color_extractor, 2, executor="gpu")
+
+    def test_extraction_pool_is_reused_across_calls(self) -> None:
+        """
+        Test that an ExtractionPool runs several extractions and gives the same colors as a per-call pool.
+        :return: None
+        """
+        expected = video_processing.parallel_extract_colors(
+            "tests/sample.mp4", 93, color_extraction.get_dominant_color_mean, 2, 20
+        )
+        with video_processing.ExtractionPool(2) as pool:
+            first = video_processing.parallel_extract_colors(
+                "tests/sample.mp4", 93, color_extraction.get_dominant_color_mean, 8, 20, pool=pool
+            )
+            second = video_processing.parallel_extract_colors(
+                "tests/sample.mp4", 93, color_extraction.get_dominant_color_mean, 8, 20, pool=pool
+            )
+
+        np.testing.assert_allclose(np.array(first), np.array(expected))
+        np.testing.assert_allclose(np.array(second), np.array(expected))
+        with self.assertRaises(RuntimeError):
+            pool.imap_unordered(len, [])
+
+    def test_iter_colors_streams_batches(self) -> None:
+        """
+        Test that iter_colors yields batches of colors with their frame indices and timestamps, which together match
+        extract_colors.
+        :return: None
+        """
+        expected = video_processing.extract_colors(
+            "tests/sample.mp4", 0, 92, color_extraction.get_dominant_color_mean, show_progress=False
+        )
+        batches = list(
+            video_processing.iter_colors("tests/sample.mp4", color_extraction.get_dominant_color_mean, batch_size=10)
+        )
+
+        self.assertEqual([len(batch) for batch in batches], [10] * 9 + [3])
+        np.testing.assert_allclose(np.concatenate([batch.colors for batch in batches]), np.array(expected), atol=1e-4)
+        np.testing.assert_array_equal(batches[1].frame_indices, np.arange(10, 20))
+        np.testing.assert_allclose(batches[1].timestamps, np.arange(10, 20) / 25)
+
+    def test_parallel_iter_colors_bounds_chunks_in_flight(self) -> None:
+        """
+        Test that parallel_iter_colors yields chunks in video order and never has more than max_in_flight chunks
+        submitted but not yielded.
+        :return: None
+        """
+
+        class SynchronousPool:
+            workers = 2
+
+            def __init__(self) -> None:
+                self.submitted = 0
+
+            def apply_async(self, func, args, callback, error_callback) -> None:
+                self.submitted += 1
+                callback(func(*args))
+
+        pool = SynchronousPool()
+        chunks = video_processing.parallel_iter_colors(
+            "tests/sample.mp4", color_extraction.get_dominant_color_mean, 2, chunk_size=10, max_in_flight=3, pool=pool
+        )
+        frame_indices = []
+        for yielded, chunk in enumerate(chunks, 1):
+            self.assertLessEqual(pool.submitted - yielded, 2)
+            frame_indices.extend(chunk.frame_indices)
+
+        self.assertEqual(pool.submitted, 10)
+        self.assertEqual(frame_indices, list(range(93)))
+
+    def test_batch_extract_colors_multi(self) -> None:
+        """
+        Test that a batch extraction gives the colors of every video as separate extractions do, and reports the
+        videos that fail without stopping the batch.
+        :return: None
+        """
+        extractors = {"avg": color_extraction.get_dominant_color_mean, "hsv": color_extraction.get_dominant_color_hsv}
+        videos = [("tests/sample.mp4", 93, 20), ("missing.mp4", 93, None), ("tests/sample.mp4", 93, None)]
+
+        with video_processing.ExtractionPool(2) as pool:
+            # Small chunks, so that the videos are split and their chunks packed together
+            results = {
+                position: (colors, indices, error)
+                for position, colors, indices, error in video_processing.batch_extract_colors_multi(
+                    videos, extractors, pool, chunk_sizes=[15, None, 15]
+                )
+            }
+
+        self.assertEqual(set(results), {0, 1, 2})
+        self.assertIsNotNone(results[1][2])
+        expected = video_processing.extract_colors_multi("tests/sample.mp4", 0, 92, extractors)
+        for position, samples in ((0, 20), (2, 93)):
+            colors, indices, error = results[position]
+            self.assertIsNone(error)
+            self.assertEqual(len(indices), samples)
+            self.assertEqual(indices, sorted(set(indices)))
+            for method in extractors:
+                np.testing.assert_allclose(colors[method], np.array(expected[method])[indices], atol=1e-4)
+
+    @patch("movie_barcodes.video_processing._CACHE_CAPTURES", True)
+    @patch("movie_barcodes.video_processing._CAPTURE_CACHE", new_callable=OrderedDict)
+    def test_open_capture_reuses_cached_capture(self, mock_cache: OrderedDict) -> None:
+        """
+        Test that pool workers reuse their open capture of a video and evict the least recently used ones.
+        :return: None
+        """
+        first, cached = video_processing._open_capture("tests/sample.mp4")
+        second, _ = video_processing._open_capture("tests/sample.mp4")
+        self.assertTrue(cached)
+        self.assertIs(first, second)
+
+        mock_cache.clear()
+        stale_capture = MagicMock()
+        mock_cache["other.mp4"] = stale_capture
+        with patch("movie_barcodes.video_processing.MAX_CACHED_CAPTURES", 1):
+            video_processing._open_capture("tests/sample.mp4")
+        stale_capture.release.assert_called_once()
+        self.assertEqual(len(mock_cache), 1)
+        first.release()
+
+    def test_parallel_extract_colors_returns_shared_array(self) -> None:
+        """
+        Test that process workers write colors into one shared array, closed once the array and its views are garbage
+        collected.
+        :return: None
+        """
+        extractors = {
+            "avg": color_extraction.get_dominant_color_mean,
+            "smoothed": color_extraction.get_smoothed_frame,
+        }
+        colors_by_method = video_processing.parallel_extract_colors_multi("tests/sample.mp4", 93, extractors, 2, 20)
+        expected = video_processing.parallel_extract_colors_multi(
+            "tests/sample.mp4", 93, extractors, 2, 20, executor="thread"
+        )
+
+        for method, colors in colors_by_method.items():
+            self.assertIsInstance(colors, np.ndarray)
+            self.assertEqual(len(colors), 20)
+            np.testing.assert_allclose(colors, np.array(expected[method]))
+        self.assertEqual(colors_by_method["smoothed"].shape[1:], expected["smoothed"][0].shape)
+
+        first_rows = colors_by_method["avg"][:2]
+        with patch.object(SharedMemory, "close", autospec=True, side_effect=SharedMemory.close) as mock_close:
+            del colors, colors_by_method
+            # A view of a result array keeps its block open
+            self.assertEqual(mock_close.call_count, 1)
+            del first_rows
+        self.assertEqual(mock_close.call_count, 2)
+
 
 if __name__ == "__main__":
     unittest.main()